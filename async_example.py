@@ -0,0 +1,85 @@
+"""
+AI API Concurrent Streaming Example - Python Async Client
+=========================================================
+
+This script demonstrates how to stream several chat completions at the same
+time with the asyncio client. All streams share one event loop and one
+connection pool, so hundreds of prompts can be in flight without starting a
+thread per request.
+
+For a single streaming request, see example.py
+For complete API documentation and Postman examples, see postman.md
+"""
+
+# Import asyncio for the event loop and the async API client
+import asyncio  # For running concurrent streams on one event loop
+from expedient_ai import AsyncExpedientClient, StreamWriter
+
+# =============================================================================
+# API CONFIGURATION
+# =============================================================================
+
+# Define the base API endpoint for the Expedient AI Chat service
+api_endpoint = "[ ENTER_CHAT_URL_HERE ]"
+
+# Set your API authentication key (replace with your actual key)
+api_key = "[ ENTER_API_KEY_HERE ]"  # Replace with your actual API key
+
+# Fast, cost-effective model suited for many parallel requests
+model = "gpt-4o-mini"
+
+# Maximum number of streams open at the same time
+concurrency = 4
+
+# Prompts to send concurrently (add as many as you like)
+prompts = [
+    "Explain the benefits of AI in business.",
+    "What is machine learning? Answer in two sentences.",
+    "Define cloud computing in one paragraph.",
+    "List three challenges of enterprise AI adoption.",
+]
+
+# =============================================================================
+# CONCURRENT STREAMING
+# =============================================================================
+
+
+async def main():
+    # One job per prompt: the model, the messages and any extra parameters
+    jobs = (
+        {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 300,
+            "temperature": 0.7,
+        }
+        for prompt in prompts
+    )
+
+    # Collect each answer separately since chunks from different streams interleave
+    answers = [[] for _ in prompts]
+
+    # Progress dots are batched into a few writes per second, not one per delta
+    async with AsyncExpedientClient(api_endpoint, api_key) as client:
+        with StreamWriter() as progress:
+            async for index, chunk in client.stream_many(jobs, concurrency=concurrency):
+                # Failed requests are reported in place of a chunk
+                if isinstance(chunk, Exception):
+                    progress.write(f"\n❌ Prompt {index} failed: {chunk}\n")
+                    continue
+
+                if chunk.get("choices"):
+                    delta = chunk["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        answers[index].append(delta["content"])
+                        progress.write(".")  # Progress: one dot per delta
+
+    print("\n")
+    for prompt, answer in zip(prompts, answers):
+        print(f"📋 {prompt}")
+        print("-" * 60)
+        print("".join(answer).strip() or "(no content received)")
+        print()
+
+
+asyncio.run(main())
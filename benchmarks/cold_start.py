@@ -0,0 +1,130 @@
+"""
+CLI Cold-Start Benchmark
+========================
+
+Wall time of short-lived processes, as paid by a shell loop that calls the
+CLI once per prompt:
+
+- ``python -c pass``: the interpreter alone
+- ``import requests``: what every standalone example script paid first
+- ``import expedient_ai``: the package with its lazy imports
+- ``cli --help``: argument parsing, no request
+- ``cli chat``: one request sent by the CLI process itself
+- ``cli chat (daemon)``: the same request handed to a running daemon
+
+Requests go to a local mock gateway without delays, so the request times
+are start-up plus transport overhead.
+
+    python -m benchmarks.cold_start --runs 20 --report cold_start.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from expedient_ai.mock_server import MockGatewayProcess
+
+CLI = [sys.executable, "-m", "expedient_ai"]
+
+
+def time_command(command, runs, env):
+    """Wall times (ms) of ``runs`` executions of ``command``, after a warm-up"""
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def wait_for_socket(path, process, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("the daemon did not start")
+        time.sleep(0.05)
+
+
+def summarize(name, timings):
+    timings = sorted(timings)
+    result = {
+        "command": name,
+        "runs": len(timings),
+        "ms_p50": round(statistics.median(timings), 2),
+        "ms_min": round(timings[0], 2),
+        "ms_max": round(timings[-1], 2),
+    }
+    print(
+        f"{name:<20} p50 {result['ms_p50']:8.2f} ms   "
+        f"min {result['ms_min']:8.2f} ms   max {result['ms_max']:8.2f} ms"
+    )
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--report", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    results = []
+    with MockGatewayProcess(
+        ttft=0, token_delay=0, tokens=5
+    ) as url, tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "expedient.sock")
+        env = dict(
+            os.environ,
+            EXPEDIENT_API_URL=url,
+            EXPEDIENT_API_KEY="benchmark",
+            EXPEDIENT_MODEL=args.model,
+            EXPEDIENT_SOCKET=socket_path,
+            EXPEDIENT_CONFIG=os.path.join(tmp, "config.json"),
+        )
+        chat = CLI + ["chat", "Say hello"]
+        commands = [
+            ("python -c pass", [sys.executable, "-c", "pass"]),
+            ("import requests", [sys.executable, "-c", "import requests"]),
+            ("import expedient_ai", [sys.executable, "-c", "import expedient_ai"]),
+            ("cli --help", CLI + ["--help"]),
+            ("cli chat", chat),
+        ]
+        print(f"Runs per command: {args.runs}")
+        print("-" * 72)
+        for name, command in commands:
+            results.append(summarize(name, time_command(command, args.runs, env)))
+
+        daemon = subprocess.Popen(CLI + ["daemon"], env=env, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_socket(socket_path, daemon)
+            results.append(
+                summarize("cli chat (daemon)", time_command(chat, args.runs, env))
+            )
+        finally:
+            subprocess.run(CLI + ["daemon", "--stop"], env=env)
+            daemon.wait()
+    print("-" * 72)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"runs": args.runs, "model": args.model},
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
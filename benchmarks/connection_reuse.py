@@ -0,0 +1,105 @@
+"""
+Connection Reuse Benchmark
+==========================
+
+Measures the per-request latency saved by sending requests through the pooled
+``ExpedientClient`` instead of a bare ``requests.post`` per call (the pattern
+the example scripts used before the shared client existed).
+
+By default the mock gateway (``expedient_ai.mock_server``) is started in a
+child process with no artificial delays so the benchmark runs offline. Point it at a real gateway with --url and --api-key to
+include the TLS handshake, where the savings are much larger.
+
+    python -m benchmarks.connection_reuse --requests 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import requests
+
+from expedient_ai import CHAT_COMPLETIONS_PATH, ExpedientClient, build_payload
+from expedient_ai.mock_server import MockGatewayProcess
+
+
+def _drain(chunks):
+    for _ in chunks:
+        pass
+
+
+def bench_bare_requests(url, api_key, model, messages, count):
+    """Time ``count`` calls that each open a fresh connection"""
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+    data = build_payload(model, messages, stream=True, max_tokens=16)
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = requests.post(
+            f"{url}{CHAT_COMPLETIONS_PATH}", headers=headers, json=data, stream=True
+        )
+        for _ in response.iter_lines(decode_unicode=True):
+            pass
+        response.close()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_pooled_client(url, api_key, model, messages, count):
+    """Time ``count`` calls sharing one pooled client"""
+    timings = []
+    with ExpedientClient(url, api_key) as client:
+        for _ in range(count):
+            start = time.perf_counter()
+            _drain(client.stream(model, messages, max_tokens=16))
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(name, timings):
+    timings_ms = sorted(t * 1000 for t in timings)
+    p50 = statistics.median(timings_ms)
+    p99 = timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.99))]
+    print(
+        f"{name:<16} mean {statistics.mean(timings_ms):8.3f} ms   "
+        f"p50 {p50:8.3f} ms   p99 {p99:8.3f} ms"
+    )
+    return statistics.mean(timings_ms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", help="API endpoint (default: local mock gateway)")
+    parser.add_argument("--api-key", default="benchmark")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    gateway = None
+    url = args.url
+    if url is None:
+        gateway = MockGatewayProcess(ttft=0, token_delay=0, tokens=5)
+        url = gateway.start()
+    messages = [{"role": "user", "content": "Say hello"}]
+
+    print(f"Endpoint: {url}  Requests per mode: {args.requests}")
+    print("-" * 72)
+    bare = summarize(
+        "bare requests",
+        bench_bare_requests(url, args.api_key, args.model, messages, args.requests),
+    )
+    pooled = summarize(
+        "pooled client",
+        bench_pooled_client(url, args.api_key, args.model, messages, args.requests),
+    )
+    print("-" * 72)
+    print(f"Saved per request: {bare - pooled:.3f} ms ({(1 - pooled / bare):.0%})")
+
+    if gateway is not None:
+        gateway.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+HTTP/1.1 vs HTTP/2 Transport Benchmark
+======================================
+
+Opens N concurrent streaming completions with ``AsyncExpedientClient`` over
+the default HTTP/1.1 transport (aiohttp) and over ``AsyncHTTP2Transport``
+(httpx + h2), each against a local mock gateway speaking that protocol, and
+records per scenario:
+
+- open sockets at the peak (one per stream on HTTP/1.1, a few on HTTP/2)
+- resident memory added per open stream
+- stream chunks/s across all streams and client CPU per chunk
+
+Every scenario runs in a fresh child process so memory numbers do not carry
+over between them. Needs ``pip install 'httpx[http2]'``; socket and memory
+sampling reads ``/proc`` and is only available on Linux.
+
+    python -m benchmarks.http2_transport --concurrency 100,500 --report h2.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from expedient_ai import AsyncExpedientClient
+from expedient_ai.mock_server import MockGatewayProcess, raise_open_file_limit
+from expedient_ai.transport import AsyncHTTP2Transport
+
+TRANSPORTS = ("http1.1", "http2")
+SAMPLE_INTERVAL = 0.02  # Seconds between socket and memory samples
+
+MESSAGES = [{"role": "user", "content": "Explain the benefits of AI in business."}]
+
+
+def open_sockets():
+    """Sockets open in this process (Linux), or None"""
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            continue  # Closed while listing
+    return count
+
+
+def resident_kb():
+    """Resident set size of this process in KiB (Linux), or None"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * resource.getpagesize() // 1024
+
+
+async def run_scenario(url, transport_name, concurrency, model, max_tokens):
+    if transport_name == "http2":
+        transport = AsyncHTTP2Transport(max_connections=concurrency, http1=False)
+    else:
+        transport = None  # Default aiohttp HTTP/1.1 pool, unlimited connections
+    client = AsyncExpedientClient(url, "benchmark", transport=transport)
+    peak = {"sockets": 0, "rss_kb": 0}
+    chunks = 0
+    errors = 0
+    open_streams = 0
+
+    async def sample():
+        while True:
+            sockets, rss = open_sockets(), resident_kb()
+            if sockets is not None:
+                peak["sockets"] = max(peak["sockets"], sockets)
+            if rss is not None:
+                peak["rss_kb"] = max(peak["rss_kb"], rss)
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    async def one():
+        nonlocal chunks, errors, open_streams
+        try:
+            stream = await client.stream(model, MESSAGES, max_tokens=max_tokens)
+            open_streams += 1
+            async for _ in stream:
+                chunks += 1
+        except Exception:
+            errors += 1
+
+    baseline_sockets, baseline_rss = open_sockets(), resident_kb()
+    sampler = asyncio.ensure_future(sample())
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    sampler.cancel()
+    await client.close()
+
+    rss_added = None
+    if baseline_rss is not None and open_streams:
+        rss_added = round((peak["rss_kb"] - baseline_rss) / open_streams, 1)
+    return {
+        "transport": transport_name,
+        "concurrency": concurrency,
+        "errors": errors,
+        "peak_sockets": (
+            peak["sockets"] - baseline_sockets if baseline_sockets is not None else None
+        ),
+        "rss_kb_per_stream": rss_added,
+        "chunks": chunks,
+        "wall_s": round(wall, 3),
+        "chunks_per_s": round(chunks / wall, 1) if wall else 0.0,
+        "cpu_us_per_chunk": round(cpu / chunks * 1e6, 2) if chunks else 0.0,
+    }
+
+
+def run_in_child(url, transport_name, concurrency, model, max_tokens):
+    raise_open_file_limit()
+    return asyncio.run(
+        run_scenario(url, transport_name, concurrency, model, max_tokens)
+    )
+
+
+def print_result(result):
+    sockets = result["peak_sockets"]
+    memory = result["rss_kb_per_stream"]
+    print(
+        f"{result['transport']:<8} x{result['concurrency']:<5}"
+        f" | sockets {sockets if sockets is not None else '-':>5}"
+        f" | {memory if memory is not None else '-':>6} KiB/stream"
+        f" | {result['chunks_per_s']:9.1f} chunks/s"
+        f" | {result['cpu_us_per_chunk']:7.1f} us cpu/chunk"
+        f" | errors {result['errors']}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="HTTP/1.1 vs HTTP/2 streaming transport benchmark"
+    )
+    parser.add_argument("--concurrency", default="100,500")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS))
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--max-tokens", type=int, default=100)
+    parser.add_argument("--report", help="write the JSON report here")
+    parser.add_argument("--mock-ttft", type=float, default=0.05)
+    parser.add_argument("--mock-token-delay", type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    transports = [t.strip() for t in args.transports.split(",") if t.strip()]
+    mock = {
+        "ttft": args.mock_ttft,
+        "token_delay": args.mock_token_delay,
+        "tokens": args.max_tokens,
+    }
+
+    results = []
+    for transport_name in transports:
+        with MockGatewayProcess(http2=transport_name == "http2", **mock) as url:
+            for concurrency in levels:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    result = pool.submit(
+                        run_in_child,
+                        url,
+                        transport_name,
+                        concurrency,
+                        args.model,
+                        args.max_tokens,
+                    ).result()
+                print_result(result)
+                results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "model": args.model,
+            "max_tokens": args.max_tokens,
+            "mock_ttft": args.mock_ttft,
+            "mock_token_delay": args.mock_token_delay,
+        },
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+End-to-End Latency Benchmark
+============================
+
+Drives the streaming chat path for every combination of model and concurrency
+level and records, per combination:
+
+- connect time (new TCP connections) and how many requests reused one
+- time to first token (TTFT): request start to first content delta
+- inter-token latency (ITL): gaps between consecutive content deltas
+- total tokens/s across all concurrent streams
+- client CPU time per token
+
+Results are written as a JSON report. With --baseline, the run is compared
+against an earlier report and exits non-zero on a regression beyond
+--tolerance, so CI can catch slowdowns in the client stack. Without --url the
+mock gateway is started in a child process, which keeps the numbers about the
+client rather than the network.
+
+    python -m benchmarks.latency --models gpt-4o-mini,claude-3-haiku-20240307 \\
+        --concurrency 1,16,128 --requests 128 --report latency.json
+    python -m benchmarks.latency --report new.json --baseline latency.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+
+import aiohttp
+
+from expedient_ai import AsyncExpedientClient
+from expedient_ai.mock_server import MockGatewayProcess
+from expedient_ai.stats import percentile
+
+DEFAULT_MODELS = "gpt-4.1,gpt-4o-mini,claude-3-haiku-20240307,gemini/gemini-2.0-flash"
+
+DEFAULT_PROMPTS = [
+    "Explain the benefits of AI in business.",
+    "Summarize the key benefits of enterprise AI adoption.",
+    "Write a detailed analysis of cloud computing trends.",
+    "What are the main challenges in AI implementation?",
+]
+
+# Metrics compared against a baseline: name -> True when higher is better
+REGRESSION_METRICS = {
+    "ttft_ms.p50": False,
+    "ttft_ms.p99": False,
+    "itl_ms.p50": False,
+    "itl_ms.p99": False,
+    "tokens_per_s": True,
+    "cpu_us_per_token": False,
+}
+
+
+def load_prompts(path):
+    """Prompts from a JSONL file of {"prompt": ...} or {"messages": [...]}"""
+    prompts = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                prompts.append(
+                    record.get("messages")
+                    or [{"role": "user", "content": record["prompt"]}]
+                )
+    return prompts
+
+
+def distribution(values_ms):
+    values = sorted(values_ms)
+    return {
+        "p50": round(percentile(values, 0.50), 3),
+        "p90": round(percentile(values, 0.90), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "max": round(values[-1], 3) if values else 0.0,
+    }
+
+
+class ConnectionTrace:
+    """aiohttp trace hooks counting new vs reused connections and connect time"""
+
+    def __init__(self):
+        self.connect_ms = []
+        self.reused = 0
+        self.config = aiohttp.TraceConfig()
+        self.config.on_connection_create_start.append(self._create_start)
+        self.config.on_connection_create_end.append(self._create_end)
+        self.config.on_connection_reuseconn.append(self._reuse)
+
+    async def _create_start(self, session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def _create_end(self, session, ctx, params):
+        self.connect_ms.append((time.perf_counter() - ctx.connect_start) * 1000)
+
+    async def _reuse(self, session, ctx, params):
+        self.reused += 1
+
+
+async def run_stream(client, model, messages, max_tokens, sample):
+    start = time.perf_counter()
+    previous = None
+    tokens = 0
+    usage_tokens = None
+    chunks = await client.stream(
+        model,
+        messages,
+        max_tokens=max_tokens,
+        stream_options={"include_usage": True},
+    )
+    async for chunk in chunks:
+        if chunk.get("usage"):
+            usage_tokens = chunk["usage"].get("completion_tokens")
+        if not chunk.get("choices"):
+            continue
+        if chunk["choices"][0].get("delta", {}).get("content"):
+            now = time.perf_counter()
+            if previous is None:
+                sample["ttft_ms"].append((now - start) * 1000)
+            else:
+                sample["itl_ms"].append((now - previous) * 1000)
+            previous = now
+            tokens += 1
+    sample["tokens"] += usage_tokens or tokens
+
+
+async def run_scenario(url, api_key, model, concurrency, requests, prompts, max_tokens):
+    trace = ConnectionTrace()
+    connector = aiohttp.TCPConnector(limit=0)
+    session = aiohttp.ClientSession(connector=connector, trace_configs=[trace.config])
+    client = AsyncExpedientClient(url, api_key, session=session)
+    sample = {"ttft_ms": [], "itl_ms": [], "tokens": 0, "errors": 0}
+    queue = iter(range(requests))
+
+    async def worker():
+        for index in queue:
+            try:
+                await run_stream(
+                    client, model, prompts[index % len(prompts)], max_tokens, sample
+                )
+            except Exception:
+                sample["errors"] += 1
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    await client.close()
+
+    tokens = sample["tokens"]
+    return {
+        "model": model,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sample["errors"],
+        "new_connections": len(trace.connect_ms),
+        "reused_connections": trace.reused,
+        "connect_ms": distribution(trace.connect_ms),
+        "ttft_ms": distribution(sample["ttft_ms"]),
+        "itl_ms": distribution(sample["itl_ms"]),
+        "tokens": tokens,
+        "wall_s": round(wall, 3),
+        "tokens_per_s": round(tokens / wall, 1) if wall else 0.0,
+        "cpu_us_per_token": round(cpu / tokens * 1e6, 2) if tokens else 0.0,
+    }
+
+
+def metric(result, name):
+    value = result
+    for key in name.split("."):
+        value = value[key]
+    return value
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of ``report`` against ``baseline`` beyond ``tolerance``"""
+    previous = {(r["model"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get((result["model"], result["concurrency"]))
+        if old is None:
+            continue
+        for name, higher_is_better in REGRESSION_METRICS.items():
+            new_value, old_value = metric(result, name), metric(old, name)
+            if not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    f"{result['model']} x{result['concurrency']} {name}: "
+                    f"{old_value} -> {new_value} ({change:+.0%})"
+                )
+    return regressions
+
+
+def print_result(result):
+    print(
+        f"{result['model']:<28} x{result['concurrency']:<5}"
+        f" ttft p50 {result['ttft_ms']['p50']:8.1f} p99 {result['ttft_ms']['p99']:8.1f}"
+        f" | itl p50 {result['itl_ms']['p50']:6.1f} p99 {result['itl_ms']['p99']:6.1f}"
+        f" | {result['tokens_per_s']:9.1f} tok/s"
+        f" | {result['cpu_us_per_token']:7.1f} us cpu/tok"
+        f" | conn new {result['new_connections']} reused {result['reused_connections']}"
+        f" | errors {result['errors']}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming latency benchmark")
+    parser.add_argument("--url", help="API endpoint (default: local mock gateway)")
+    parser.add_argument("--api-key", default="benchmark")
+    parser.add_argument("--models", default=DEFAULT_MODELS)
+    parser.add_argument("--concurrency", default="1,8,64")
+    parser.add_argument("--requests", type=int, default=64, help="per scenario")
+    parser.add_argument("--prompts", help="JSONL file of prompts")
+    parser.add_argument("--max-tokens", type=int, default=100)
+    parser.add_argument("--report", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--mock-ttft", type=float, default=0.05)
+    parser.add_argument("--mock-token-delay", type=float, default=0.005)
+    args = parser.parse_args(argv)
+
+    prompts = (
+        load_prompts(args.prompts)
+        if args.prompts
+        else [[{"role": "user", "content": p}] for p in DEFAULT_PROMPTS]
+    )
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    gateway = None
+    url = args.url
+    if url is None:
+        gateway = MockGatewayProcess(
+            ttft=args.mock_ttft,
+            token_delay=args.mock_token_delay,
+            tokens=args.max_tokens,
+        )
+        url = gateway.start()
+
+    results = []
+    try:
+        for model in models:
+            for concurrency in levels:
+                result = asyncio.run(
+                    run_scenario(
+                        url,
+                        args.api_key,
+                        model,
+                        concurrency,
+                        args.requests,
+                        prompts,
+                        args.max_tokens,
+                    )
+                )
+                print_result(result)
+                results.append(result)
+    finally:
+        if gateway is not None:
+            gateway.stop()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "endpoint": "mock" if args.url is None else args.url,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests,
+            "max_tokens": args.max_tokens,
+            "mock_ttft": args.mock_ttft if args.url is None else None,
+            "mock_token_delay": args.mock_token_delay if args.url is None else None,
+        },
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions beyond tolerance:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions beyond tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
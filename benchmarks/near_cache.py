@@ -0,0 +1,252 @@
+"""
+Near-Duplicate Cache Benchmark
+==============================
+
+Fills a ``NearDuplicateCache`` with N synthetic prompts and measures:
+
+- lookup latency (signature + index probe) for near-duplicate rewordings of
+  stored prompts and for unrelated prompts
+- recall: rewordings whose true shingle similarity reaches the threshold
+  and that are answered from the cache
+- false-hit rate: lookups answered with a stored prompt whose true
+  similarity is below the threshold, split into borderline ones (rewordings
+  just under the threshold) and unrelated prompts answered from the cache
+- memory added per entry (Linux)
+
+Rewordings change case and punctuation, drop or swap a word, or add a typo;
+the true similarity is the exact Jaccard index of the shingle sets.
+
+    python -m benchmarks.near_cache --entries 1000000 --report near.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+
+from expedient_ai.client import build_payload
+from expedient_ai.nearcache import (
+    DEFAULT_NUM_PERM,
+    DEFAULT_THRESHOLD,
+    NearDuplicateCache,
+    jaccard,
+    normalize_messages,
+    shingles,
+)
+
+SYLLABLES = "ka lo mi ne su ta ri po ve da zu fe go hi ja lu".split()
+PREFIXES = [
+    "Explain",
+    "Summarize",
+    "Describe",
+    "List",
+    "Compare",
+    "What are",
+    "Outline",
+]
+
+
+def resident_kb():
+    """Resident set size of this process in KiB (Linux), or None"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * resource.getpagesize() // 1024
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def prompt(words, rng):
+    body = " ".join(rng.choice(words) for _ in range(rng.randint(6, 16)))
+    return f"{rng.choice(PREFIXES)} the {body}."
+
+
+def reword(text, words, rng):
+    """A near-duplicate of ``text`` with one or two small edits"""
+    tokens = text.rstrip(".").split()
+    for _ in range(rng.randint(1, 2)):
+        edit = rng.choice(("case", "punct", "drop", "swap", "typo"))
+        i = rng.randrange(1, len(tokens))
+        if edit == "case":
+            tokens = [t.lower() if rng.random() < 0.5 else t.upper() for t in tokens]
+        elif edit == "punct":
+            tokens[i] += rng.choice((",", ";", "!", "?"))
+        elif edit == "drop" and len(tokens) > 4:
+            del tokens[i]
+        elif edit == "swap":
+            tokens[i] = rng.choice(words)
+        else:
+            word = tokens[i]
+            j = rng.randrange(len(word))
+            tokens[i] = word[:j] + rng.choice("aeiou") + word[j + 1 :]
+    return " ".join(tokens) + rng.choice(("", ".", "?"))
+
+
+def request(text, model):
+    messages = [{"role": "user", "content": text}]
+    return build_payload(model, messages, stream=True, temperature=0)
+
+
+def similarity(a, b, cache):
+    """Exact shingle similarity of two prompts, as the cache sees them"""
+    size = cache.shingle_size
+    return jaccard(
+        shingles(normalize_messages([{"role": "user", "content": a}]), size),
+        shingles(normalize_messages([{"role": "user", "content": b}]), size),
+    )
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(entries, lookups, threshold, num_perm, model, seed, bands=None):
+    rng = random.Random(seed)
+    words = vocabulary(5000, rng)
+    cache = NearDuplicateCache(
+        threshold=threshold, num_perm=num_perm, max_entries=entries, bands=bands
+    )
+    stored = []
+
+    rss_before = resident_kb()
+    start = time.perf_counter()
+    for index in range(entries):
+        text = prompt(words, rng)
+        stored.append(text)
+        cache.put(cache.key(request(text, model)), index)
+    build = time.perf_counter() - start
+    rss_after = resident_kb()
+
+    # Near duplicates of stored prompts
+    near_latency = []
+    near_eligible = near_found = false_hits = 0
+    for _ in range(lookups):
+        index = rng.randrange(entries)
+        text = reword(stored[index], words, rng)
+        data = request(text, model)
+        t0 = time.perf_counter()
+        found = cache.get(cache.key(data))
+        near_latency.append(time.perf_counter() - t0)
+        if found is None:
+            if similarity(text, stored[index], cache) >= threshold:
+                near_eligible += 1
+            continue
+        true = similarity(text, stored[found], cache)
+        if true < threshold:
+            false_hits += 1
+        elif found == index:
+            near_eligible += 1
+            near_found += 1
+
+    # Unrelated prompts
+    unrelated_latency = []
+    unrelated_hits = 0
+    for _ in range(lookups):
+        text = prompt(words, rng)
+        data = request(text, model)
+        t0 = time.perf_counter()
+        found = cache.get(cache.key(data))
+        unrelated_latency.append(time.perf_counter() - t0)
+        if found is not None and similarity(text, stored[found], cache) < threshold:
+            unrelated_hits += 1
+
+    stats = cache.stats()
+    return {
+        "entries": entries,
+        "threshold": threshold,
+        "num_perm": num_perm,
+        "bands": cache.bands,
+        "rows": cache.rows,
+        "build_s": round(build, 2),
+        "inserts_per_s": round(entries / build, 1),
+        "kb_per_entry": (
+            round((rss_after - rss_before) / entries, 3)
+            if rss_before is not None
+            else None
+        ),
+        "near_lookup_us_p50": round(percentile(near_latency, 0.5) * 1e6, 1),
+        "near_lookup_us_p99": round(percentile(near_latency, 0.99) * 1e6, 1),
+        "unrelated_lookup_us_p50": round(percentile(unrelated_latency, 0.5) * 1e6, 1),
+        "unrelated_lookup_us_p99": round(percentile(unrelated_latency, 0.99) * 1e6, 1),
+        "lookup_us_mean": round(
+            statistics.mean(near_latency + unrelated_latency) * 1e6, 1
+        ),
+        "recall": round(near_found / near_eligible, 4) if near_eligible else None,
+        "false_hit_rate": round((false_hits + unrelated_hits) / (2 * lookups), 5),
+        "borderline_false_hits": false_hits,
+        "unrelated_false_hits": unrelated_hits,
+        "candidates_per_lookup": round(stats["candidates_per_lookup"], 2),
+    }
+
+
+def print_result(result):
+    print(
+        f"{result['entries']:>9} entries | build {result['inserts_per_s']:9.1f}/s"
+        f" | lookup p50 {result['near_lookup_us_p50']:6.1f} us"
+        f" p99 {result['near_lookup_us_p99']:6.1f} us (near)"
+        f", p50 {result['unrelated_lookup_us_p50']:6.1f} us"
+        f" p99 {result['unrelated_lookup_us_p99']:6.1f} us (unrelated)"
+    )
+    print(
+        f"{'':>9}          | recall {result['recall']}"
+        f" | false hits {result['false_hit_rate']}"
+        f" ({result['borderline_false_hits']} borderline,"
+        f" {result['unrelated_false_hits']} unrelated)"
+        f" | {result['candidates_per_lookup']} candidates/lookup"
+        f" | {result['kb_per_entry']} KiB/entry"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Near-duplicate cache benchmark")
+    parser.add_argument("--entries", default="10000,100000,1000000")
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM)
+    parser.add_argument("--model", default="gpt-4.1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    results = []
+    for entries in (int(n) for n in args.entries.split(",")):
+        result = run(
+            entries, args.lookups, args.threshold, args.num_perm, args.model, args.seed
+        )
+        print_result(result)
+        results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "lookups": args.lookups,
+            "threshold": args.threshold,
+            "num_perm": args.num_perm,
+            "model": args.model,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+SSE Parser Benchmark
+====================
+
+Compares events/s of the original example-script loop
+(``iter_lines(decode_unicode=True)`` + ``line[6:]`` + ``json.loads``) with the
+byte-level ``SSEDecoder``, using the stdlib ``json`` and, when installed,
+``orjson``.
+
+Streams are synthetic OpenAI-style completions split into network-sized
+chunks, or raw SSE captures passed with --file (the bytes of a response body).
+
+    python -m benchmarks.sse_parser --events 20000
+    python -m benchmarks.sse_parser --file capture.sse
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+import requests
+
+from expedient_ai import sse
+
+CHUNK_TEMPLATE = {
+    "id": "chatcmpl-benchmark",
+    "object": "chat.completion.chunk",
+    "created": 1750000000,
+    "model": "gpt-4.1",
+    "choices": [{"index": 0, "delta": {"content": ""}, "finish_reason": None}],
+}
+
+WORDS = "the enterprise cloud model latency token stream gateway answer".split()
+
+
+def synthetic_stream(events, seed=0):
+    """Body of a completion stream with ``events`` content deltas"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(events):
+        CHUNK_TEMPLATE["choices"][0]["delta"]["content"] = " " + rng.choice(WORDS)
+        parts.append(b"data: " + json.dumps(CHUNK_TEMPLATE).encode() + b"\n\n")
+    parts.append(b"data: [DONE]\n\n")
+    return b"".join(parts)
+
+
+def split_chunks(body, min_size, max_size, seed=0):
+    """Cut a body into chunks the way reads from a socket would return it"""
+    rng = random.Random(seed)
+    chunks = []
+    position = 0
+    while position < len(body):
+        size = rng.randint(min_size, max_size)
+        chunks.append(body[position : position + size])
+        position += size
+    return chunks
+
+
+class _RecordedRaw:
+    """Stand-in for ``response.raw`` that replays recorded chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream(self, chunk_size, decode_content=True):
+        return iter(self.chunks)
+
+
+def legacy_loop(chunks):
+    """The parsing loop the example scripts used, on top of requests"""
+    response = requests.Response()
+    response.raw = _RecordedRaw(chunks)
+    response.encoding = "utf-8"
+    count = 0
+    for line in response.iter_lines(decode_unicode=True):
+        if line and line.startswith("data: "):
+            data_str = line[6:]
+            if data_str.strip() == "[DONE]":
+                break
+            try:
+                json.loads(data_str)
+                count += 1
+            except json.JSONDecodeError:
+                continue
+    return count
+
+
+def decoder_loop(loads):
+    def run(chunks):
+        decoder = sse.SSEDecoder()
+        count = 0
+        for raw in chunks:
+            for data in decoder.feed_data(raw):
+                if data == sse.DONE_DATA:
+                    return count
+                loads(data)
+                count += 1
+        return count
+
+    return run
+
+
+def measure(contenders, chunks, repeat):
+    """Best CPU seconds and event count of each parser over ``repeat`` rounds
+
+    Rounds alternate between the parsers so that drift in machine speed
+    affects them all alike.
+    """
+    best = {name: float("inf") for name, _ in contenders}
+    counts = {}
+    for _ in range(repeat):
+        for name, parse in contenders:
+            start = time.process_time()
+            counts[name] = parse(chunks)
+            best[name] = min(best[name], time.process_time() - start)
+    return {name: (counts[name], best[name]) for name, _ in contenders}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SSE parser events/s benchmark")
+    parser.add_argument("--file", action="append", help="raw SSE capture to parse")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.file:
+        bodies = {}
+        for path in args.file:
+            with open(path, "rb") as f:
+                bodies[path] = f.read()
+    else:
+        bodies = {"synthetic": synthetic_stream(args.events)}
+
+    contenders = [
+        ("iter_lines + json", legacy_loop),
+        ("SSEDecoder + json", decoder_loop(sse.stdlib_json_loads)),
+    ]
+    if sse.orjson is not None:
+        contenders.append(("SSEDecoder + orjson", decoder_loop(sse.orjson.loads)))
+
+    for name, body in bodies.items():
+        for label, (low, high) in (
+            ("one event per read", (None, None)),
+            ("512-byte reads", (512, 512)),
+            ("random 1-16 KiB reads", (1024, 16384)),
+        ):
+            if low is None:
+                chunks = [part + b"\n\n" for part in body.split(b"\n\n") if part]
+            else:
+                chunks = split_chunks(body, low, high)
+            print(f"{name}: {len(body) / 1e6:.2f} MB, {label}")
+            baseline = None
+            for contender, (count, elapsed) in measure(
+                contenders, chunks, args.repeat
+            ).items():
+                rate = count / elapsed
+                baseline = baseline or rate
+                print(
+                    f"  {contender:<22} {rate:12,.0f} events/s"
+                    f"   {rate / baseline:5.2f}x"
+                )
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
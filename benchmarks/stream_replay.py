@@ -0,0 +1,266 @@
+"""
+Stream Replay Benchmark
+=======================
+
+Replays recorded response streams (see ``expedient_ai.capture``) to measure
+the client's stream handling offline and deterministically:
+
+- throughput at full speed: events/s and MB/s of the original example-script
+  loop (``iter_lines`` + ``json.loads``), of ``iter_chat_chunks`` alone and
+  of a whole ``ExpedientClient.stream`` call on a ``ReplayTransport``
+- timing at the recorded pace (or --speed): how far the replayed time to
+  first byte and first content delta, and every gap between reads, drift
+  from the recording, i.e. the latency the client stack adds
+
+The same capture gives the same work on every run, so reports are comparable;
+with --baseline the run exits non-zero on a regression beyond --tolerance.
+Without --capture, streams of a reasoning model, a citing search model and a
+plain chat model are first recorded from the mock gateway (--record keeps
+them for later runs).
+
+    python -m benchmarks.stream_replay --record captures.sse --report replay.json
+    python -m benchmarks.stream_replay --capture captures.sse --baseline replay.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.sse_parser import decoder_loop, legacy_loop
+from expedient_ai import CaptureFile, ExpedientClient, ReplayTransport, StreamRecorder
+from expedient_ai.mock_server import MockGatewayProcess
+from expedient_ai.sse import iter_chat_chunks, json_loads
+from expedient_ai.stats import percentile
+
+DEFAULT_MODELS = "o4-mini,perplexity/sonar-reasoning-pro,gpt-4.1"
+
+# Metrics compared against a baseline: name -> (True when higher is better,
+# smallest change that counts); drifts are fractions of a millisecond, so a
+# relative change alone would flag scheduler noise
+REGRESSION_METRICS = {
+    "legacy_events_per_s": (True, 0),
+    "decoder_events_per_s": (True, 0),
+    "client_events_per_s": (True, 0),
+    "ttft_drift_ms.p50": (False, 1.0),
+    "gap_drift_ms.p50": (False, 1.0),
+}
+
+
+def record(path, models, streams, max_tokens):
+    """Record ``streams`` responses of every model from the mock gateway"""
+    messages = [{"role": "user", "content": "Explain the benefits of AI."}]
+    with MockGatewayProcess(
+        ttft=0.05, token_delay=0.005, reasoning_delay=0.5
+    ) as url, StreamRecorder(path) as recorder, ExpedientClient(
+        url, "benchmark", recorder=recorder
+    ) as client:
+        for model in models:
+            for _ in range(streams):
+                for _ in client.stream(model, messages, max_tokens=max_tokens):
+                    pass
+
+
+def has_content(chunk):
+    choices = chunk.get("choices")
+    return bool(choices and (choices[0].get("delta") or {}).get("content"))
+
+
+def throughput(streams, repeat):
+    """Best events/s of each parsing path over every stream"""
+    bodies = [list(stream.chunks()) for stream in streams]
+    size = sum(stream.size for stream in streams)
+    paths = {
+        "legacy": lambda: sum(legacy_loop(chunks) for chunks in bodies),
+        "decoder": lambda: sum(decoder_loop(json_loads)(chunks) for chunks in bodies),
+    }
+
+    transport = ReplayTransport(streams, speed=None)
+    client = ExpedientClient("http://replay", "unused", transport=transport)
+    messages = [{"role": "user", "content": "replay"}]
+
+    def through_client():
+        count = 0
+        for _ in streams:
+            for _ in client.stream("replay", messages):
+                count += 1
+        return count
+
+    paths["client"] = through_client
+    result = {}
+    for name, run in paths.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            events = run()
+            best = min(best, time.perf_counter() - start)
+        result[f"{name}_events_per_s"] = round(events / best, 1)
+        result[f"{name}_mb_per_s"] = round(size / best / 1e6, 2)
+    client.close()
+    return result
+
+
+def timing(streams, speed):
+    """Drift (ms) of replayed first byte, first content and gaps at ``speed``"""
+    transport = ReplayTransport(streams, speed=speed)
+    client = ExpedientClient("http://replay", "unused", transport=transport)
+    messages = [{"role": "user", "content": "replay"}]
+    ttfb_drift, ttft_drift, gap_drift = [], [], []
+    for stream in streams:
+        # Recorded time of the first content delta: the read that carried it
+        recorded_ttft = None
+        reads = []
+        for index, raw in enumerate(stream.chunks()):
+            for chunk in iter_chat_chunks([raw]):
+                if has_content(chunk):
+                    recorded_ttft = stream.times[index] / 1e9
+                    break
+            if recorded_ttft is not None:
+                break
+
+        start = time.monotonic()
+        response = transport.post(None, None, None, stream=True)
+        for _ in response.iter_bytes():
+            reads.append(time.monotonic() - start)
+        ttfb_drift.append((reads[0] - stream.ttfb / speed) * 1000)
+        expected = [gap / speed for gap in stream.gaps()]
+        actual = [b - a for a, b in zip(reads, reads[1:])]
+        gap_drift.extend(abs(a - e) * 1000 for a, e in zip(actual, expected))
+
+        start = time.monotonic()
+        for chunk in client.stream("replay", messages):
+            if has_content(chunk):
+                if recorded_ttft is not None:
+                    elapsed = time.monotonic() - start
+                    ttft_drift.append((elapsed - recorded_ttft / speed) * 1000)
+                break
+    client.close()
+
+    def summary(values):
+        return {
+            "p50": round(statistics.median(values), 3) if values else None,
+            "p99": round(percentile(sorted(values), 0.99), 3) if values else None,
+        }
+
+    return {
+        "ttfb_drift_ms": summary(ttfb_drift),
+        "ttft_drift_ms": summary(ttft_drift),
+        "gap_drift_ms": summary(gap_drift),
+    }
+
+
+def metric(result, name):
+    value = result
+    for key in name.split("."):
+        value = value[key]
+    return value
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of ``report`` against ``baseline`` beyond ``tolerance``"""
+    previous = {r["model"]: r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get(result["model"])
+        if old is None:
+            continue
+        for name, (higher_is_better, slack) in REGRESSION_METRICS.items():
+            new_value, old_value = metric(result, name), metric(old, name)
+            if not old_value or new_value is None:
+                continue
+            difference = (
+                old_value - new_value if higher_is_better else new_value - old_value
+            )
+            change = (new_value - old_value) / abs(old_value)
+            if difference > slack and difference / abs(old_value) > tolerance:
+                regressions.append(
+                    f"{result['model']} {name}: "
+                    f"{old_value} -> {new_value} ({change:+.0%})"
+                )
+    return regressions
+
+
+def print_result(result):
+    print(
+        f"{result['model']:<32} {result['streams']:>3} streams"
+        f" | events/s legacy {result['legacy_events_per_s']:>10,.0f}"
+        f" decoder {result['decoder_events_per_s']:>10,.0f}"
+        f" client {result['client_events_per_s']:>10,.0f}"
+        f" | drift ttft p50 {result['ttft_drift_ms']['p50']} ms"
+        f" gap p99 {result['gap_drift_ms']['p99']} ms"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream replay benchmark")
+    parser.add_argument("--capture", action="append", help="capture file to replay")
+    parser.add_argument("--record", help="record fresh captures into this file")
+    parser.add_argument("--models", default=DEFAULT_MODELS, help="models to record")
+    parser.add_argument("--streams", type=int, default=8, help="per model recorded")
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--speed", type=float, default=1.0, help="for timing runs")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--report", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.capture
+        if not paths:
+            path = args.record or os.path.join(tmp, "captures.sse")
+            models = [m.strip() for m in args.models.split(",") if m.strip()]
+            print(f"Recording {args.streams} streams per model into {path}")
+            record(path, models, args.streams, args.max_tokens)
+            paths = [path]
+
+        results = []
+        for path in paths:
+            with CaptureFile(path) as capture:
+                by_model = {}
+                for stream in capture:
+                    if stream.status == "done":
+                        by_model.setdefault(stream.model, []).append(stream)
+                for model, streams in by_model.items():
+                    result = {
+                        "model": model,
+                        "capture": os.path.basename(path),
+                        "streams": len(streams),
+                        "reads": sum(len(stream) for stream in streams),
+                        "bytes": sum(stream.size for stream in streams),
+                        **throughput(streams, args.repeat),
+                        **timing(streams, args.speed),
+                    }
+                    print_result(result)
+                    results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"speed": args.speed, "repeat": args.repeat},
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions beyond tolerance:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions beyond tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
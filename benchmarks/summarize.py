@@ -0,0 +1,140 @@
+"""
+Map-Reduce Summarization Benchmark
+==================================
+
+Wall time of ``Summarizer`` on synthetic documents of several lengths at
+several concurrency levels, against the mock gateway (each request waits
+--mock-ttft before answering, like a model reading a long prompt). Also
+reports the time to the first token of the final answer, the number of
+chunks, requests and reduce levels, and how long a second run takes when
+its partial summaries are already kept.
+
+    python -m benchmarks.summarize --chars 100000,1000000 --concurrency 1,8,32
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+
+from expedient_ai import AsyncExpedientClient, Summarizer
+from expedient_ai.mock_server import MockGatewayProcess
+
+WORDS = (
+    "the enterprise cloud model latency token stream gateway answer revenue "
+    "growth risk strategy customer platform security data quarter market"
+).split()
+
+
+def document(chars, seed=0):
+    """Paragraphs of random words, about ``chars`` characters long"""
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 160))]
+        paragraph = " ".join(words).capitalize() + "."
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+async def run(url, text, model, concurrency, chunk_tokens, summary_tokens):
+    async with AsyncExpedientClient(url, "benchmark") as client:
+        summarizer = Summarizer(
+            client,
+            model,
+            chunk_tokens=chunk_tokens,
+            summary_tokens=summary_tokens,
+            concurrency=concurrency,
+        )
+        start = time.perf_counter()
+        first = None
+        async for _ in summarizer.stream(text):
+            if first is None:
+                first = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        stats = summarizer.stats()
+
+        start = time.perf_counter()
+        await summarizer.summarize(text)  # Partials kept: only the final request
+        rerun = time.perf_counter() - start
+
+    return {
+        "chars": len(text),
+        "concurrency": concurrency,
+        "chunks": stats["chunks"],
+        "requests": stats["requests"],
+        "reduce_levels": stats["reduce_levels"],
+        "seconds": round(elapsed, 3),
+        "first_token_s": round(first, 3),
+        "map_s": round(stats["map_seconds"], 3),
+        "reduce_s": round(stats["reduce_seconds"], 3),
+        "rerun_s": round(rerun, 3),
+    }
+
+
+def print_result(result):
+    print(
+        f"{result['chars']:>10} chars x{result['concurrency']:<4}"
+        f" | {result['chunks']:>4} chunks {result['requests']:>4} requests"
+        f" {result['reduce_levels']} reduce levels"
+        f" | {result['seconds']:7.2f} s (map {result['map_s']:6.2f}"
+        f" reduce {result['reduce_s']:5.2f}) first token {result['first_token_s']:6.2f} s"
+        f" | rerun {result['rerun_s']:5.2f} s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Map-reduce summarization benchmark")
+    parser.add_argument("--chars", default="50000,200000,800000")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--model", default="gpt-4.1")
+    parser.add_argument("--chunk-tokens", type=int, default=3000)
+    parser.add_argument("--summary-tokens", type=int, default=200)
+    parser.add_argument("--mock-ttft", type=float, default=0.2)
+    parser.add_argument("--report", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    results = []
+    with MockGatewayProcess(ttft=args.mock_ttft, token_delay=0) as url:
+        for chars in (int(n) for n in args.chars.split(",")):
+            text = document(chars)
+            for concurrency in (int(n) for n in args.concurrency.split(",")):
+                result = asyncio.run(
+                    run(
+                        url,
+                        text,
+                        args.model,
+                        concurrency,
+                        args.chunk_tokens,
+                        args.summary_tokens,
+                    )
+                )
+                print_result(result)
+                results.append(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "model": args.model,
+            "chunk_tokens": args.chunk_tokens,
+            "summary_tokens": args.summary_tokens,
+            "mock_ttft": args.mock_ttft,
+        },
+        "results": results,
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
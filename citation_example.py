@@ -12,27 +12,15 @@ For complete API documentation see postman.md
 For standard models see example.py
 """
 
-# Import required libraries for HTTP requests and JSON processing
-import requests  # For making HTTP API calls
-import json  # For parsing JSON data from streaming responses
-import re  # For processing citations
-import threading  # For animated thinking dots
-import time  # For timing the dot animation
-
-# =============================================================================
-# ANIMATED THINKING INDICATOR
-# =============================================================================
-
-
-def animate_thinking():
-    """Show animated dots while AI is searching and thinking"""
-    dots = [".", "..", "..."]
-    i = 0
-    while thinking_active:
-        print(f"\r🔍 Searching web and thinking{dots[i % 3]}   ", end="", flush=True)
-        time.sleep(0.5)  # Update every 0.5 seconds
-        i += 1
-
+# Import the shared API client, citation index and output helpers
+from expedient_ai import (
+    CitationExtractor,
+    ExpedientAPIError,
+    ExpedientClient,
+    RetryPolicy,
+    Spinner,
+    StreamWriter,
+)
 
 # =============================================================================
 # API CONFIGURATION
@@ -70,23 +58,21 @@ prompt = prompts[selected_prompt]
 # REQUEST PREPARATION
 # =============================================================================
 
-# Set up HTTP headers required for the API request
-headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+# Create the API client with an extended read timeout for web search + reasoning
+# Rate limited (429) and transient server errors are retried with backoff.
+client = ExpedientClient(
+    api_endpoint, api_key, read_timeout=120, retry=RetryPolicy(max_retries=3)
+)
+
+# Conversation messages array with the question requiring current web data
+messages = [{"role": "user", "content": prompt}]
 
-# Create the request payload optimized for web reasoning
-data = {
-    "model": model,  # Perplexity reasoning model with web access
-    "messages": [
-        {"role": "user", "content": prompt}
-    ],  # Question requiring current web data
+# Request parameters optimized for web reasoning
+params = {
     "max_tokens": 1500,  # Higher limit for detailed analysis with citations
     "temperature": 0.4,  # Balanced temperature for factual yet analytical responses
-    "stream": True,  # Enable streaming for real-time responses
 }
 
-# Construct the complete API URL
-api_full = f"{api_endpoint}/chat/completions"
-
 # =============================================================================
 # API REQUEST EXECUTION
 # =============================================================================
@@ -99,69 +85,53 @@ print("=" * 60)
 print(f"\n📋 Query: {prompt}")
 print("\n" + "=" * 60)
 
-# Start animated thinking indicator for web search + reasoning
+# Start animated thinking indicator (stopped as soon as content arrives)
 print()  # Add newline for clean animation
-thinking_active = True
-thinking_thread = threading.Thread(target=animate_thinking, daemon=True)
-thinking_thread.start()
+thinking = Spinner("🔍 Searching web and thinking").start()
 
-# Make the HTTP POST request with extended timeout for web search + reasoning
-response = requests.post(api_full, headers=headers, json=data, stream=True, timeout=120)
+# Streamed text is batched into a few writes per second instead of one per token
+output = StreamWriter()
 
 # =============================================================================
 # RESPONSE PROCESSING WITH CITATION HANDLING
 # =============================================================================
 
-if response.status_code == 200:
-    full_response = ""  # Store complete response for citation processing
+try:
+    # Send the streaming request; a non-200 status raises ExpedientAPIError
+    chunks = client.stream(model, messages, **params)
+
+    # Indexes [n] citation markers and source URLs while the answer streams
+    extractor = CitationExtractor()
     content_started = False  # Track if we've started receiving content
 
-    # Process the streaming response
-    for line in response.iter_lines(decode_unicode=True):
-        if line and line.startswith("data: "):
-            data_str = line[6:]  # Remove 'data: ' prefix
-
-            # Check for completion signal
-            if data_str.strip() == "[DONE]":
-                break
-
-            # Parse and display content
-            try:
-                data = json.loads(data_str)
-                if "choices" in data and data["choices"]:
-                    choice = data["choices"][0]
-
-                    # Handle streaming content
-                    if "delta" in choice:
-                        delta = choice["delta"]
-                        if "content" in delta:
-                            # Clear thinking indicator and show header on first content
-                            if not content_started:
-                                thinking_active = False  # Stop animation
-                                time.sleep(0.1)  # Brief pause to let animation stop
-                                print(
-                                    "\r🔍 Searching web and thinking... Found sources!     "
-                                )  # Clear line
-                                print("\n🔍 Web Search + Reasoning (streaming):")
-                                print("-" * 60)
-                                content_started = True
-
-                            content = delta["content"]
-                            print(content, end="", flush=True)
-                            full_response += content
-
-                    # Check for completion with citations
-                    if choice.get("finish_reason"):
-                        break
-
-            except json.JSONDecodeError:
-                continue  # Skip malformed JSON
+    # Process the streaming response (one parsed chunk per server-sent event)
+    for chunk in chunks:
+        extractor.feed_chunk(chunk)
+
+        if "choices" in chunk and chunk["choices"]:
+            choice = chunk["choices"][0]
+
+            # Handle streaming content
+            if "delta" in choice:
+                delta = choice["delta"]
+                if "content" in delta:
+                    # Clear thinking indicator and show header on first content
+                    if not content_started:
+                        thinking.stop("🔍 Searching web and thinking... Found sources!")
+                        print("\n🔍 Web Search + Reasoning (streaming):")
+                        print("-" * 60)
+                        content_started = True
+
+                    output.write(delta["content"])
+
+            # No break on finish_reason: the stream ends by itself at [DONE],
+            # which returns its connection to the pool
+
+    output.close()  # Write out any text still buffered
 
     # If no content was received, still show completion
     if not content_started:
-        thinking_active = False  # Stop animation
-        time.sleep(0.1)  # Brief pause to let animation stop
-        print("\r🔍 Searching web and thinking... Complete!     ")  # Clear line
+        thinking.stop("🔍 Searching web and thinking... Complete!")
         print("\n🔍 Web Search + Reasoning completed (no content received)")
         print("-" * 60)
 
@@ -170,10 +140,16 @@ if response.status_code == 200:
     print("📚 SOURCES & CITATIONS")
     print("=" * 60)
 
-    # Look for citation patterns in the response
-    citations = re.findall(r"\[(\d+)\]", full_response)
+    # Citation markers were indexed while streaming; list each cited source
+    citations = extractor.numbers()
     if citations:
-        print(f"✅ Found {len(set(citations))} citation(s) in the response")
+        print(f"✅ Found {len(citations)} citation(s) in the response")
+        for number in citations:
+            uses = len(extractor.index[number])
+            print(
+                f"   [{number}] {extractor.source(number) or '(source not provided)'}"
+                f" - cited {uses} time(s)"
+            )
         print("\n💡 Citations are embedded in the text above as [1], [2], etc.")
         print("   These refer to web sources the AI accessed during research.")
     else:
@@ -184,12 +160,10 @@ if response.status_code == 200:
     print("\n" + "=" * 60)
     print("🎯 Web reasoning analysis completed.")
 
-else:
-    thinking_active = False  # Stop animation on error
-    time.sleep(0.1)  # Brief pause to let animation stop
-    print(f"\r❌ Request failed: {response.status_code}")
-    print(f"Error details: {response.text}")
-    if response.status_code == 403:
+except ExpedientAPIError as error:
+    thinking.stop(f"❌ Request failed: {error.status_code}")
+    print(f"Error details: {error.text}")
+    if error.status_code == 403:
         print("\n💡 Note: Web access models may require special account permissions")
 
 print("\n" + "=" * 60)
@@ -10,9 +10,8 @@ For project overview and setup instructions, see README.md
 For a minimal version without comments, see quick_start.py
 """
 
-# Import required libraries for HTTP requests and JSON processing
-import requests  # For making HTTP API calls
-import json  # For parsing JSON data from streaming responses
+# Import the shared client (pooled HTTP connections + streaming parser)
+from expedient_ai import ExpedientAPIError, ExpedientClient, RetryPolicy, StreamWriter
 
 # =============================================================================
 # API CONFIGURATION
@@ -51,6 +50,11 @@ model = "gpt-4.1"  # Latest general AI model (default)
 # model = "perplexity/sonar-pro"                 # Web access with enhanced capabilities
 # model = "perplexity/sonar"                     # Standard web-connected model
 
+# Long-running programs can choose the model per request instead:
+# expedient_ai.ModelRouter("fast") sends each request to whichever of
+# gpt-4o-mini, claude-3-haiku and gemini-2.0-flash is currently fastest and
+# healthy (see "Routing Between Equivalent Models" in README.md).
+
 # For reasoning models, see reasoning_example.py
 # For web reasoning with citations, see citation_example.py
 
@@ -62,63 +66,52 @@ prompt = "Summarize the key benefits of enterprise AI adoption."
 # REQUEST PREPARATION
 # =============================================================================
 
-# Set up HTTP headers required for the API request
-# Content-Type tells the server we're sending JSON data
-# Authorization provides the API key for authentication
-headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+# Create the API client. It keeps a pool of open connections, so reusing the
+# same client for several requests avoids a new connection setup every time.
+# Rate limited (429) and transient server errors are retried with backoff.
+client = ExpedientClient(
+    api_endpoint, api_key, read_timeout=120, retry=RetryPolicy(max_retries=3)
+)
+
+# Create the conversation messages array
+messages = [{"role": "user", "content": prompt}]
 
-# Create the request payload (data to send to the API)
-data = {
-    "model": model,  # Which AI model to use
-    "messages": [{"role": "user", "content": prompt}],  # Conversation messages array
+# Additional request parameters sent alongside the model and messages
+params = {
     "max_tokens": 1000,  # Maximum length of AI response (adjust as needed)
     "temperature": 0.7,  # Controls creativity (0.0=deterministic, 1.0=creative)
-    "stream": True,  # Enable streaming for real-time responses
 }
 
-# Construct the complete API URL by combining base endpoint with the chat completions path
-api_full = f"{api_endpoint}/chat/completions"
-
 # =============================================================================
 # API REQUEST EXECUTION
 # =============================================================================
 
-# Make the HTTP POST request to the AI API with streaming enabled
-# stream=True allows us to process responses in real-time as they arrive
-response = requests.post(api_full, headers=headers, json=data, stream=True, timeout=120)
+# Send the request with streaming enabled. The client raises ExpedientAPIError
+# if the API does not answer with HTTP 200 OK.
+try:
+    chunks = client.stream(model, messages, **params)
+except ExpedientAPIError as error:
+    # Handle API request failures by displaying error information
+    # This helps with debugging authentication, network, or server issues
+    print(f"Request failed: {error.status_code}, {error.text}")
+    raise SystemExit(1)
 
 # =============================================================================
 # RESPONSE PROCESSING
 # =============================================================================
 
-# Check if the API request was successful (HTTP 200 OK status)
-if response.status_code == 200:
-    print("AI Response (streaming):")
-    print("-" * 50)
-
-    # Process the streaming response line by line
-    for line in response.iter_lines(decode_unicode=True):
-        if line and line.startswith("data: "):
-            data_str = line[6:]  # Remove 'data: ' prefix
-
-            # Check for completion signal
-            if data_str.strip() == "[DONE]":
-                break
-
-            # Parse and display content
-            try:
-                data = json.loads(data_str)
-                if "choices" in data and data["choices"]:
-                    delta = data["choices"][0].get("delta", {})
-                    if "content" in delta:
-                        print(delta["content"], end="", flush=True)
-            except json.JSONDecodeError:
-                continue  # Skip malformed JSON
-
-    print("\n" + "-" * 50)
-    print("Stream completed.")
-
-else:
-    # Handle API request failures by displaying error information
-    # This helps with debugging authentication, network, or server issues
-    print(f"Request failed: {response.status_code}, {response.text}")
+print("AI Response (streaming):")
+print("-" * 50)
+
+# Each chunk is one parsed server-sent event; the client stops at [DONE].
+# StreamWriter batches the text into a few writes per second instead of one
+# write per token, and shows the first token immediately.
+with StreamWriter() as output:
+    for chunk in chunks:
+        if "choices" in chunk and chunk["choices"]:
+            delta = chunk["choices"][0].get("delta", {})
+            if "content" in delta:
+                output.write(delta["content"])
+
+print("\n" + "-" * 50)
+print("Stream completed.")
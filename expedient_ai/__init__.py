@@ -0,0 +1,124 @@
+"""
+Expedient AI - Python client library for the Expedient AI Chat API.
+
+See README.md for setup instructions and the example scripts for usage.
+"""
+
+__all__ = [
+    "AiohttpTransport",
+    "AsyncExpedientClient",
+    "AsyncHTTP2Transport",
+    "AsyncPipeline",
+    "AsyncReplayTransport",
+    "BLOCK",
+    "CHAT_COMPLETIONS_PATH",
+    "CaptureFile",
+    "Citation",
+    "CitationExtractor",
+    "ContentDelta",
+    "Conversation",
+    "DROP_NEWEST",
+    "DROP_OLDEST",
+    "EarlyStop",
+    "ExpedientAPIError",
+    "ExpedientClient",
+    "FAIL",
+    "Finish",
+    "HTTP11Transport",
+    "HTTP2Transport",
+    "Hedger",
+    "JSONLExporter",
+    "MODEL_CLASSES",
+    "ModelRouter",
+    "NearDuplicateCache",
+    "Pipeline",
+    "PrometheusExporter",
+    "QueueOverflow",
+    "RateLimiter",
+    "ReasoningDelta",
+    "ReplayTransport",
+    "ResponseCache",
+    "RetryPolicy",
+    "SSEDecoder",
+    "ServerSentEvent",
+    "Spinner",
+    "StreamRecorder",
+    "StreamWriter",
+    "SummarizeError",
+    "Summarizer",
+    "TraceHooks",
+    "Tracer",
+    "Usage",
+    "aiter_chat_chunks",
+    "build_payload",
+    "iter_chat_chunks",
+    "iter_events",
+]
+
+# Every name is imported from its module on first access, so importing the
+# package (e.g. for the command line) loads neither requests nor aiohttp
+_LAZY_IMPORTS = {
+    "AsyncExpedientClient": ".async_client",
+    "ResponseCache": ".cache",
+    "AsyncReplayTransport": ".capture",
+    "CaptureFile": ".capture",
+    "ReplayTransport": ".capture",
+    "StreamRecorder": ".capture",
+    "CitationExtractor": ".citations",
+    "CHAT_COMPLETIONS_PATH": ".client",
+    "ExpedientAPIError": ".client",
+    "ExpedientClient": ".client",
+    "build_payload": ".client",
+    "Conversation": ".conversation",
+    "EarlyStop": ".earlystop",
+    "Hedger": ".hedge",
+    "NearDuplicateCache": ".nearcache",
+    "AsyncPipeline": ".pipeline",
+    "BLOCK": ".pipeline",
+    "Citation": ".pipeline",
+    "ContentDelta": ".pipeline",
+    "DROP_NEWEST": ".pipeline",
+    "DROP_OLDEST": ".pipeline",
+    "FAIL": ".pipeline",
+    "Finish": ".pipeline",
+    "Pipeline": ".pipeline",
+    "QueueOverflow": ".pipeline",
+    "ReasoningDelta": ".pipeline",
+    "Usage": ".pipeline",
+    "RateLimiter": ".ratelimit",
+    "RetryPolicy": ".ratelimit",
+    "Spinner": ".render",
+    "StreamWriter": ".render",
+    "MODEL_CLASSES": ".router",
+    "ModelRouter": ".router",
+    "SSEDecoder": ".sse",
+    "ServerSentEvent": ".sse",
+    "aiter_chat_chunks": ".sse",
+    "iter_chat_chunks": ".sse",
+    "iter_events": ".sse",
+    "SummarizeError": ".summarize",
+    "Summarizer": ".summarize",
+    "JSONLExporter": ".tracing",
+    "PrometheusExporter": ".tracing",
+    "TraceHooks": ".tracing",
+    "Tracer": ".tracing",
+    "AiohttpTransport": ".transport",
+    "AsyncHTTP2Transport": ".transport",
+    "HTTP11Transport": ".transport",
+    "HTTP2Transport": ".transport",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value  # Later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
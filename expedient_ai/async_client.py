@@ -0,0 +1,333 @@
+"""
+Expedient AI Async Chat Client
+==============================
+
+asyncio counterpart of ``ExpedientClient`` built on ``aiohttp``. Every stream
+runs as a coroutine on one event loop, so thousands of concurrent completions
+need neither a thread nor a process each.
+
+    async with AsyncExpedientClient(api_endpoint, api_key) as client:
+        chunks = await client.stream("gpt-4.1", messages)
+        async for chunk in chunks:
+            ...
+
+        async for index, chunk in client.stream_many(jobs, concurrency=64):
+            ...
+"""
+
+import asyncio
+
+from .client import CHAT_COMPLETIONS_PATH, ExpedientAPIError, build_payload
+from .cache import cached_key, is_complete_stream
+from .pipeline import AsyncPipeline, aiter_stream_events
+from .ratelimit import estimate_tokens, parse_retry_after
+from .sse import aiter_chat_chunks, json_loads
+from .transport import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, AiohttpTransport
+
+# Default connection limits; 0 means unlimited (aiohttp convention)
+DEFAULT_POOL_LIMIT = 0
+DEFAULT_POOL_MAXSIZE = 0
+DEFAULT_CONCURRENCY = 16
+
+# Marks the end of one stream_many worker in the shared result queue
+_WORKER_DONE = object()
+
+
+class AsyncExpedientClient:
+    """Async chat completions client built on a shared aiohttp connection pool
+
+    The pool and timeout options configure the default ``AiohttpTransport``;
+    pass ``transport`` (e.g. an ``AsyncHTTP2Transport``) to send through
+    another.
+
+    pool_limit       -- maximum open connections in total (0 = unlimited)
+    pool_maxsize     -- maximum open connections per host (0 = unlimited)
+    connect_timeout  -- seconds allowed to establish a connection
+    read_timeout     -- seconds allowed between bytes received
+    cache            -- optional ``ResponseCache`` answering repeated requests
+    rate_limiter     -- optional ``RateLimiter`` pacing requests and tokens/min
+    retry            -- optional ``RetryPolicy`` for 429, 5xx and connection errors
+    tracer           -- optional ``Tracer`` receiving request lifecycle events
+    recorder         -- optional ``StreamRecorder`` capturing streamed bytes
+    transport        -- optional transport to send requests through
+    """
+
+    def __init__(
+        self,
+        api_endpoint,
+        api_key,
+        pool_limit=DEFAULT_POOL_LIMIT,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        session=None,
+        cache=None,
+        rate_limiter=None,
+        retry=None,
+        tracer=None,
+        recorder=None,
+        transport=None,
+    ):
+        self.api_endpoint = api_endpoint.rstrip("/")
+        self.api_full = f"{self.api_endpoint}{CHAT_COMPLETIONS_PATH}"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.tracer = tracer
+        self.recorder = recorder
+
+        if transport is None:
+            trace_configs = None
+            if tracer is not None:
+                trace_configs = [tracer.aiohttp_config()]
+            transport = AiohttpTransport(
+                pool_limit=pool_limit,
+                pool_maxsize=pool_maxsize,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                session=session,
+                trace_configs=trace_configs,
+            )
+        self.transport = transport
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def close(self):
+        """Close every pooled connection"""
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # -------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------
+
+    async def _post(self, data, trace=None):
+        limiter, retry = self.rate_limiter, self.retry
+        tokens = estimate_tokens(data) if limiter is not None else 0
+        if retry is not None:
+            retry.started()
+        attempt = 0
+        delay = None
+        while True:
+            if limiter is not None:
+                await limiter.acquire_async(tokens)
+            try:
+                return await self._send(data, trace)
+            except ExpedientAPIError as error:
+                if retry is None:
+                    raise
+                if error.retry_after and limiter is not None:
+                    limiter.pause(error.retry_after)
+                delay = retry.delay(
+                    attempt, delay, error.status_code, error.retry_after
+                )
+                if delay is None:
+                    raise
+            except self.transport.errors:
+                if retry is None:
+                    raise
+                delay = retry.delay(attempt, delay)
+                if delay is None:
+                    raise
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _send(self, data, trace=None):
+        response = await self.transport.post(self.api_full, self.headers, data, trace)
+        if trace is not None:
+            trace.headers(response.status)
+        if response.status != 200:
+            try:
+                raise ExpedientAPIError(
+                    response.status,
+                    await response.text(),
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+            finally:
+                await response.release()
+        return response
+
+    async def chat(self, model, messages, **params):
+        """Send a non-streaming request and return the decoded JSON response"""
+        data = build_payload(model, messages, stream=False, **params)
+        key = cached_key(self.cache, data)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if self.tracer is None:
+            response = await self._post(data)
+            try:
+                result = json_loads(await response.read())
+            finally:
+                await response.release()
+        else:
+            result = await self._chat_traced(model, data)
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    async def stream(self, model, messages, early_stop=None, **params):
+        """Send a streaming request and return an async iterator of SSE chunks
+
+        The request is sent when awaited, so a non-200 status raises here. The
+        connection returns to the pool once the stream reaches [DONE], and is
+        closed if the iterator is closed early or its task is cancelled. With
+        a cache, a hit replays the stored chunks without any request.
+
+        early_stop -- optional ``EarlyStop`` ending the stream (and freeing its
+                      connection) as soon as one of its conditions is met
+        """
+        data = build_payload(model, messages, stream=True, **params)
+        key = cached_key(self.cache, data)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                if early_stop is not None:
+                    return early_stop.watch(data).areplay(cached)
+                return _replay(cached)
+        watch = early_stop.watch(data) if early_stop is not None else None
+        trace = self.tracer.start(model, data) if self.tracer is not None else None
+        capture = self.recorder.capture(data) if self.recorder is not None else None
+        try:
+            response = await self._post(data, trace)
+        except Exception as error:
+            if trace is not None:
+                trace.end(error)
+            if capture is not None:
+                capture.finish(False, error)
+            raise
+        return self._iter_stream(response, key, trace, watch, capture)
+
+    async def stream_events(self, model, messages, citations=True, **params):
+        """Like ``stream``, but return an ``AsyncPipeline`` of typed events
+
+        citations -- emit a ``Citation`` event for every ``[n]`` marker
+        """
+        chunks = await self.stream(model, messages, **params)
+        return AsyncPipeline(aiter_stream_events(chunks, citations))
+
+    async def _chat_traced(self, model, data):
+        trace = self.tracer.start(model, data)
+        try:
+            response = await self._post(data, trace)
+            try:
+                body = await response.read()
+                trace.body(len(body))
+                result = json_loads(body)
+            finally:
+                await response.release()
+            trace.chunk(result)  # Picks up the finish_reason
+        except Exception as error:
+            trace.end(error)
+            raise
+        trace.end()
+        return result
+
+    async def _iter_stream(
+        self, response, key=None, trace=None, watch=None, capture=None
+    ):
+        recorded = [] if key is not None else None
+        finished = failed = False
+        byte_chunks = response.aiter_bytes()
+        if capture is not None:
+            byte_chunks = capture.aobserve(byte_chunks)
+        if watch is not None and watch.stop.timed:
+            byte_chunks = watch.aguard(byte_chunks)
+        if trace is None:
+            chunks = aiter_chat_chunks(byte_chunks)
+        else:
+            chunks = trace.aobserve_chunks(
+                aiter_chat_chunks(trace.aobserve_bytes(byte_chunks))
+            )
+        try:
+            async for chunk in chunks:
+                if recorded is not None:
+                    recorded.append(chunk)
+                yield chunk
+                if watch is not None and watch.check(chunk):
+                    break  # Abandon the rest of the answer
+            else:
+                # A deadline may also end the reads before [DONE]
+                finished = watch is None or watch.reason is None
+        except Exception as error:
+            failed = True
+            if trace is not None:
+                trace.end(error)
+            if capture is not None:
+                capture.finish(False, error)
+            raise
+        finally:
+            # Read the end of the body after [DONE] so the connection is
+            # reusable; a stream closed early or cancelled is abandoned
+            if finished:
+                await response.release()
+            else:
+                await response.close()
+            if trace is not None:
+                trace.end()  # No-op after an error
+            if watch is not None:
+                watch.finish(finished, failed)
+            if capture is not None:
+                capture.finish(finished)  # No-op after an error
+        if is_complete_stream(recorded):
+            self.cache.put(key, recorded)
+
+    async def stream_many(self, jobs, concurrency=DEFAULT_CONCURRENCY):
+        """Run many streaming requests concurrently, yielding (index, chunk)
+
+        ``jobs`` is an iterable of dicts with ``model``, ``messages`` and any
+        extra request parameters. At most ``concurrency`` streams are open at
+        once and jobs are pulled lazily, so the iterable may be a generator
+        over millions of prompts. A failed job yields its exception in place
+        of a chunk instead of cancelling the others. Closing the iterator
+        cancels every in-flight stream.
+        """
+        jobs = enumerate(jobs)
+        results = asyncio.Queue(maxsize=concurrency * 4)
+
+        async def worker():
+            for index, job in jobs:
+                try:
+                    params = dict(job)
+                    model = params.pop("model")
+                    messages = params.pop("messages")
+                    chunks = await self.stream(model, messages, **params)
+                    try:
+                        async for chunk in chunks:
+                            await results.put((index, chunk))
+                    finally:
+                        await chunks.aclose()
+                except Exception as error:
+                    await results.put((index, error))
+            await results.put(_WORKER_DONE)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        running = len(workers)
+        try:
+            while running:
+                item = await results.get()
+                if item is _WORKER_DONE:
+                    running -= 1
+                    continue
+                yield item
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _replay(chunks):
+    for chunk in chunks:
+        yield chunk
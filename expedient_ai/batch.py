@@ -0,0 +1,369 @@
+"""
+Expedient AI Batch Runner
+=========================
+
+Runs a JSONL file of prompts through the chat completions API with bounded
+concurrency and writes one JSONL result per prompt as soon as it finishes.
+
+    python -m expedient_ai.batch prompts.jsonl results.jsonl --concurrency 32
+
+Each input line is a JSON object with either ``messages`` or ``prompt``, plus
+an optional ``id``, ``model`` and any request parameters (``max_tokens``,
+``temperature``, ...). Lines are read one at a time, so the input may be far
+larger than memory.
+
+A checkpoint file (``results.jsonl.checkpoint``) is rewritten atomically while
+the job runs. If the job is killed, running the same command again resumes
+from the checkpoint instead of line one, and never repeats a finished prompt.
+
+Rate limited (429) and transient 5xx responses are retried with jittered
+backoff (``--max-retries``), and ``--requests-per-minute`` /
+``--tokens-per-minute`` pace the whole job below the gateway's limits.
+
+To spread one input over several workers, give each ``--shard I/N`` (see
+``expedient_ai.shard``); a manifest of the completed and failed ids is
+written next to the output when the run ends.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from .async_client import AsyncExpedientClient
+from .ratelimit import RateLimiter, RetryPolicy
+from .shard import OFFSET, STRATEGIES, parse_shard, plan_shard, write_manifest
+from .stats import percentile
+
+DEFAULT_MODEL = "gpt-4.1"
+DEFAULT_CONCURRENCY = 16
+DEFAULT_MAX_RETRIES = 3
+
+# Rewrite the checkpoint after this many completions or seconds, whichever first
+CHECKPOINT_EVERY = 100
+CHECKPOINT_INTERVAL = 2.0
+
+
+class ShardMismatch(ValueError):
+    """The output file was written by a run over another shard"""
+
+
+def _checkpoint_path(output_path):
+    return f"{output_path}.checkpoint"
+
+
+def load_checkpoint(output_path):
+    """Return the saved checkpoint dict, or None when starting fresh"""
+    try:
+        with open(_checkpoint_path(output_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(output_path, checkpoint):
+    """Atomically replace the checkpoint file"""
+    path = _checkpoint_path(output_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _truncate_partial_line(output_path):
+    """Drop a half-written last line left behind by a killed job"""
+    with open(output_path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        position = size
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            block = f.read(step)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position != size:
+            f.truncate(position)
+        return position
+
+
+def _completed_lines(output_path, offset):
+    """Line numbers already written to the output at or after ``offset``"""
+    done = set()
+    with open(output_path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            done.add(json.loads(raw)["line"])
+    return done
+
+
+class BatchStats:
+    """Counters and latencies collected while a batch runs"""
+
+    def __init__(self):
+        self.ok = 0
+        self.errors = 0
+        self.skipped = 0
+        self.latencies = []
+        self.started = time.perf_counter()
+
+    def report(self, file=sys.stdout):
+        elapsed = time.perf_counter() - self.started
+        completed = self.ok + self.errors
+        latencies = sorted(self.latencies)
+        print("=" * 60, file=file)
+        print(f"Completed: {completed} ({self.ok} ok, {self.errors} errors)", file=file)
+        if self.skipped:
+            print(f"Skipped (already done): {self.skipped}", file=file)
+        print(f"Elapsed: {elapsed:.2f} s", file=file)
+        print(
+            f"Throughput: {completed / elapsed if elapsed else 0:.2f} requests/s",
+            file=file,
+        )
+        if latencies:
+            print(
+                "Latency (ms): "
+                f"p50 {percentile(latencies, 0.50) * 1000:.1f}  "
+                f"p90 {percentile(latencies, 0.90) * 1000:.1f}  "
+                f"p99 {percentile(latencies, 0.99) * 1000:.1f}  "
+                f"max {latencies[-1] * 1000:.1f}",
+                file=file,
+            )
+        print("=" * 60, file=file)
+
+
+def _build_request(record, defaults):
+    params = dict(defaults)
+    params.update(record)
+    params.pop("id", None)
+    prompt = params.pop("prompt", None)
+    if "messages" not in params:
+        if prompt is None:
+            raise ValueError("record needs 'messages' or 'prompt'")
+        params["messages"] = [{"role": "user", "content": prompt}]
+    model = params.pop("model")
+    messages = params.pop("messages")
+    return model, messages, params
+
+
+async def run_batch(
+    client,
+    input_path,
+    output_path,
+    concurrency=DEFAULT_CONCURRENCY,
+    defaults=None,
+    stats=None,
+    shard=None,
+):
+    """Process ``input_path`` into ``output_path``, resuming from a checkpoint
+
+    Output records carry the input ``line`` number, the record ``id`` (or the
+    line number when absent), ``status`` (``ok`` or ``error``), the answer
+    ``content`` and ``usage``, or the ``error`` and ``status_code``. With a
+    ``Shard``, only the records it owns are processed.
+    """
+    defaults = {"model": DEFAULT_MODEL, **(defaults or {})}
+    stats = stats or BatchStats()
+    spec = shard.spec() if shard is not None else None
+
+    # Without a checkpoint, any existing output is scanned from the start
+    if not os.path.exists(output_path):
+        open(output_path, "wb").close()
+    checkpoint = load_checkpoint(output_path) or {
+        "line": shard.first_line if shard is not None else 0,
+        "input_offset": shard.start if shard is not None else 0,
+        "output_offset": 0,
+        "shard": spec,
+    }
+    if checkpoint.get("shard") != spec:
+        raise ShardMismatch(
+            f"{output_path} was written for shard {checkpoint.get('shard')}, "
+            f"not {spec}; use another output file"
+        )
+    output_size = _truncate_partial_line(output_path)
+    done = _completed_lines(output_path, checkpoint["output_offset"])
+
+    # line number -> (input offset, output size when dispatched), in line order.
+    # The first entry is the oldest unfinished line: the safe resume point.
+    inflight = {}
+    state = {
+        "next_line": checkpoint["line"],
+        "next_offset": checkpoint["input_offset"],
+        "output_size": output_size,
+    }
+    since_checkpoint = {"count": 0, "time": time.monotonic()}
+
+    def current_checkpoint():
+        if inflight:
+            line, (input_offset, output_offset) = next(iter(inflight.items()))
+        else:
+            line, input_offset = state["next_line"], state["next_offset"]
+            output_offset = state["output_size"]
+        return {
+            "line": line,
+            "input_offset": input_offset,
+            "output_offset": output_offset,
+            "shard": spec,
+        }
+
+    end = shard.end if shard is not None else None
+
+    def read_records(f):
+        f.seek(checkpoint["input_offset"])
+        for raw in f:
+            line = state["next_line"]
+            offset = state["next_offset"]
+            if end is not None and offset >= end:
+                break  # The next shard's range starts here
+            state["next_line"] += 1
+            state["next_offset"] += len(raw)
+            if not raw.strip():
+                continue
+            if shard is not None and not shard.owns(line, raw):
+                continue
+            if line in done:
+                stats.skipped += 1
+                continue
+            inflight[line] = (offset, state["output_size"])
+            yield line, raw
+
+    with open(input_path, "rb") as input_file, open(output_path, "ab") as output_file:
+        records = read_records(input_file)
+
+        def write_result(line, result):
+            encoded = (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+            output_file.write(encoded)
+            state["output_size"] += len(encoded)
+            del inflight[line]
+
+            since_checkpoint["count"] += 1
+            now = time.monotonic()
+            if (
+                since_checkpoint["count"] >= CHECKPOINT_EVERY
+                or now - since_checkpoint["time"] >= CHECKPOINT_INTERVAL
+            ):
+                output_file.flush()
+                save_checkpoint(output_path, current_checkpoint())
+                since_checkpoint["count"] = 0
+                since_checkpoint["time"] = now
+
+        async def worker():
+            for line, raw in records:
+                record_id = line
+                start = time.perf_counter()
+                try:
+                    record = json.loads(raw)
+                    record_id = record.get("id", line)
+                    model, messages, params = _build_request(record, defaults)
+                    response = await client.chat(model, messages, **params)
+                    choice = response["choices"][0]
+                    result = {
+                        "line": line,
+                        "id": record_id,
+                        "status": "ok",
+                        "model": model,
+                        "content": choice["message"].get("content"),
+                        "finish_reason": choice.get("finish_reason"),
+                        "usage": response.get("usage"),
+                    }
+                    stats.ok += 1
+                except Exception as error:
+                    result = {
+                        "line": line,
+                        "id": record_id,
+                        "status": "error",
+                        "error": str(error),
+                        "status_code": getattr(error, "status_code", None),
+                    }
+                    stats.errors += 1
+                latency = time.perf_counter() - start
+                stats.latencies.append(latency)
+                result["latency_ms"] = round(latency * 1000, 3)
+                write_result(line, result)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        output_file.flush()
+        save_checkpoint(output_path, current_checkpoint())
+
+    write_manifest(output_path, input_path, shard)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a JSONL file of prompts through the Expedient AI Chat API"
+    )
+    parser.add_argument("input", help="input JSONL file (one request per line)")
+    parser.add_argument("output", help="output JSONL file (appended, resumable)")
+    parser.add_argument("--url", default=os.environ.get("EXPEDIENT_API_URL"))
+    parser.add_argument("--api-key", default=os.environ.get("EXPEDIENT_API_KEY"))
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--temperature", type=float)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--requests-per-minute", type=float)
+    parser.add_argument("--tokens-per-minute", type=float)
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+    parser.add_argument("--shard", help="process only shard I of N (I/N)")
+    parser.add_argument("--shard-by", choices=STRATEGIES, default=OFFSET)
+    args = parser.parse_args(argv)
+
+    if not args.url or not args.api_key:
+        parser.error("set --url/--api-key or EXPEDIENT_API_URL/EXPEDIENT_API_KEY")
+    shard = None
+    if args.shard:
+        try:
+            index, count = parse_shard(args.shard)
+        except ValueError as error:
+            parser.error(str(error))
+        shard = plan_shard(args.input, index, count, args.shard_by)
+
+    defaults = {"model": args.model}
+    if args.max_tokens is not None:
+        defaults["max_tokens"] = args.max_tokens
+    if args.temperature is not None:
+        defaults["temperature"] = args.temperature
+
+    limiter = None
+    if args.requests_per_minute or args.tokens_per_minute:
+        limiter = RateLimiter(args.requests_per_minute, args.tokens_per_minute)
+    retry = RetryPolicy(max_retries=args.max_retries) if args.max_retries else None
+
+    async def run():
+        async with AsyncExpedientClient(
+            args.url,
+            args.api_key,
+            pool_maxsize=args.concurrency,
+            rate_limiter=limiter,
+            retry=retry,
+        ) as client:
+            return await run_batch(
+                client,
+                args.input,
+                args.output,
+                args.concurrency,
+                defaults,
+                shard=shard,
+            )
+
+    try:
+        stats = asyncio.run(run())
+    except ShardMismatch as error:
+        parser.error(str(error))
+    stats.report()
+    if limiter is not None:
+        print(f"Rate limiter: {limiter.stats()}")
+    if retry is not None:
+        print(f"Retries: {retry.stats()}")
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
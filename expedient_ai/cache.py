@@ -0,0 +1,326 @@
+"""
+Expedient AI Response Cache
+===========================
+
+Opt-in, content-addressed cache for chat completions. Requests are keyed on a
+SHA-256 of the canonical JSON request body (the same ``data`` dict the example
+scripts build), so identical requests are answered locally instead of paying
+full model latency and cost again.
+
+Two tiers:
+
+- memory: an LRU of encoded entries, bounded by entry count and bytes
+- disk (optional): one file per key under ``directory``, bounded in total
+  bytes with least-recently-used eviction, written atomically (temp file +
+  rename) so several processes can share the same directory
+
+Entries older than ``ttl`` seconds are ignored and removed, on a lookup or
+when the disk tier is trimmed. By default only
+deterministic requests (``temperature`` of 0) are cached; pass ``force=True``
+to cache regardless. Streaming responses are stored as their list of chunks
+and replayed as a normal chunk stream on a hit.
+
+    cache = ResponseCache(directory=".expedient-cache", ttl=24 * 3600)
+    client = ExpedientClient(api_endpoint, api_key, cache=cache)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MEMORY_ENTRIES = 1024
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 1024 * 1024 * 1024
+
+# Disk usage is trimmed to this fraction of the limit when it is exceeded
+DISK_LOW_WATER = 0.9
+
+
+def request_key(data):
+    """SHA-256 hex digest of the canonical JSON encoding of a request body"""
+    canonical = json.dumps(
+        data, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def cached_key(cache, data):
+    """Cache key for a request body, or None when it must not be cached"""
+    if cache is None or not cache.cacheable(data):
+        return None
+    return cache.key(data)
+
+
+def is_complete_stream(chunks):
+    """Whether recorded stream chunks end a completion (truncated ones don't)"""
+    if not chunks:
+        return False
+    for chunk in reversed(chunks):
+        for choice in chunk.get("choices") or ():
+            if choice.get("finish_reason"):
+                return True
+    return False
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + optional disk) cache of chat completion results
+
+    directory       -- disk tier location; None keeps the cache in memory only
+    ttl             -- seconds an entry stays valid; None never expires
+    memory_entries  -- maximum entries kept in memory
+    memory_bytes    -- maximum encoded bytes kept in memory
+    disk_bytes      -- maximum total bytes of the disk tier
+    force           -- cache requests even when temperature > 0
+    """
+
+    def __init__(
+        self,
+        directory=None,
+        ttl=None,
+        memory_entries=DEFAULT_MEMORY_ENTRIES,
+        memory_bytes=DEFAULT_MEMORY_BYTES,
+        disk_bytes=DEFAULT_DISK_BYTES,
+        force=False,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.force = force
+
+        self._memory = OrderedDict()  # key -> (created, encoded payload)
+        self._memory_size = 0
+        self._disk_size = None  # Computed lazily by scanning the directory
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def cacheable(self, data):
+        """Whether a request body may be served from / stored in the cache"""
+        if self.force or data.get("temperature", 1.0) <= 0:
+            return True
+        with self._lock:
+            self.skipped += 1
+        return False
+
+    key = staticmethod(request_key)
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, payload = entry
+                if self._fresh(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    self.bytes_saved += len(payload)
+                    return json.loads(payload)
+                self._memory_pop(key)
+
+        entry = self._disk_read(key, now)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        created, payload = entry
+        with self._lock:
+            self._memory_put(key, created, payload)
+            self.hits += 1
+            self.disk_hits += 1
+            self.bytes_saved += len(payload)
+        return json.loads(payload)
+
+    def put(self, key, value):
+        """Store a JSON-serializable value under ``key`` in every tier"""
+        payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        created = time.time()
+        with self._lock:
+            self._memory_put(key, created, payload)
+            self.stores += 1
+        if self.directory is not None:
+            self._disk_write(key, created, payload)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        for path, _ in self._disk_entries():
+            _remove(path)
+        with self._lock:
+            self._disk_size = 0
+
+    def stats(self):
+        """Counters as a dict, including the overall hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "bytes_saved": self.bytes_saved,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    # -------------------------------------------------------------------------
+    # Memory tier
+    # -------------------------------------------------------------------------
+
+    def _fresh(self, created, now):
+        return self.ttl is None or now - created < self.ttl
+
+    def _memory_put(self, key, created, payload):
+        if key in self._memory:
+            self._memory_pop(key)
+        if len(payload) > self.memory_bytes:
+            return
+        self._memory[key] = (created, payload)
+        self._memory_size += len(payload)
+        while (
+            len(self._memory) > self.memory_entries
+            or self._memory_size > self.memory_bytes
+        ):
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.evictions += 1
+
+    def _memory_pop(self, key):
+        _, payload = self._memory.pop(key)
+        self._memory_size -= len(payload)
+
+    # -------------------------------------------------------------------------
+    # Disk tier
+    # -------------------------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _disk_read(self, key, now):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                header = f.readline()
+                payload = f.read()
+            created = float(header)
+        except (OSError, ValueError):
+            return None
+        if not self._fresh(created, now):
+            _remove(path)
+            with self._lock:
+                if self._disk_size is not None:
+                    self._disk_size -= len(header) + len(payload)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for LRU eviction
+        except OSError:
+            pass
+        return created, payload
+
+    def _disk_write(self, key, created, payload):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"%r\n" % created)
+            f.write(payload)
+            size = f.tell()
+        try:
+            replaced = os.path.getsize(path)  # Overwriting an existing entry
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)  # Atomic, even with concurrent writers
+
+        with self._lock:
+            total = self._disk_size
+            if total is not None:
+                total = self._disk_size = total + size - replaced
+        if total is None:
+            total = sum(size for _, size in self._disk_entries())
+            with self._lock:
+                self._disk_size = total
+        if total > self.disk_bytes:
+            self._disk_evict()
+
+    def _disk_entries(self):
+        if self.directory is None:
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue  # Another writer's file that is not renamed yet
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Removed by another process meanwhile
+                yield entry.path, stat.st_size
+
+    def _disk_evict(self):
+        # Rescan so the size is exact even when other processes share the
+        # directory, then drop expired and least recently used entries. The
+        # mtime is refreshed on every hit, so expiry is read from the header
+        now = time.time()
+        entries = []
+        for path, size in self._disk_entries():
+            try:
+                mtime = os.path.getmtime(path)
+                expired = self.ttl is not None and not self._fresh(
+                    _read_created(path), now
+                )
+            except OSError:
+                continue
+            except ValueError:
+                expired = True  # Unreadable header: never served, so drop it
+            entries.append((mtime, path, size, expired))
+        entries.sort()
+        total = sum(size for _, _, size, _ in entries)
+        target = self.disk_bytes * DISK_LOW_WATER
+        evicted = 0
+        for _, path, size, expired in entries:
+            if total <= target and not expired:
+                continue  # Kept; a later entry may still have expired
+            _remove(path)
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_size = total
+            self.evictions += evicted
+
+
+def _read_created(path):
+    with open(path, "rb") as f:
+        return float(f.readline())
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
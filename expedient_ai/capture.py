@@ -0,0 +1,556 @@
+"""
+Stream Capture and Replay
+=========================
+
+Records the raw SSE bytes of streamed responses, exactly as the transport
+read them, with the monotonic time of every read, and plays them back
+through the client later. Captures keep the real shape of a stream (read
+sizes, time to first byte, gaps and reasoning pauses, citation bursts), so
+parsing and rendering can be tuned and regression-tested offline and
+deterministically, without an API key or a gateway.
+
+    recorder = StreamRecorder("captures.sse")
+    with ExpedientClient(api_endpoint, api_key, recorder=recorder) as client:
+        for chunk in client.stream("o4-mini", messages):
+            ...
+    recorder.close()
+
+    with CaptureFile("captures.sse") as capture:
+        transport = ReplayTransport(capture, speed=None)  # As fast as possible
+        client = ExpedientClient("http://replay", "unused", transport=transport)
+        for chunk in client.stream("o4-mini", messages):
+            ...
+
+``speed`` replays at the recorded pace (1.0), scaled (2.0 is twice as fast)
+or with no delays at all (None).
+
+The file is append-only and read through ``mmap``. It starts with an 8-byte
+magic and a version, followed by records of a fixed 20-byte header (kind,
+stream id, nanoseconds since the request was sent, payload length) and a
+payload: the request settings for a stream start (model and parameters, but
+not the messages), the bytes of one read, or how the stream ended. Streams
+recorded concurrently interleave by id. A record cut short by a crash is
+ignored when reading and dropped before appending.
+
+    python -m expedient_ai.capture info captures.sse
+    python -m expedient_ai.capture dump captures.sse --stream 3 > body.sse
+"""
+
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+MAGIC = b"EXPSSE\x00\x00"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sHH")  # magic, version, reserved
+RECORD = struct.Struct("<BxxxIQI")  # kind, stream id, time (ns), payload length
+
+# Record kinds
+START = 1  # JSON request settings
+DATA = 2  # Raw bytes of one read
+END = 3  # JSON status
+
+# How a recorded stream ended
+DONE = "done"  # Read to the end of the body
+CLOSED = "closed"  # Abandoned early (closed iterator, early stop)
+FAILED = "error"  # Request or read failed
+
+DEFAULT_BUFFER_SIZE = 256 * 1024
+
+
+def _scan(buffer, position):
+    """(kind, stream id, time, payload offset, length) of every whole record
+
+    Stops at the first record that is cut short or unreadable.
+    """
+    size = len(buffer)
+    while position + RECORD.size <= size:
+        kind, stream_id, time_ns, length = RECORD.unpack_from(buffer, position)
+        payload = position + RECORD.size
+        if payload + length > size or kind not in (START, DATA, END):
+            return
+        yield kind, stream_id, time_ns, payload, length
+        position = payload + length
+
+
+def _check_header(buffer, path):
+    if len(buffer) < FILE_HEADER.size:
+        raise ValueError(f"{path} is not a stream capture (too short)")
+    magic, version, _ = FILE_HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a stream capture")
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported capture version {version}")
+
+
+def _end_of_records(path):
+    """(next stream id, offset after the last whole record) of a capture"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            _check_header(buffer, path)
+            next_id = 0
+            end = FILE_HEADER.size
+            for kind, stream_id, _, payload, length in _scan(buffer, end):
+                next_id = max(next_id, stream_id + 1)
+                end = payload + length
+            return next_id, end
+
+
+# -----------------------------------------------------------------------------
+# Recording
+# -----------------------------------------------------------------------------
+
+
+class StreamRecorder:
+    """Appends the streams of a client to a capture file (thread-safe)
+
+    path         -- capture file, created or appended to
+    buffer_size  -- bytes buffered between writes; every stream end flushes
+    """
+
+    def __init__(self, path, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._streams = self._records = self._bytes = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._next_id, end = _end_of_records(path)
+            if end < os.path.getsize(path):
+                os.truncate(path, end)  # Drop a record cut short by a crash
+            self._file = open(path, "ab", buffering=buffer_size)
+        else:
+            self._next_id = 0
+            self._file = open(path, "wb", buffering=buffer_size)
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+
+    def capture(self, data):
+        """Start recording the stream of request ``data``; returns a ``Capture``"""
+        settings = {k: v for k, v in data.items() if k not in ("messages", "stream")}
+        meta = {
+            "started": time.time(),
+            "messages": len(data.get("messages") or ()),
+            **settings,
+        }
+        with self._lock:
+            stream_id = self._next_id
+            self._next_id += 1
+            self._streams += 1
+        capture = Capture(self, stream_id)
+        self.write(START, stream_id, 0, json.dumps(meta).encode("utf-8"))
+        return capture
+
+    def write(self, kind, stream_id, time_ns, payload):
+        header = RECORD.pack(kind, stream_id, time_ns, len(payload))
+        with self._lock:
+            if self._file is None:
+                return  # Closed while a stream was still open
+            self._file.write(header + payload)
+            self._records += 1
+            if kind == DATA:
+                self._bytes += len(payload)
+            elif kind == END:
+                self._file.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "streams": self._streams,
+                "records": self._records,
+                "bytes": self._bytes,
+            }
+
+
+class Capture:
+    """Recording of one stream, started by ``StreamRecorder.capture``"""
+
+    def __init__(self, recorder, stream_id):
+        self.recorder = recorder
+        self.stream_id = stream_id
+        self.status = None
+        self._start = time.monotonic_ns()
+
+    def observe(self, byte_chunks):
+        """Pass raw response chunks through, recording each one"""
+        for raw in byte_chunks:
+            self.data(raw)
+            yield raw
+
+    async def aobserve(self, byte_chunks):
+        async for raw in byte_chunks:
+            self.data(raw)
+            yield raw
+
+    def data(self, raw):
+        elapsed = time.monotonic_ns() - self._start
+        self.recorder.write(DATA, self.stream_id, elapsed, bytes(raw))
+
+    def finish(self, finished, error=None):
+        """Record how the stream ended; only the first call counts"""
+        if self.status is not None:
+            return
+        self.status = FAILED if error is not None else DONE if finished else CLOSED
+        end = {"status": self.status}
+        if error is not None:
+            end["error"] = f"{type(error).__name__}: {error}"
+        elapsed = time.monotonic_ns() - self._start
+        self.recorder.write(
+            END, self.stream_id, elapsed, json.dumps(end).encode("utf-8")
+        )
+
+
+# -----------------------------------------------------------------------------
+# Reading
+# -----------------------------------------------------------------------------
+
+
+class CaptureFile:
+    """Memory-mapped capture file; iterate it for its ``CapturedStream`` list
+
+    Streams are in the order they started. Their chunks are read from the
+    mapping on demand, so large captures do not have to fit in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self._file.close()
+            raise ValueError(f"{path} is not a stream capture (empty)") from None
+        _check_header(self._map, path)
+
+        self.streams = []
+        by_id = {}
+        end = FILE_HEADER.size
+        for kind, stream_id, time_ns, payload, length in _scan(self._map, end):
+            end = payload + length
+            if kind == START:
+                meta = json.loads(self._map[payload:end])
+                stream = by_id[stream_id] = CapturedStream(self, stream_id, meta)
+                self.streams.append(stream)
+                continue
+            stream = by_id.get(stream_id)
+            if stream is None:
+                continue  # Its start was lost (e.g. a file cut at the front)
+            if kind == DATA:
+                stream.times.append(time_ns)
+                stream.offsets.append(payload)
+                stream.lengths.append(length)
+            else:
+                stream.end = json.loads(self._map[payload:end])
+                stream.end_ns = time_ns
+        self.truncated = end < len(self._map)
+
+    def __iter__(self):
+        return iter(self.streams)
+
+    def __len__(self):
+        return len(self.streams)
+
+    def __getitem__(self, index):
+        return self.streams[index]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CapturedStream:
+    """One recorded response stream
+
+    id      -- stream id within the capture file
+    meta    -- request settings (``model``, parameters, ``started`` wall time)
+    end     -- ``{"status": ...}`` of the stream, or None if it never ended
+    times   -- nanoseconds from sending the request to each read
+    """
+
+    def __init__(self, capture, stream_id, meta):
+        self.capture = capture
+        self.id = stream_id
+        self.meta = meta
+        self.end = None
+        self.end_ns = None
+        self.times = array("Q")
+        self.offsets = array("Q")
+        self.lengths = array("I")
+
+    @property
+    def model(self):
+        return self.meta.get("model")
+
+    @property
+    def status(self):
+        return self.end["status"] if self.end is not None else None
+
+    @property
+    def size(self):
+        return sum(self.lengths)
+
+    @property
+    def ttfb(self):
+        """Seconds from the request to the first byte, or None"""
+        return self.times[0] / 1e9 if self.times else None
+
+    @property
+    def duration(self):
+        """Seconds from the request to the end of the stream"""
+        last = self.end_ns if self.end_ns is not None else max(self.times, default=0)
+        return last / 1e9
+
+    def __len__(self):
+        return len(self.times)
+
+    def chunk(self, index):
+        offset = self.offsets[index]
+        return self.capture._map[offset : offset + self.lengths[index]]
+
+    def chunks(self):
+        """Bytes of every read, in order"""
+        for index in range(len(self.times)):
+            yield self.chunk(index)
+
+    def body(self):
+        return b"".join(self.chunks())
+
+    def gaps(self):
+        """Seconds between consecutive reads"""
+        times = self.times
+        return [(times[i] - times[i - 1]) / 1e9 for i in range(1, len(times))]
+
+    def replay(self, speed=1.0, start=None, read_timeout=None):
+        """Yield the reads at the recorded pace divided by ``speed``
+
+        speed         -- 1.0 as recorded, 2.0 twice as fast, None no delays
+        start         -- ``time.monotonic()`` the request was sent at (now)
+        read_timeout  -- callable returning the current read timeout or None;
+                         a longer wait raises ``TimeoutError`` like a socket
+        """
+        scale = _scale(speed)
+        start = time.monotonic() if start is None else start
+        for index in range(len(self.times)):
+            if scale:
+                delay = start + self.times[index] * scale - time.monotonic()
+                if delay > 0:
+                    timeout = read_timeout() if read_timeout is not None else None
+                    if timeout is not None and delay > timeout:
+                        time.sleep(max(timeout, 0))
+                        raise TimeoutError("replayed read timed out")
+                    time.sleep(delay)
+            yield self.chunk(index)
+
+    async def areplay(self, speed=1.0, start=None):
+        """Async ``replay``"""
+        scale = _scale(speed)
+        start = time.monotonic() if start is None else start
+        for index in range(len(self.times)):
+            if scale:
+                delay = start + self.times[index] * scale - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield self.chunk(index)
+
+    def __repr__(self):
+        return (
+            f"CapturedStream({self.id}, model={self.model!r}, "
+            f"reads={len(self)}, status={self.status!r})"
+        )
+
+
+def _scale(speed):
+    """Seconds of replay per recorded nanosecond, or None for no delays"""
+    if not speed or speed == float("inf"):
+        return None
+    if speed < 0:
+        raise ValueError("speed must be positive (or None for no delays)")
+    return 1e-9 / speed
+
+
+# -----------------------------------------------------------------------------
+# Replay transports
+# -----------------------------------------------------------------------------
+
+
+def _replayable(streams):
+    streams = [stream for stream in streams if len(stream)]
+    if not streams:
+        raise ValueError("no recorded stream with data to replay")
+    return streams
+
+
+class ReplayTransport:
+    """Transport answering every streaming request with a recorded stream
+
+    Requests get the recorded streams in turn, starting over after the last;
+    filter them first to replay one model only. The request itself is not
+    looked at.
+
+    streams  -- ``CaptureFile`` or iterable of ``CapturedStream``
+    speed    -- 1.0 as recorded, 2.0 twice as fast, None no delays
+    """
+
+    errors = (ConnectionError, TimeoutError)
+
+    def __init__(self, streams, speed=1.0):
+        self.streams = _replayable(streams)
+        self.speed = speed
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def next_stream(self):
+        with self._lock:
+            stream = self.streams[self.requests % len(self.streams)]
+            self.requests += 1
+        return stream
+
+    def post(self, url, headers, data, stream=False, trace=None):
+        """Returns a ``ReplayResponse`` for the next recorded stream"""
+        return ReplayResponse(self.next_stream(), self.speed)
+
+    def close(self):
+        pass
+
+
+class ReplayResponse:
+    """Response of a ``ReplayTransport``"""
+
+    status = 200
+
+    def __init__(self, stream, speed):
+        self.stream = stream
+        self.speed = speed
+        self.headers = {"Content-Type": "text/event-stream"}
+        self._start = time.monotonic()
+        self._read_timeout = None
+
+    def text(self):
+        return self.read().decode("utf-8")
+
+    def read(self):
+        return self.stream.body()
+
+    def iter_bytes(self):
+        return self.stream.replay(self.speed, self._start, self._get_read_timeout)
+
+    def set_read_timeout(self, seconds):
+        self._read_timeout = seconds
+
+    def _get_read_timeout(self):
+        return self._read_timeout
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncReplayTransport(ReplayTransport):
+    """``ReplayTransport`` for ``AsyncExpedientClient``"""
+
+    errors = (ConnectionError, asyncio.TimeoutError)
+
+    async def post(self, url, headers, data, trace=None):
+        """Returns an ``AsyncReplayResponse`` for the next recorded stream"""
+        return AsyncReplayResponse(self.next_stream(), self.speed)
+
+    async def close(self):
+        pass
+
+
+class AsyncReplayResponse(ReplayResponse):
+    """Response of an ``AsyncReplayTransport``"""
+
+    async def text(self):
+        return self.stream.body().decode("utf-8")
+
+    async def read(self):
+        return self.stream.body()
+
+    def aiter_bytes(self):
+        return self.stream.areplay(self.speed, self._start)
+
+    async def release(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+# -----------------------------------------------------------------------------
+# Command line
+# -----------------------------------------------------------------------------
+
+
+def describe(stream):
+    """One-line summary of a recorded stream"""
+    gaps = stream.gaps()
+    ttfb = f"{stream.ttfb * 1000:.1f}" if stream.ttfb is not None else "-"
+    max_gap = f"{max(gaps) * 1000:.1f}" if gaps else "-"
+    return (
+        f"{stream.id:>6}  {str(stream.model):<32} {str(stream.status):<7}"
+        f" {len(stream):>6} reads {stream.size:>9} B"
+        f"  ttfb {ttfb:>8} ms  max gap {max_gap:>8} ms"
+        f"  {stream.duration:8.2f} s"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect stream capture files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="list the streams of a capture")
+    info.add_argument("capture")
+    dump = commands.add_parser("dump", help="write the raw body of one stream")
+    dump.add_argument("capture")
+    dump.add_argument("--stream", type=int, required=True, help="stream id")
+    args = parser.parse_args(argv)
+
+    with CaptureFile(args.capture) as capture:
+        if args.command == "info":
+            for stream in capture:
+                print(describe(stream))
+            reads = sum(len(stream) for stream in capture)
+            print(f"{len(capture)} streams, {reads} reads")
+            if capture.truncated:
+                print("Warning: the last record is cut short", file=sys.stderr)
+            return 0
+
+        for stream in capture:
+            if stream.id == args.stream:
+                sys.stdout.buffer.write(stream.body())
+                return 0
+        print(f"No stream {args.stream} in {args.capture}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
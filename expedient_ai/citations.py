@@ -0,0 +1,103 @@
+"""
+Streaming Citation Extraction
+=============================
+
+Finds ``[n]`` citation markers in a completion while it streams. Each content
+delta is scanned once, together with at most a few held-back characters when
+a marker such as ``[12]`` is split across chunks, so the cost per delta is
+proportional to the delta and not to the answer so far.
+
+The extractor keeps a live index of citation number -> character offsets of
+its markers, and the ``citations`` (source URLs) and ``search_results``
+metadata that Perplexity models send alongside the deltas. The text itself is
+kept as a list of deltas (joined only on request), or not at all with
+``keep_text=False`` when only the index is needed.
+
+    extractor = CitationExtractor()
+    for chunk in client.stream("perplexity/sonar-pro", messages):
+        for number, offset in extractor.feed_chunk(chunk):
+            ...  # a marker for source ``number`` starts at ``offset``
+    print(extractor.numbers(), extractor.source(1))
+"""
+
+import re
+
+# Longest citation number recognised; bounds the text held back between deltas
+MAX_CITATION_DIGITS = 4
+
+_MARKER = re.compile(r"\[(\d{1,%d})\]" % MAX_CITATION_DIGITS)
+_PARTIAL_MARKER = re.compile(r"\[\d{0,%d}\Z" % MAX_CITATION_DIGITS)
+
+
+class CitationExtractor:
+    """Incremental ``[n]`` citation index over streamed content deltas
+
+    keep_text -- keep the deltas so ``text()`` can rebuild the answer
+    """
+
+    def __init__(self, keep_text=True):
+        self.keep_text = keep_text
+        self.chunks = []  # Content deltas as received
+        self.length = 0  # Characters of content seen so far
+        self.index = {}  # Citation number -> offsets of its "[" in the text
+        self.sources = []  # Source URLs from the "citations" field
+        self.search_results = []  # Source details from "search_results"
+        self._pending = ""  # Unfinished marker at the end of the last delta
+
+    def feed(self, content):
+        """Consume one content delta and return the (number, offset) it completed"""
+        if self.keep_text:
+            self.chunks.append(content)
+        pending = self._pending
+        start = self.length - len(pending)  # Offset of ``text`` in the answer
+        self.length += len(content)
+
+        text = pending + content if pending else content
+        if "[" not in text:
+            self._pending = ""
+            return []
+
+        found = []
+        for match in _MARKER.finditer(text):
+            number = int(match.group(1))
+            offset = start + match.start()
+            self.index.setdefault(number, []).append(offset)
+            found.append((number, offset))
+
+        # Hold back a trailing "[", "[1", ... that the next delta may complete
+        tail = text.rfind("[", -MAX_CITATION_DIGITS - 1)
+        if tail != -1 and _PARTIAL_MARKER.match(text, tail):
+            self._pending = text[tail:]
+        else:
+            self._pending = ""
+        return found
+
+    def feed_chunk(self, chunk):
+        """Consume one decoded stream chunk: its content delta and source metadata"""
+        citations = chunk.get("citations")
+        if citations:
+            self.sources = citations
+        search_results = chunk.get("search_results")
+        if search_results:
+            self.search_results = search_results
+
+        choices = chunk.get("choices")
+        if choices:
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                return self.feed(content)
+        return []
+
+    def numbers(self):
+        """Distinct citation numbers found so far, in ascending order"""
+        return sorted(self.index)
+
+    def source(self, number):
+        """Source URL for citation ``number`` (1-based), if the model sent one"""
+        if 1 <= number <= len(self.sources):
+            return self.sources[number - 1]
+        return None
+
+    def text(self):
+        """Content received so far (requires ``keep_text``)"""
+        return "".join(self.chunks)
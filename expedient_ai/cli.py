@@ -0,0 +1,419 @@
+"""
+Command Line Interface
+======================
+
+One entry point for the everyday tasks, configured from the environment or a
+config file instead of editing the key and URL into a script:
+
+    python -m expedient_ai chat "Explain the benefits of AI in business."
+    python -m expedient_ai stream -m claude-sonnet-4-20250514 "Write a haiku"
+    python -m expedient_ai reason "Which strategy should they choose and why?"
+    python -m expedient_ai cite "Latest developments in fusion energy"
+    echo "Summarize: ..." | python -m expedient_ai stream -
+    python -m expedient_ai summarize annual-report.txt -i "Focus on risks."
+    python -m expedient_ai batch prompts.jsonl results.jsonl --concurrency 32
+
+Settings are taken from command-line options, then the environment
+(``EXPEDIENT_API_URL``, ``EXPEDIENT_API_KEY``, ``EXPEDIENT_MODEL``,
+``EXPEDIENT_SOCKET``), then a JSON config file (``EXPEDIENT_CONFIG``, by
+default ``~/.config/expedient/config.json``) with the keys ``url``,
+``api_key``, ``model``, ``socket`` and ``read_timeout``.
+
+Start-up only imports what the subcommand needs: the HTTP stack is loaded
+when this process sends a request itself. Shell loops that call the CLI once
+per prompt can skip even that by starting a daemon, a warm process that keeps
+its connection pool open; while its socket exists, the other subcommands
+send their request to it and only print the answer. A daemon started with
+another URL or API key turns the request away, and it is sent from here:
+
+    python -m expedient_ai daemon &
+    for p in "What is AI?" "What is ML?"; do python -m expedient_ai chat "$p"; done
+    python -m expedient_ai daemon --stop
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+
+DEFAULT_MODEL = "gpt-4.1"
+DEFAULT_REASONING_MODEL = "o4-mini"
+DEFAULT_CITATION_MODEL = "perplexity/sonar-pro"
+DEFAULT_READ_TIMEOUT = 180
+
+CONFIG_KEYS = ("url", "api_key", "model", "socket", "read_timeout")
+ENVIRONMENT = {
+    "url": "EXPEDIENT_API_URL",
+    "api_key": "EXPEDIENT_API_KEY",
+    "model": "EXPEDIENT_MODEL",
+    "socket": "EXPEDIENT_SOCKET",
+}
+
+# Exit statuses
+EXIT_OK = 0
+EXIT_ERROR = 1  # The request failed
+EXIT_USAGE = 2
+
+
+def config_path():
+    """Path of the JSON config file"""
+    path = os.environ.get("EXPEDIENT_CONFIG")
+    if path:
+        return path
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(
+        os.path.expanduser("~"), ".config"
+    )
+    return os.path.join(base, "expedient", "config.json")
+
+
+def default_socket():
+    """Per-user path of the daemon socket"""
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if directory:
+        return os.path.join(directory, "expedient.sock")
+    tmp = os.environ.get("TMPDIR", "/tmp")
+    return os.path.join(tmp, f"expedient-{os.getuid()}.sock")
+
+
+def load_config(path=None):
+    """Settings from the config file overridden by the environment"""
+    config = {"read_timeout": DEFAULT_READ_TIMEOUT, "socket": default_socket()}
+    path = path or config_path()
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        stored = {}
+    except ValueError as error:
+        raise SystemExit(f"Invalid config file {path}: {error}")
+    config.update((k, v) for k, v in stored.items() if k in CONFIG_KEYS)
+    for key, variable in ENVIRONMENT.items():
+        if os.environ.get(variable):
+            config[key] = os.environ[variable]
+    return config
+
+
+# -----------------------------------------------------------------------------
+# Requests
+# -----------------------------------------------------------------------------
+
+
+def build_request(args, config):
+    """The request a chat/stream/reason/cite invocation describes"""
+    prompt = " ".join(args.prompt)
+    if prompt in ("", "-"):
+        if sys.stdin.isatty():
+            raise SystemExit("No prompt given (pass it as an argument or on stdin)")
+        prompt = sys.stdin.read()
+    messages = []
+    if args.system:
+        messages.append({"role": "system", "content": args.system})
+    messages.append({"role": "user", "content": prompt})
+
+    params = {}
+    if args.max_tokens is not None:
+        params["max_tokens"] = args.max_tokens
+    if args.temperature is not None:
+        params["temperature"] = args.temperature
+    if args.command == "reason":
+        params["reasoning_effort"] = args.effort
+        model = args.model or DEFAULT_REASONING_MODEL
+    elif args.command == "cite":
+        model = args.model or DEFAULT_CITATION_MODEL
+    else:
+        model = args.model or config.get("model") or DEFAULT_MODEL
+    return {
+        "command": args.command,
+        "model": model,
+        "messages": messages,
+        "params": params,
+        "raw": getattr(args, "json", False),
+    }
+
+
+class Output:
+    """Prints the events of a request: answer on stdout, the rest on stderr"""
+
+    def __init__(self, show_reasoning=True):
+        self.show_reasoning = show_reasoning
+        self.status = EXIT_OK
+        self._writer = None
+        self._wrote = False
+
+    def emit(self, event):
+        content = event.get("content")
+        if content:
+            self._text().write(content)
+            self._wrote = True
+        elif event.get("reasoning"):
+            if self.show_reasoning:
+                sys.stderr.write(event["reasoning"])
+                sys.stderr.flush()
+        elif "response" in event:
+            self._text().write(json.dumps(event["response"], indent=2))
+            self._wrote = True
+        elif event.get("sources"):
+            self.close()
+            print("\n\nSources:")
+            for number, url in event["sources"]:
+                print(f"[{number}] {url}")
+            self._wrote = False
+        elif "error" in event:
+            self.close()
+            status = event.get("status_code")
+            print(
+                f"Error: {status} {event['error']}" if status else event["error"],
+                file=sys.stderr,
+            )
+            self.status = EXIT_ERROR
+
+    def _text(self):
+        if self._writer is None:
+            from .render import StreamWriter
+
+            self._writer = StreamWriter(sys.stdout)
+        return self._writer
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._wrote:
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+            self._wrote = False
+
+
+def credentials_fingerprint(config):
+    """Digest of the URL and API key, matching a request to a daemon"""
+    url = (config.get("url") or "").rstrip("/")
+    text = f"{url}\n{config.get('api_key') or ''}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def send_to_daemon(path, request, emit, fingerprint=None):
+    """Run ``request`` in the daemon listening on ``path``
+
+    Returns False without emitting anything when no daemon answers, or when
+    it runs with other credentials than ``fingerprint`` describes.
+    """
+    family = getattr(socket, "AF_UNIX", None)
+    if family is None or not os.path.exists(path):
+        return False
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False  # Stale socket left by a daemon that is gone
+        request = dict(request, fingerprint=fingerprint)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        for line in sock.makefile("rb"):
+            event = json.loads(line)
+            if event.get("mismatch"):
+                return False  # Only ever the first event
+            emit(event)
+    finally:
+        sock.close()
+    return True
+
+
+def require_credentials(config):
+    if not config.get("url") or not config.get("api_key"):
+        raise SystemExit(
+            "Set EXPEDIENT_API_URL and EXPEDIENT_API_KEY (or url and api_key in "
+            f"{config_path()})"
+        )
+
+
+def run_locally(config, request, emit, record=None):
+    """Run ``request`` from this process
+
+    record -- capture file the response stream is appended to
+    """
+    require_credentials(config)
+    from .daemon import execute, make_client
+
+    recorder = None
+    if record:
+        from .capture import StreamRecorder
+
+        recorder = StreamRecorder(record)
+    try:
+        with make_client(config, recorder) as client:
+            execute(client, request, emit)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+def run_summary(config, args, emit):
+    """Map-reduce summary of ``args.file``, streaming the final answer"""
+    require_credentials(config)
+    import asyncio
+
+    from .async_client import AsyncExpedientClient
+    from .client import ExpedientAPIError
+    from .ratelimit import RetryPolicy
+    from .summarize import SummarizeError, Summarizer
+
+    options = {
+        name: value
+        for name, value in (
+            ("chunk_tokens", args.chunk_tokens),
+            ("concurrency", args.concurrency),
+        )
+        if value is not None
+    }
+    params = {}
+    if args.max_tokens is not None:
+        params["max_tokens"] = args.max_tokens
+
+    async def run(source):
+        async with AsyncExpedientClient(
+            config["url"],
+            config["api_key"],
+            read_timeout=float(config["read_timeout"]),
+            retry=RetryPolicy(max_retries=3),
+        ) as client:
+            model = args.model or config.get("model") or DEFAULT_MODEL
+            summarizer = Summarizer(client, model, args.instructions, **options)
+            async for chunk in summarizer.stream(source, **params):
+                choices = chunk.get("choices")
+                if choices:
+                    content = (choices[0].get("delta") or {}).get("content")
+                    if content:
+                        emit({"content": content})
+
+    try:
+        if args.file == "-":
+            asyncio.run(run(sys.stdin))
+        else:
+            with open(args.file, encoding="utf-8") as f:
+                asyncio.run(run(f))
+    except SummarizeError as error:
+        emit({"error": str(error)})
+    except ExpedientAPIError as error:
+        emit({"error": error.text, "status_code": error.status_code})
+    except ValueError as error:  # Empty input
+        emit({"error": str(error)})
+
+
+# -----------------------------------------------------------------------------
+# Entry point
+# -----------------------------------------------------------------------------
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m expedient_ai",
+        description="Expedient AI Chat API from the command line",
+    )
+    parser.add_argument(
+        "--config", help="JSON config file (default: %s)" % config_path()
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def request_command(name, help):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("prompt", nargs="*", help="prompt, or - for stdin")
+        command.add_argument("-m", "--model")
+        command.add_argument("-s", "--system", help="system message")
+        command.add_argument("--max-tokens", type=int)
+        command.add_argument("--temperature", type=float)
+        command.add_argument("--socket", help="daemon socket to use if running")
+        command.add_argument(
+            "--no-daemon", action="store_true", help="send the request from here"
+        )
+        command.add_argument(
+            "--record",
+            metavar="FILE",
+            help="append the response stream to a capture file (implies --no-daemon)",
+        )
+        return command
+
+    chat = request_command("chat", "send a prompt and print the answer")
+    chat.add_argument("--json", action="store_true", help="print the raw response")
+    request_command("stream", "stream the answer as it is generated")
+    reason = request_command("reason", "stream a reasoning model's answer")
+    reason.add_argument("--effort", choices=("low", "medium", "high"), default="high")
+    reason.add_argument(
+        "--hide-reasoning", action="store_true", help="do not print reasoning text"
+    )
+    request_command("cite", "web search answer with its sources")
+
+    summarize = commands.add_parser(
+        "summarize", help="summarize a text too long for one request"
+    )
+    summarize.add_argument("file", help="text file, or - for stdin")
+    summarize.add_argument("-m", "--model")
+    summarize.add_argument("-i", "--instructions", help="what the summary should cover")
+    summarize.add_argument("--max-tokens", type=int, help="length of the summary")
+    summarize.add_argument("--chunk-tokens", type=int, help="text per request")
+    summarize.add_argument("--concurrency", type=int, help="requests at once")
+
+    batch = commands.add_parser("batch", help="run a JSONL file of prompts")
+    batch.add_argument("args", nargs=argparse.REMAINDER, help="batch runner options")
+
+    daemon = commands.add_parser("daemon", help="serve requests from a warm process")
+    daemon.add_argument("--socket", help="socket path (default: per-user)")
+    daemon.add_argument(
+        "--idle-timeout", type=float, help="exit after this many idle seconds"
+    )
+    daemon.add_argument("--stop", action="store_true", help="stop a running daemon")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    config = load_config(args.config)
+
+    if args.command == "batch":
+        for key in ("url", "api_key"):
+            if config.get(key):
+                os.environ.setdefault(ENVIRONMENT[key], str(config[key]))
+        from .batch import main as batch_main
+
+        return batch_main(args.args)
+
+    if args.command == "daemon":
+        from .daemon import serve, stop
+
+        path = args.socket or config["socket"]
+        if args.stop:
+            return EXIT_OK if stop(path) else EXIT_ERROR
+        return serve(config, path, args.idle_timeout)
+
+    if args.command == "summarize":
+        output = Output()
+        try:
+            run_summary(config, args, output.emit)
+            output.close()
+        except KeyboardInterrupt:
+            output.status = 130
+        return output.status
+
+    request = build_request(args, config)
+    output = Output(show_reasoning=not getattr(args, "hide_reasoning", False))
+    path = args.socket or config["socket"]
+    try:
+        try:
+            local = args.no_daemon or args.record
+            fingerprint = credentials_fingerprint(config)
+            if local or not send_to_daemon(path, request, output.emit, fingerprint):
+                run_locally(config, request, output.emit, args.record)
+        except KeyboardInterrupt:
+            output.status = 130
+        output.close()
+    except BrokenPipeError:
+        # The reader (e.g. ``head``) has exited; keep the interpreter from
+        # failing again while flushing stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return output.status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
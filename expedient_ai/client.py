@@ -0,0 +1,298 @@
+"""
+Expedient AI Chat Client
+========================
+
+Reusable client for the Expedient AI Chat API. All requests share one
+keep-alive connection pool (a ``requests.Session`` unless another transport
+is given), so repeated calls skip the TCP and TLS handshake that a bare
+``requests.post`` pays every time.
+
+    from expedient_ai import ExpedientClient
+
+    with ExpedientClient(api_endpoint, api_key) as client:
+        for chunk in client.stream("gpt-4.1", [{"role": "user", "content": "Hi"}]):
+            ...
+"""
+
+import time
+
+from .cache import cached_key, is_complete_stream
+from .pipeline import Pipeline, iter_stream_events
+from .ratelimit import estimate_tokens, parse_retry_after
+from .sse import iter_chat_chunks, json_loads
+from .transport import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_READ_TIMEOUT,
+    HTTP11Transport,
+)
+
+# Path of the chat completions endpoint relative to the base API endpoint
+CHAT_COMPLETIONS_PATH = "/chat/completions"
+
+
+class ExpedientAPIError(Exception):
+    """Raised when the API answers with a non-200 status code"""
+
+    def __init__(self, status_code, text, retry_after=None):
+        super().__init__(f"Request failed: {status_code}, {text}")
+        self.status_code = status_code
+        self.text = text
+        self.retry_after = retry_after  # Seconds from a Retry-After header
+
+
+def build_payload(model, messages, stream=False, **params):
+    """Build the JSON body for a chat completions request"""
+    data = {"model": model, "messages": messages}
+    data.update(params)
+    data["stream"] = stream
+    return data
+
+
+class ExpedientClient:
+    """Chat completions client built on a persistent connection pool
+
+    The pool and timeout options configure the default ``HTTP11Transport``;
+    pass ``transport`` (e.g. an ``HTTP2Transport``) to send through another.
+
+    pool_connections -- number of per-host pools kept alive
+    pool_maxsize     -- maximum open connections kept per host
+    pool_block       -- wait for a free connection instead of opening extras
+    connect_timeout  -- seconds allowed to establish a connection
+    read_timeout     -- seconds allowed between bytes received
+    cache            -- optional ``ResponseCache`` answering repeated requests
+    rate_limiter     -- optional ``RateLimiter`` pacing requests and tokens/min
+    retry            -- optional ``RetryPolicy`` for 429, 5xx and connection errors
+    tracer           -- optional ``Tracer`` receiving request lifecycle events
+    recorder         -- optional ``StreamRecorder`` capturing streamed bytes
+    transport        -- optional transport to send requests through
+    """
+
+    def __init__(
+        self,
+        api_endpoint,
+        api_key,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        pool_block=False,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        session=None,
+        cache=None,
+        rate_limiter=None,
+        retry=None,
+        tracer=None,
+        recorder=None,
+        transport=None,
+    ):
+        self.api_endpoint = api_endpoint.rstrip("/")
+        self.api_full = f"{self.api_endpoint}{CHAT_COMPLETIONS_PATH}"
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.tracer = tracer
+        self.recorder = recorder
+
+        if transport is None:
+            transport = HTTP11Transport(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                session=session,
+            )
+        self.transport = transport
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def close(self):
+        """Close every pooled connection"""
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # -------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------
+
+    def _post(self, data, stream, trace=None):
+        limiter, retry = self.rate_limiter, self.retry
+        tokens = estimate_tokens(data) if limiter is not None else 0
+        if retry is not None:
+            retry.started()
+        attempt = 0
+        delay = None
+        while True:
+            if limiter is not None:
+                limiter.acquire(tokens)
+            try:
+                return self._send(data, stream, trace)
+            except ExpedientAPIError as error:
+                if retry is None:
+                    raise
+                if error.retry_after and limiter is not None:
+                    limiter.pause(error.retry_after)
+                delay = retry.delay(
+                    attempt, delay, error.status_code, error.retry_after
+                )
+                if delay is None:
+                    raise
+            except self.transport.errors:
+                if retry is None:
+                    raise
+                delay = retry.delay(attempt, delay)
+                if delay is None:
+                    raise
+            attempt += 1
+            time.sleep(delay)
+
+    def _send(self, data, stream, trace=None):
+        response = self.transport.post(self.api_full, self.headers, data, stream, trace)
+        if trace is not None:
+            trace.headers(response.status)
+        if response.status != 200:
+            try:
+                raise ExpedientAPIError(
+                    response.status,
+                    response.text(),
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+            finally:
+                response.close()
+        return response
+
+    def chat(self, model, messages, **params):
+        """Send a non-streaming request and return the decoded JSON response"""
+        data = build_payload(model, messages, stream=False, **params)
+        key = cached_key(self.cache, data)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if self.tracer is None:
+            response = self._post(data, stream=False)
+            try:
+                result = json_loads(response.read())
+            finally:
+                response.release()
+        else:
+            result = self._chat_traced(model, data)
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def stream(self, model, messages, early_stop=None, **params):
+        """Send a streaming request and return an iterator of decoded SSE chunks
+
+        The request is sent immediately, so a non-200 status raises here rather
+        than on first iteration. The connection returns to the pool once the
+        stream reaches [DONE], and is released if the iterator is closed early.
+        With a cache, a hit replays the stored chunks without any request.
+
+        early_stop -- optional ``EarlyStop`` ending the stream (and freeing its
+                      connection) as soon as one of its conditions is met
+        """
+        data = build_payload(model, messages, stream=True, **params)
+        key = cached_key(self.cache, data)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                if early_stop is not None:
+                    return early_stop.watch(data).replay(cached)
+                return iter(cached)
+        watch = early_stop.watch(data) if early_stop is not None else None
+        trace = self.tracer.start(model, data) if self.tracer is not None else None
+        capture = self.recorder.capture(data) if self.recorder is not None else None
+        try:
+            response = self._post(data, stream=True, trace=trace)
+        except Exception as error:
+            if trace is not None:
+                trace.end(error)
+            if capture is not None:
+                capture.finish(False, error)
+            raise
+        return self._iter_stream(response, key, trace, watch, capture)
+
+    def stream_events(self, model, messages, citations=True, **params):
+        """Like ``stream``, but return a ``Pipeline`` of typed events
+
+        citations -- emit a ``Citation`` event for every ``[n]`` marker
+        """
+        chunks = self.stream(model, messages, **params)
+        return Pipeline(iter_stream_events(chunks, citations))
+
+    def _chat_traced(self, model, data):
+        trace = self.tracer.start(model, data)
+        try:
+            response = self._post(data, stream=False, trace=trace)
+            try:
+                body = response.read()
+                trace.body(len(body))
+                result = json_loads(body)
+            finally:
+                response.release()
+            trace.chunk(result)  # Picks up the finish_reason
+        except Exception as error:
+            trace.end(error)
+            raise
+        trace.end()
+        return result
+
+    def _iter_stream(self, response, key=None, trace=None, watch=None, capture=None):
+        recorded = [] if key is not None else None
+        finished = failed = False
+        byte_chunks = response.iter_bytes()
+        if capture is not None:
+            byte_chunks = capture.observe(byte_chunks)
+        if watch is not None and watch.stop.timed:
+            byte_chunks = watch.guard(byte_chunks, response, self.transport.errors)
+        if trace is None:
+            chunks = iter_chat_chunks(byte_chunks)
+        else:
+            chunks = trace.observe_chunks(
+                iter_chat_chunks(trace.observe_bytes(byte_chunks))
+            )
+        try:
+            for chunk in chunks:
+                if recorded is not None:
+                    recorded.append(chunk)
+                yield chunk
+                if watch is not None and watch.check(chunk):
+                    break  # Abandon the rest of the answer
+            else:
+                # A deadline may also end the reads before [DONE]
+                finished = watch is None or watch.reason is None
+        except Exception as error:
+            failed = True
+            if trace is not None:
+                trace.end(error)
+            if capture is not None:
+                capture.finish(False, error)
+            raise
+        finally:
+            # Read the end of the body after [DONE] so the connection is
+            # reusable; a stream closed early is abandoned instead
+            if finished:
+                response.release()
+            else:
+                response.close()
+            if trace is not None:
+                trace.end()  # No-op after an error
+            if watch is not None:
+                watch.finish(finished, failed)
+            if capture is not None:
+                capture.finish(finished)  # No-op after an error
+        if is_complete_stream(recorded):
+            self.cache.put(key, recorded)
@@ -0,0 +1,230 @@
+"""
+Token-Budgeted Conversations
+============================
+
+Keeps the history of a multi-turn chat and, before every request, fits it to
+a prompt token budget instead of resending the whole ``messages`` array. The
+system prompt and the most recent turns are always kept; older turns are
+dropped, or collapsed into a single summary message when a ``summarizer`` is
+given. Token counts are local estimates (``expedient_ai.tokens``) computed
+once per message, so fitting the history costs nothing per request beyond
+walking the turns that are kept.
+
+    conversation = Conversation("gpt-4.1", system="You are helpful.", budget=3000)
+    for chunk in conversation.stream(client, "What are the main challenges?"):
+        ...
+    print(conversation.stats())  # tokens sent vs. avoided per turn
+
+The request size, and with it prefill latency, stays flat however long the
+session runs.
+"""
+
+from .tokens import estimate_message_tokens
+
+DEFAULT_BUDGET = 4000
+DEFAULT_KEEP_RECENT = 2
+
+
+class Conversation:
+    """Chat history that is trimmed to a token budget before each request
+
+    model        -- model the conversation talks to (selects the estimator)
+    system       -- optional system prompt, always sent first
+    budget       -- maximum estimated prompt tokens sent per request
+    keep_recent  -- newest messages always sent, even over budget
+    summarizer   -- optional callable(previous summary or None, newly dropped
+                    messages) -> summary text, sent as one system message in
+                    place of every dropped turn
+    """
+
+    def __init__(
+        self,
+        model,
+        system=None,
+        budget=DEFAULT_BUDGET,
+        keep_recent=DEFAULT_KEEP_RECENT,
+        summarizer=None,
+    ):
+        self.model = model
+        self.budget = budget
+        self.keep_recent = max(1, keep_recent)
+        self.summarizer = summarizer
+        self.system = None
+        if system is not None:
+            self.system = self._entry({"role": "system", "content": system})
+        self.history = []  # (message, estimated tokens), oldest first
+        self._summary = None  # (entry, number of history messages it covers)
+
+        self.turns = []  # Per request: {"sent": tokens, "avoided": tokens, ...}
+
+    def _entry(self, message):
+        return message, estimate_message_tokens(message, self.model)
+
+    # -------------------------------------------------------------------------
+    # History
+    # -------------------------------------------------------------------------
+
+    def add(self, role, content):
+        """Append a message to the history"""
+        self.history.append(self._entry({"role": role, "content": content}))
+
+    def add_user(self, content):
+        self.add("user", content)
+
+    def add_assistant(self, content):
+        self.add("assistant", content)
+
+    def messages(self):
+        """The ``messages`` array for the next request, fitted to the budget
+
+        Records the tokens sent and avoided for this request in ``turns``.
+        """
+        messages, turn = self._fit()
+        self.turns.append(turn)
+        return messages
+
+    def _fit(self):
+        # The fitted messages and their entry for ``turns``, not recorded yet
+        history = self.history
+        fixed = self.system[1] if self.system else 0
+        used = fixed
+        if self._summary is not None:
+            used += self._summary[0][1]  # Room for the summary, at its last size
+        start = len(history)
+        # Walk back from the newest message while the budget allows
+        while start > 0:
+            tokens = history[start - 1][1]
+            if len(history) - start >= self.keep_recent and used + tokens > self.budget:
+                break
+            used += tokens
+            start -= 1
+        # Open the kept window on a user message, as chat APIs expect: drop
+        # older messages down to ``keep_recent``, else add back to the user
+        # message before them if the budget allows
+        while (
+            start
+            and len(history) - start > self.keep_recent
+            and history[start][0]["role"] != "user"
+        ):
+            used -= history[start][1]
+            start += 1
+        if start and history[start][0]["role"] != "user":
+            back, extra = start, 0
+            while back and history[back][0]["role"] != "user":
+                back -= 1
+                extra += history[back][1]
+            if history[back][0]["role"] == "user" and used + extra <= self.budget:
+                start, used = back, used + extra
+
+        selected = [self.system] if self.system else []
+        if self._summary is not None:
+            used -= self._summary[0][1]
+        if start and self.summarizer is not None:
+            summary = self._summarize(start)
+            if summary is not None:
+                selected.append(summary)
+                used += summary[1]
+        selected.extend(history[start:])
+
+        total = fixed + sum(tokens for _, tokens in history)
+        turn = {
+            "messages": len(selected),
+            "dropped": start,
+            "sent": used,
+            "avoided": max(0, total - used),
+        }
+        return [message for message, _ in selected], turn
+
+    def _summarize(self, count):
+        # Fold only the messages that fell out of the window since last time
+        # into the previous summary, so each call is proportional to the change
+        previous, covered = self._summary or (None, 0)
+        if count <= covered:
+            return previous
+        dropped = [message for message, _ in self.history[covered:count]]
+        text = self.summarizer(previous[0]["content"] if previous else None, dropped)
+        if not text:
+            return previous
+        self._summary = (self._entry({"role": "system", "content": text}), count)
+        return self._summary[0]
+
+    def stats(self):
+        """Totals over every request: tokens sent, avoided and the last request"""
+        return {
+            "requests": len(self.turns),
+            "history_messages": len(self.history),
+            "tokens_sent": sum(turn["sent"] for turn in self.turns),
+            "tokens_avoided": sum(turn["avoided"] for turn in self.turns),
+            "last": self.turns[-1] if self.turns else None,
+        }
+
+    # -------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------
+
+    def stream(self, client, content, **params):
+        """Send a user message with an ``ExpedientClient`` and stream the reply
+
+        The reply is appended to the history, and the request to ``turns``,
+        once the stream is consumed; if the caller stops reading early, the
+        part of the reply it received is kept. If the request fails, or is
+        stopped before any content, the user message is taken out again so
+        a retry does not send it twice.
+        """
+        self.add_user(content)
+        entry = self.history[-1]
+        messages, turn = self._fit()
+        reply = []
+        try:
+            for chunk in client.stream(self.model, messages, **params):
+                _collect(chunk, reply)
+                yield chunk
+        except GeneratorExit:
+            self._end(entry, turn, reply, partial=True)
+            raise
+        except BaseException:
+            self._remove(entry)
+            raise
+        self._end(entry, turn, reply)
+
+    async def astream(self, client, content, **params):
+        """Async counterpart of ``stream`` for an ``AsyncExpedientClient``"""
+        self.add_user(content)
+        entry = self.history[-1]
+        messages, turn = self._fit()
+        reply = []
+        chunks = None
+        try:
+            chunks = await client.stream(self.model, messages, **params)
+            async for chunk in chunks:
+                _collect(chunk, reply)
+                yield chunk
+        except GeneratorExit:
+            self._end(entry, turn, reply, partial=True)
+            raise
+        except BaseException:
+            self._remove(entry)
+            raise
+        finally:
+            if chunks is not None:
+                await chunks.aclose()  # Frees the connection of a stopped stream
+        self._end(entry, turn, reply)
+
+    def _end(self, entry, turn, reply, partial=False):
+        if partial and not reply:
+            self._remove(entry)
+            return
+        self.turns.append(turn)
+        self.add_assistant("".join(reply))
+
+    def _remove(self, entry):
+        if self.history and self.history[-1] is entry:
+            self.history.pop()
+
+
+def _collect(chunk, reply):
+    choices = chunk.get("choices")
+    if choices:
+        content = choices[0].get("delta", {}).get("content")
+        if content:
+            reply.append(content)
@@ -0,0 +1,260 @@
+"""
+Command Line Daemon
+===================
+
+Runs the requests of ``python -m expedient_ai`` from one warm process, so a
+shell loop calling the CLI per prompt pays neither the HTTP stack import nor
+a new TLS connection each time. The daemon listens on a Unix socket that only
+its user may open; the CLI sends one JSON request per connection and reads
+back one JSON event per line:
+
+    {"content": "..."}           answer text
+    {"reasoning": "..."}         reasoning text (reasoning models)
+    {"response": {...}}          raw response (chat --json)
+    {"sources": [[1, "url"]]}    cited sources (cite)
+    {"error": "...", "status_code": 429}
+    {"mismatch": true}           other URL or key: not run, the CLI runs it
+
+``execute`` is shared with the CLI, which calls it directly when no daemon
+is running.
+
+    python -m expedient_ai daemon --idle-timeout 600 &
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from .citations import CitationExtractor
+from .cli import credentials_fingerprint
+from .client import ExpedientAPIError, ExpedientClient
+from .ratelimit import RetryPolicy
+
+DEFAULT_MAX_RETRIES = 3
+
+# Seconds between checks for a stop request or the idle timeout
+POLL_INTERVAL = 0.5
+
+
+def make_client(config, recorder=None):
+    """``ExpedientClient`` for the CLI settings"""
+    return ExpedientClient(
+        config["url"],
+        config["api_key"],
+        read_timeout=float(config["read_timeout"]),
+        retry=RetryPolicy(max_retries=DEFAULT_MAX_RETRIES),
+        recorder=recorder,
+    )
+
+
+def execute(client, request, emit):
+    """Run one CLI request with ``client``, passing its events to ``emit``"""
+    command = request["command"]
+    model, messages = request["model"], request["messages"]
+    params = request.get("params") or {}
+    try:
+        if command == "chat":
+            response = client.chat(model, messages, **params)
+            if request.get("raw"):
+                emit({"response": response})
+            else:
+                message = response["choices"][0]["message"]
+                emit({"content": message.get("content") or ""})
+            return
+
+        extractor = CitationExtractor(keep_text=False) if command == "cite" else None
+        chunks = client.stream(model, messages, **params)
+        try:
+            for chunk in chunks:
+                if extractor is not None:
+                    extractor.feed_chunk(chunk)
+                choices = chunk.get("choices")
+                if not choices:
+                    continue
+                delta = choices[0].get("delta") or {}
+                reasoning = delta.get("reasoning_content") or delta.get("reasoning")
+                if reasoning:
+                    emit({"reasoning": reasoning})
+                if delta.get("content"):
+                    emit({"content": delta["content"]})
+        finally:
+            chunks.close()
+        if extractor is not None:
+            sources = [
+                [number, extractor.source(number)]
+                for number in extractor.numbers()
+                if extractor.source(number)
+            ]
+            if sources:
+                emit({"sources": sources})
+    except ExpedientAPIError as error:
+        emit({"error": error.text, "status_code": error.status_code})
+    except client.transport.errors as error:
+        emit({"error": f"Connection failed: {error}"})
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.owner
+        daemon.request_started()
+        served = False  # Probes, shutdowns and refusals are not requests
+        try:
+            line = self.rfile.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            if request.get("command") == "shutdown":
+                daemon.stopping = True
+                self._send({"stopped": True})
+                return
+            fingerprint = daemon.fingerprint
+            if fingerprint is not None and request.get("fingerprint") != fingerprint:
+                self._send({"mismatch": True})
+                return
+            served = True
+            execute(daemon.client, request, self._send)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The CLI was interrupted; the stream is closed above
+        except Exception as error:
+            try:
+                self._send({"error": f"{type(error).__name__}: {error}"})
+            except OSError:
+                pass
+        finally:
+            daemon.request_finished(served)
+
+    def _send(self, event):
+        self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    """Unix socket server running CLI requests with one shared client
+
+    client        -- ``ExpedientClient`` used for every request
+    path          -- socket path
+    idle_timeout  -- seconds without requests after which ``serve`` returns
+    fingerprint   -- ``credentials_fingerprint`` of the client's settings;
+                     requests made with other settings are refused
+    """
+
+    def __init__(self, client, path, idle_timeout=None, fingerprint=None):
+        self.client = client
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.fingerprint = fingerprint
+        self.stopping = False
+        self.served = 0
+        self._active = 0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.server = None
+
+    def request_started(self):
+        # A connection is open; it holds off the idle timeout until it closes
+        with self._lock:
+            self._active += 1
+
+    def request_finished(self, served=True):
+        # Only connections that ran a request count and restart the idle timer
+        with self._lock:
+            self._active -= 1
+            if served:
+                self.served += 1
+                self._last = time.monotonic()
+
+    def idle(self):
+        """Whether the idle timeout has passed with no request in flight"""
+        with self._lock:
+            return (
+                self.idle_timeout is not None
+                and self._active == 0
+                and time.monotonic() - self._last >= self.idle_timeout
+            )
+
+    def bind(self):
+        if os.path.exists(self.path):
+            if ping(self.path):
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+            os.remove(self.path)  # Left behind by a daemon that is gone
+        old_umask = os.umask(0o177)  # Socket readable and writable by us only
+        try:
+            self.server = _Server(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self.server.owner = self
+        self.server.timeout = POLL_INTERVAL
+
+    def serve(self):
+        """Handle requests until stopped or idle for ``idle_timeout`` seconds"""
+        if self.server is None:
+            self.bind()
+        try:
+            while not self.stopping and not self.idle():
+                self.server.handle_request()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def ping(path):
+    """Whether a daemon accepts connections on ``path``"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def stop(path):
+    """Ask the daemon on ``path`` to exit; False when none is running"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        sock.sendall(b'{"command": "shutdown"}\n')
+        sock.recv(1024)
+    except OSError:
+        print(f"No daemon is listening on {path}", file=sys.stderr)
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def serve(config, path, idle_timeout=None):
+    """Run a daemon for the CLI settings until it is stopped; exit status"""
+    if not config.get("url") or not config.get("api_key"):
+        print("Set EXPEDIENT_API_URL and EXPEDIENT_API_KEY first", file=sys.stderr)
+        return 2
+    with make_client(config) as client:
+        daemon = Daemon(client, path, idle_timeout, credentials_fingerprint(config))
+        try:
+            daemon.bind()
+        except RuntimeError as error:
+            print(error, file=sys.stderr)
+            return 1
+        print(f"Listening on {path}", file=sys.stderr)
+        try:
+            daemon.serve()
+        except KeyboardInterrupt:
+            pass
+        print(f"Stopped after {daemon.served} requests", file=sys.stderr)
+    return 0
@@ -0,0 +1,277 @@
+"""
+Early Stop Conditions
+=====================
+
+A stream normally runs until the model finishes or ``max_tokens`` is spent.
+When the caller already has what it needs (a final-answer marker, enough
+text) or has waited long enough, the rest of the answer is wasted: the
+gateway keeps generating, and the HTTP/1.1 connection (or HTTP/2 stream)
+stays busy until then. ``EarlyStop`` describes when to give up, declaratively:
+
+    pattern        -- regular expression searched in the streamed content
+    max_chars      -- stop once this many content characters have arrived
+    deadline       -- seconds allowed for the whole stream
+    token_timeout  -- seconds allowed between deltas after the first one
+
+The first condition met ends the stream at once. The chunk that triggered it
+is still yielded, then the response is closed instead of drained: the
+HTTP/1.1 connection is dropped and its pool slot freed, and an HTTP/2 stream
+is reset while the connection carries on. Deadlines also apply while a read
+is blocked, through the read timeout of the live response (sync) or a
+timeout around every read (async).
+
+    stop = EarlyStop(pattern=r"FINAL ANSWER:.*\\n", deadline=60, token_timeout=15)
+    for chunk in client.stream(model, messages, early_stop=stop, max_tokens=2000):
+        ...
+    print(stop.last_reason, stop.stats())
+
+One ``EarlyStop`` may be shared by many streams; it keeps per-stream state
+apart and sums the outcomes in ``stats()``. Tokens saved are estimated from
+the request's ``max_tokens`` minus the tokens received, so streams without
+``max_tokens`` only count towards the other totals. Replays of cached
+streams are cut short by the same conditions but not counted, as they hold
+no connection.
+"""
+
+import asyncio
+import re
+import threading
+import time
+
+from .tokens import estimate_chars_tokens
+
+# Stop reasons
+PATTERN = "pattern"
+MAX_CHARS = "max_chars"
+DEADLINE = "deadline"
+TOKEN_TIMEOUT = "token_timeout"
+CANCELLED = "cancelled"  # The caller closed the stream itself
+
+# Content characters kept from earlier deltas so a pattern may span several
+DEFAULT_LOOKBACK = 256
+
+# A read timeout that fires this close to the armed deadline counts as it
+TIMER_SLACK = 0.01
+
+
+class EarlyStop:
+    """Stop conditions for streams, with counters over every stream watched
+
+    pattern        -- regular expression (str or compiled) ending the stream
+    max_chars      -- content characters after which the stream ends
+    deadline       -- seconds from the request to the end of the stream
+    token_timeout  -- seconds allowed between deltas once content has started
+    lookback       -- earlier content characters a pattern match may span
+    """
+
+    def __init__(
+        self,
+        pattern=None,
+        max_chars=None,
+        deadline=None,
+        token_timeout=None,
+        lookback=DEFAULT_LOOKBACK,
+    ):
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern)
+        self.pattern = pattern
+        self.max_chars = max_chars
+        self.deadline = deadline
+        self.token_timeout = token_timeout
+        self.lookback = lookback
+        self._lock = threading.Lock()
+
+        self.streams = 0
+        self.completed = 0
+        self.errors = 0
+        self.stopped = {}  # Reason -> streams ended early for it
+        self.tokens_received = 0
+        self.tokens_saved = 0
+        self.connections_reclaimed = 0
+        self.last_reason = None  # Reason of the most recently ended stream
+
+    @property
+    def timed(self):
+        """Whether any deadline is set"""
+        return self.deadline is not None or self.token_timeout is not None
+
+    def watch(self, data):
+        """Per-stream state for one request body"""
+        return StreamWatch(self, data.get("model"), data.get("max_tokens"))
+
+    def stats(self):
+        """Counters as a dict"""
+        with self._lock:
+            return {
+                "streams": self.streams,
+                "completed": self.completed,
+                "errors": self.errors,
+                "stopped": dict(self.stopped),
+                "tokens_received": self.tokens_received,
+                "tokens_saved": self.tokens_saved,
+                "connections_reclaimed": self.connections_reclaimed,
+            }
+
+    def _record(self, watch, finished, failed):
+        tokens = estimate_chars_tokens(watch.chars, watch.model) if watch.chars else 0
+        with self._lock:
+            self.streams += 1
+            self.tokens_received += tokens
+            if failed:
+                self.errors += 1
+                return
+            if finished:
+                self.completed += 1
+                self.last_reason = None
+                return
+            reason = watch.reason or CANCELLED
+            self.stopped[reason] = self.stopped.get(reason, 0) + 1
+            self.connections_reclaimed += 1
+            self.last_reason = reason
+            if watch.max_tokens:
+                self.tokens_saved += max(0, watch.max_tokens - tokens)
+
+
+class StreamWatch:
+    """Progress of one stream against the conditions of an ``EarlyStop``"""
+
+    def __init__(self, stop, model=None, max_tokens=None):
+        self.stop = stop
+        self.model = model
+        self.max_tokens = max_tokens
+        self.reason = None
+        self.chars = 0
+        self._tail = ""
+        self._last_delta = None
+        self._armed = None  # Reason and expiry of the read timeout last set
+        self._expires = None
+        now = time.monotonic()
+        self._deadline_at = now + stop.deadline if stop.deadline is not None else None
+
+    # -------------------------------------------------------------------------
+    # Conditions
+    # -------------------------------------------------------------------------
+
+    def check(self, chunk):
+        """Account for a decoded chunk; True when the stream should end"""
+        stop = self.stop
+        if self._deadline_at is not None and time.monotonic() >= self._deadline_at:
+            self.reason = DEADLINE
+            return True
+        choices = chunk.get("choices")
+        if not choices:
+            return False
+        delta = choices[0].get("delta") or {}
+        if stop.token_timeout is not None and (
+            delta.get("content")
+            or delta.get("reasoning_content")
+            or delta.get("reasoning")
+        ):
+            self._last_delta = time.monotonic()
+        content = delta.get("content")
+        if not content:
+            return False
+        self.chars += len(content)
+        if stop.max_chars is not None and self.chars >= stop.max_chars:
+            self.reason = MAX_CHARS
+            return True
+        if stop.pattern is not None:
+            text = self._tail + content
+            if stop.pattern.search(text):
+                self.reason = PATTERN
+                return True
+            self._tail = text[-stop.lookback :] if stop.lookback else ""
+        return False
+
+    def read_timeout(self):
+        """Seconds the next read may block, or None when no deadline applies
+
+        Sets ``reason`` when a deadline has already passed.
+        """
+        now = time.monotonic()
+        timeout = reason = None
+        if self._deadline_at is not None:
+            timeout, reason = self._deadline_at - now, DEADLINE
+        if self.stop.token_timeout is not None and self._last_delta is not None:
+            gap = self._last_delta + self.stop.token_timeout - now
+            if timeout is None or gap < timeout:
+                timeout, reason = gap, TOKEN_TIMEOUT
+        if timeout is None:
+            return None
+        self._armed, self._expires = reason, now + timeout
+        if timeout <= 0:
+            self.reason = reason
+        return timeout
+
+    def expired(self):
+        """Whether the read timeout last set has run out (sets ``reason``)"""
+        if self._armed is not None and time.monotonic() >= self._expires - TIMER_SLACK:
+            self.reason = self._armed
+            return True
+        return False
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def guard(self, byte_chunks, response, errors):
+        """Yield from ``byte_chunks`` until a deadline passes
+
+        Sets the read timeout of ``response`` before every read, so a stalled
+        stream ends on time; a timeout error then ends the iterator quietly.
+        """
+        set_read_timeout = getattr(response, "set_read_timeout", None)
+        iterator = iter(byte_chunks)
+        while True:
+            timeout = self.read_timeout()
+            if timeout is not None:
+                if timeout <= 0:
+                    return
+                if set_read_timeout is not None:
+                    set_read_timeout(timeout)
+            try:
+                data = next(iterator)
+            except StopIteration:
+                return
+            except errors:
+                if self.expired():
+                    return
+                raise
+            yield data
+
+    async def aguard(self, byte_chunks):
+        """Async ``guard``: every read is wrapped in a timeout"""
+        iterator = byte_chunks.__aiter__()
+        while True:
+            timeout = self.read_timeout()
+            try:
+                if timeout is None:
+                    data = await iterator.__anext__()
+                elif timeout <= 0:
+                    return
+                else:
+                    data = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                self.reason = self._armed
+                return
+            yield data
+
+    def replay(self, chunks):
+        """Yield cached ``chunks`` up to the one meeting a condition"""
+        for chunk in chunks:
+            yield chunk
+            if self.check(chunk):
+                return
+
+    async def areplay(self, chunks):
+        """Async ``replay``"""
+        for chunk in chunks:
+            yield chunk
+            if self.check(chunk):
+                return
+
+    def finish(self, finished, failed=False):
+        """Record the outcome of the stream in the ``EarlyStop`` counters"""
+        self.stop._record(self, finished, failed)
@@ -0,0 +1,201 @@
+"""
+Hedged Streaming Across Models
+==============================
+
+Cuts tail time-to-first-token by racing models behind the one gateway URL.
+The request goes to the primary model first; if no content delta has arrived
+after ``delay`` seconds, the same request is sent to the next model, and so
+on. Whichever stream produces the first content delta wins and is streamed to
+the caller; every other stream is closed right away so it stops using gateway
+capacity. ``delay=0`` is fan-out mode: all models start at once.
+
+    hedger = Hedger(client, ["gpt-4o-mini", "claude-3-haiku-20240307"], delay=0.4)
+    async for chunk in hedger.stream(messages, max_tokens=300):
+        ...
+    print(hedger.stats.report())
+
+With ``measure_primary=True`` a primary that lost is kept open until its own
+first delta (then closed), so the report shows the primary's real TTFT tail
+next to the hedged one and how much p99 TTFT the hedge saved. Without it only
+the primary's wins would be timed, so those two figures are left out.
+"""
+
+import asyncio
+import time
+
+from .stats import percentile
+
+
+def _has_content(chunk):
+    choices = chunk.get("choices")
+    return bool(choices and choices[0].get("delta", {}).get("content"))
+
+
+async def _discard(task):
+    """Cancel a losing attempt and close its stream if it already finished"""
+    task.cancel()
+    try:
+        _, _, chunks = await task
+    except (asyncio.CancelledError, Exception):
+        return
+    await chunks.aclose()
+
+
+class HedgeStats:
+    """Outcome of every hedged request: winners, hedges sent and TTFT saved"""
+
+    def __init__(self, primary):
+        self.primary = primary
+        self.requests = 0
+        self.hedged = 0  # Requests that launched at least one backup
+        self.failures = 0  # Requests where every model failed
+        self.wins = {}  # Model -> requests it won
+        self.ttft = []  # Seconds to first content delta of the winner
+        self.primary_ttft = []  # Primary's own TTFT, with measure_primary only
+
+    def record(self, model, ttft, hedged):
+        self.requests += 1
+        self.hedged += hedged
+        self.wins[model] = self.wins.get(model, 0) + 1
+        self.ttft.append(ttft)
+
+    def report(self):
+        """Summary dict with win counts and TTFT percentiles in milliseconds"""
+        ttft = sorted(self.ttft)
+        primary = sorted(self.primary_ttft)
+        report = {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "failures": self.failures,
+            "wins": dict(self.wins),
+            "hedge_win_rate": (
+                1 - self.wins.get(self.primary, 0) / self.requests
+                if self.requests
+                else 0.0
+            ),
+            "ttft_ms_p50": round(percentile(ttft, 0.50) * 1000, 1),
+            "ttft_ms_p99": round(percentile(ttft, 0.99) * 1000, 1),
+        }
+        if primary:
+            report["primary_ttft_ms_p99"] = round(percentile(primary, 0.99) * 1000, 1)
+            report["p99_ttft_saved_ms"] = round(
+                report["primary_ttft_ms_p99"] - report["ttft_ms_p99"], 1
+            )
+        return report
+
+
+class Hedger:
+    """Races one request across models and streams the first to answer
+
+    client           -- an ``AsyncExpedientClient``
+    models           -- primary model first, then backups in launch order
+    delay            -- seconds to wait for a content delta before the next
+                        launch (0 = fan-out: launch every model immediately)
+    measure_primary  -- keep a losing primary open until its first delta to
+                        record its TTFT (costs that stream's capacity until then)
+    """
+
+    def __init__(self, client, models, delay=0.5, measure_primary=False):
+        if not models:
+            raise ValueError("Hedger needs at least one model")
+        self.client = client
+        self.models = list(models)
+        self.delay = delay
+        self.measure_primary = measure_primary
+        self.stats = HedgeStats(self.models[0])
+        self._measuring = set()
+
+    async def stream(self, messages, **params):
+        """Yield the chunks of whichever model produces content first
+
+        Raises the last error if every model fails before producing content.
+        """
+        start = time.perf_counter()
+
+        async def attempt(model):
+            chunks = await self.client.stream(model, messages, **params)
+            head = []
+            try:
+                async for chunk in chunks:
+                    head.append(chunk)
+                    if _has_content(chunk):
+                        break
+            except BaseException:
+                await chunks.aclose()
+                raise
+            return time.perf_counter() - start, head, chunks
+
+        tasks = []
+
+        def launch():
+            tasks.append(asyncio.ensure_future(attempt(self.models[len(tasks)])))
+
+        launch()
+        while self.delay <= 0 and len(tasks) < len(self.models):
+            launch()
+
+        winner = None
+        failed = 0
+        pending = set(tasks)
+        try:
+            while winner is None:
+                timeout = None
+                if len(tasks) < len(self.models):
+                    next_launch = start + self.delay * len(tasks)
+                    timeout = max(0.0, next_launch - time.perf_counter())
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    pending.add(tasks[-1])
+                    continue
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is not None:
+                        failed += 1
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    else:
+                        await task.result()[2].aclose()  # Tied: close it too
+                if winner is None and not pending:
+                    if failed == len(self.models):
+                        self.stats.failures += 1
+                        raise error
+                    launch()  # Everything in flight failed: hedge now
+                    pending.add(tasks[-1])
+        except BaseException:
+            if winner is not None:
+                await winner.result()[2].aclose()
+            raise
+        finally:
+            losers = []
+            for task in pending:
+                if task is tasks[0] and winner is not None and self.measure_primary:
+                    measuring = asyncio.ensure_future(self._measure(task))
+                    self._measuring.add(measuring)
+                    measuring.add_done_callback(self._measuring.discard)
+                else:
+                    losers.append(_discard(task))
+            # A loser may have finished meanwhile: cancel() leaves it open
+            await asyncio.gather(*losers, return_exceptions=True)
+
+        ttft, head, chunks = winner.result()
+        self.stats.record(self.models[tasks.index(winner)], ttft, len(tasks) > 1)
+        if winner is tasks[0] and self.measure_primary:
+            self.stats.primary_ttft.append(ttft)
+        try:
+            for chunk in head:
+                yield chunk
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _measure(self, task):
+        try:
+            ttft, _, chunks = await task
+        except Exception:
+            return
+        self.stats.primary_ttft.append(ttft)
+        await chunks.aclose()
@@ -0,0 +1,668 @@
+"""
+Expedient AI Mock Gateway
+=========================
+
+Local stand-in for the ``/chat/completions`` endpoint so the clients, examples
+and benchmarks can run offline. Answers both streaming (OpenAI-style SSE) and
+non-streaming requests with generated text, at a configurable pace:
+
+    python -m expedient_ai.mock_server --port 8080 --ttft 0.3 --token-delay 0.02
+
+Then point any example at it with ``api_endpoint = "http://127.0.0.1:8080"``.
+
+Pacing, failures and model behaviour are all configurable: time to first
+token, delay between chunks, tokens per chunk, response length, injected 500
+and 429 (with ``Retry-After``) responses, an extra thinking delay for
+reasoning models scaled by ``reasoning_effort``, and Perplexity-style ``[n]``
+citations with a ``citations`` list for ``perplexity/`` models.
+
+Built on aiohttp, so one process holds thousands of concurrent streams. With
+``--http2`` it serves cleartext HTTP/2 through the optional ``h2`` package
+instead, for the HTTP/2 transports.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import uuid
+
+from aiohttp import web
+
+from .client import CHAT_COMPLETIONS_PATH
+
+EVENT_STREAM = "text/event-stream"
+
+# Concurrent streams the HTTP/2 front end allows per connection
+DEFAULT_HTTP2_STREAMS = 1000
+
+# Models that "think" before answering, as listed in reasoning_example.py
+REASONING_MODEL_PATTERN = re.compile(
+    r"^(o\d|o\d-mini)$|reasoning|claude-(sonnet|opus)-4|gemini-2\.5"
+)
+
+# Fraction of reasoning_delay spent per reasoning_effort level
+REASONING_EFFORT_SCALE = {"low": 0.25, "medium": 0.5, "high": 1.0}
+
+WORDS = (
+    "enterprise AI adoption improves productivity through automation of routine "
+    "work while cloud platforms provide scalable infrastructure secure data "
+    "governance and faster insight for teams across the business"
+).split()
+
+
+class MockGatewayConfig:
+    """Behaviour of the mock gateway; every delay is in seconds
+
+    ttft             -- delay before the first content chunk
+    token_delay      -- delay between consecutive chunks
+    chunk_tokens     -- tokens (words) carried by each chunk
+    tokens           -- response length, capped by the request's max_tokens
+    error_rate       -- fraction of requests answered with HTTP 500
+    rate_limit_rate  -- fraction of requests answered with HTTP 429
+    retry_after      -- Retry-After header value sent with 429 responses
+    reasoning_delay  -- extra delay for reasoning models at effort "high"
+    citation_every   -- insert a [n] citation every this many tokens (0 = off)
+    citation_count   -- number of distinct sources cited
+    api_key          -- if set, reject requests without this bearer token
+    seed             -- seed for failure injection (None = random)
+    """
+
+    def __init__(
+        self,
+        ttft=0.2,
+        token_delay=0.02,
+        chunk_tokens=1,
+        tokens=200,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        retry_after=1,
+        reasoning_delay=2.0,
+        citation_every=25,
+        citation_count=5,
+        api_key=None,
+        seed=None,
+    ):
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.chunk_tokens = chunk_tokens
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.reasoning_delay = reasoning_delay
+        self.citation_every = citation_every
+        self.citation_count = citation_count
+        self.api_key = api_key
+        self.seed = seed
+
+
+def is_reasoning_model(model):
+    return bool(REASONING_MODEL_PATTERN.search(model.rsplit("/", 1)[-1]))
+
+
+def generate_tokens(config, data):
+    """Deterministic answer tokens for a request, with citations if applicable"""
+    prompt = json.dumps(data.get("messages", []), sort_keys=True)
+    rng = random.Random(prompt)
+    count = min(config.tokens, data.get("max_tokens") or config.tokens)
+    cite = data.get("model", "").startswith("perplexity/") and config.citation_every
+    tokens = []
+    for i in range(count):
+        token = " " + rng.choice(WORDS) if i else rng.choice(WORDS).title()
+        if cite and (i + 1) % config.citation_every == 0:
+            source = (i // config.citation_every) % config.citation_count + 1
+            token += f" [{source}]"
+        tokens.append(token)
+    finish_reason = "length" if count < config.tokens else "stop"
+    return tokens, finish_reason
+
+
+def citation_urls(config):
+    return [
+        f"https://example.com/source-{n}" for n in range(1, config.citation_count + 1)
+    ]
+
+
+class MockGateway:
+    """aiohttp application serving the mock endpoint, plus start/stop helpers"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockGatewayConfig()
+        self.host = host
+        self.port = port
+        self.url = None
+        self.requests = 0  # Requests received, including injected failures
+        self.disconnects = 0  # Streams the client closed before the end
+        self._rng = random.Random(self.config.seed)
+        self._runner = None
+        self._thread = None
+        self._loop = None
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post(CHAT_COMPLETIONS_PATH, self.handle_chat_completions)
+        return app
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def start(self, backlog=4096):
+        """Start serving on the current event loop and return the base URL"""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, backlog=backlog)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        self.url = f"http://{self.host}:{self.port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def start_in_thread(self):
+        """Serve from a background thread (for sync clients); returns the URL"""
+        started = threading.Event()
+        failure = []  # The error start() raised, for the calling thread
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except BaseException as error:
+                failure.append(error)
+                self._loop.close()
+                return
+            finally:
+                started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            self._thread.join()
+            self._thread = None
+            raise failure[0]
+        return self.url
+
+    def stop_thread(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    # -------------------------------------------------------------------------
+    # Request handling
+    # -------------------------------------------------------------------------
+
+    async def handle_chat_completions(self, request):
+        status, headers, parts = self.reply(
+            request.headers.get("Authorization"), await request.read()
+        )
+        if headers["Content-Type"] != EVENT_STREAM:
+            body = b""
+            for delay, payload in parts:
+                if delay:
+                    await asyncio.sleep(delay)
+                body += payload
+            return web.Response(status=status, body=body, headers=headers)
+
+        response = web.StreamResponse(headers=headers)
+        await response.prepare(request)
+        try:
+            for delay, payload in parts:
+                if delay:
+                    await asyncio.sleep(delay)
+                await response.write(payload)
+            await response.write_eof()
+        except ConnectionResetError:
+            # The client closed the stream early (hedging, early stop, ...)
+            self.disconnects += 1
+        return response
+
+    def reply(self, authorization, body):
+        """Plan the answer to one request: (status, headers, parts)
+
+        ``parts`` yields (seconds to wait, bytes to send) pairs, so every
+        front end paces the same answer the same way.
+        """
+        config = self.config
+        self.requests += 1
+
+        if config.api_key is not None:
+            if authorization != f"Bearer {config.api_key}":
+                return _error(401, "Invalid API key")
+        try:
+            data = json.loads(body)
+            model = data["model"]
+            data["messages"]
+        except (ValueError, KeyError, TypeError):
+            return _error(400, "Request body must be JSON with model and messages")
+
+        roll = self._rng.random()
+        if roll < config.rate_limit_rate:
+            status, headers, parts = _error(429, "Rate limit exceeded")
+            headers["Retry-After"] = str(config.retry_after)
+            return status, headers, parts
+        if roll < config.rate_limit_rate + config.error_rate:
+            return _error(500, "Injected upstream error")
+
+        tokens, finish_reason = generate_tokens(config, data)
+        delay = config.ttft
+        if is_reasoning_model(model):
+            effort = data.get("reasoning_effort", "medium")
+            delay += config.reasoning_delay * REASONING_EFFORT_SCALE.get(effort, 0.5)
+        citations = citation_urls(config) if model.startswith("perplexity/") else None
+
+        if data.get("stream"):
+            headers = {"Content-Type": EVENT_STREAM, "Cache-Control": "no-cache"}
+            return (
+                200,
+                headers,
+                self._events(data, tokens, finish_reason, delay, citations),
+            )
+
+        body = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": _usage(data, tokens),
+        }
+        if citations:
+            body["citations"] = citations
+        delay += config.token_delay * len(tokens) / max(1, config.chunk_tokens)
+        return 200, {"Content-Type": "application/json"}, [(delay, _json(body))]
+
+    def _events(self, data, tokens, finish_reason, delay, citations):
+        config = self.config
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": data["model"],
+        }
+        if citations:
+            base["citations"] = citations
+
+        # Everything but the delta is the same for every chunk: encode it once
+        head = "data: " + json.dumps(base)[:-1] + ', "choices": [{"index": 0, "delta": '
+
+        def event(delta, finish=None, **extra):
+            tail = "".join(
+                f", {json.dumps(k)}: {json.dumps(v)}" for k, v in extra.items()
+            )
+            return (
+                f'{head}{json.dumps(delta)}, "finish_reason": {json.dumps(finish)}}}]'
+                f"{tail}}}\n\n"
+            ).encode()
+
+        yield 0, event({"role": "assistant", "content": ""})
+        step = max(1, config.chunk_tokens)
+        for start in range(0, len(tokens), step):
+            pause = config.token_delay if start else delay
+            yield pause, event({"content": "".join(tokens[start : start + step])})
+        if not tokens:
+            yield delay, b""
+
+        extra = {}
+        if (data.get("stream_options") or {}).get("include_usage"):
+            extra["usage"] = _usage(data, tokens)
+        yield 0, event({}, finish_reason, **extra)
+        yield 0, b"data: [DONE]\n\n"
+
+
+class MockHTTP2Gateway(MockGateway):
+    """The mock gateway over cleartext HTTP/2 ("h2c" with prior knowledge)
+
+    Same answers as ``MockGateway``, served with the ``h2`` package so the
+    HTTP/2 transports can be measured locally. Every connection carries up
+    to ``max_streams`` concurrent streams with per-stream flow control; a
+    stream reset by the client is counted in ``disconnects``.
+    """
+
+    def __init__(
+        self, config=None, host="127.0.0.1", port=0, max_streams=DEFAULT_HTTP2_STREAMS
+    ):
+        super().__init__(config, host, port)
+        self.max_streams = max_streams
+        self.connections = 0  # Connections accepted
+        self._server = None
+        self._protocols = set()
+
+    async def start(self, backlog=4096):
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _HTTP2Protocol(self), self.host, self.port, backlog=backlog
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://{self.host}:{self.port}"
+        return self.url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for protocol in list(self._protocols):
+                protocol.transport.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+class _HTTP2Protocol(asyncio.Protocol):
+    # One HTTP/2 connection: parses frames with h2 and answers each stream
+    # from its own task
+
+    def __init__(self, gateway):
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.exceptions
+        import h2.settings
+
+        self.h2 = h2
+        self.gateway = gateway
+        self.connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.transport = None
+        self.requests = {}  # Stream id -> (headers, body received so far)
+        self.tasks = {}  # Stream id -> task sending the answer
+        self.waiters = []  # Futures of streams waiting for flow-control credit
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.gateway.connections += 1
+        self.gateway._protocols.add(self)
+        self.connection.initiate_connection()
+        self.connection.update_settings(
+            {
+                self.h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: (
+                    self.gateway.max_streams
+                )
+            }
+        )
+        self.flush()
+
+    def connection_lost(self, exc):
+        self.gateway._protocols.discard(self)
+        for task in self.tasks.values():
+            task.cancel()
+        self.wake()
+
+    def flush(self):
+        data = self.connection.data_to_send()
+        if data:
+            self.transport.write(data)
+
+    def wake(self):
+        for waiter in self.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self.waiters = []
+
+    def data_received(self, data):
+        events = self.h2.events
+        try:
+            received = self.connection.receive_data(data)
+        except self.h2.exceptions.ProtocolError:
+            self.flush()
+            self.transport.close()
+            return
+        for event in received:
+            if isinstance(event, events.RequestReceived):
+                self.requests[event.stream_id] = (dict(event.headers), bytearray())
+            elif isinstance(event, events.DataReceived):
+                self.requests[event.stream_id][1].extend(event.data)
+                self.connection.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id
+                )
+            elif isinstance(event, events.StreamEnded):
+                headers, body = self.requests.pop(event.stream_id)
+                task = asyncio.ensure_future(
+                    self.respond(event.stream_id, headers, bytes(body))
+                )
+                self.tasks[event.stream_id] = task
+                task.add_done_callback(
+                    lambda _, stream_id=event.stream_id: self.tasks.pop(stream_id, None)
+                )
+            elif isinstance(event, events.StreamReset):
+                self.requests.pop(event.stream_id, None)
+                task = self.tasks.pop(event.stream_id, None)
+                if task is not None:
+                    task.cancel()
+                    self.gateway.disconnects += 1
+            elif isinstance(
+                event, (events.WindowUpdated, events.RemoteSettingsChanged)
+            ):
+                self.wake()
+            elif isinstance(event, events.ConnectionTerminated):
+                self.transport.close()
+        self.flush()
+
+    async def respond(self, stream_id, headers, body):
+        if headers.get(":path") == CHAT_COMPLETIONS_PATH:
+            status, reply_headers, parts = self.gateway.reply(
+                headers.get("authorization"), body
+            )
+        else:
+            status, reply_headers, parts = _error(404, "Not found")
+        response_headers = [(":status", str(status))]
+        response_headers += [
+            (name.lower(), value) for name, value in reply_headers.items()
+        ]
+        try:
+            self.connection.send_headers(stream_id, response_headers)
+            self.flush()
+            for delay, payload in parts:
+                if delay:
+                    await asyncio.sleep(delay)
+                await self.send(stream_id, payload)
+            self.connection.end_stream(stream_id)
+            self.flush()
+        except self.h2.exceptions.StreamClosedError:
+            pass  # Reset by the client; counted in data_received
+
+    async def send(self, stream_id, data):
+        connection = self.connection
+        while data:
+            window = min(
+                connection.local_flow_control_window(stream_id),
+                connection.max_outbound_frame_size,
+            )
+            if window <= 0:
+                # Wait for the client to read and grant more credit
+                waiter = asyncio.get_running_loop().create_future()
+                self.waiters.append(waiter)
+                await waiter
+                if self.transport.is_closing():
+                    raise asyncio.CancelledError()
+                continue
+            connection.send_data(stream_id, data[:window])
+            data = data[window:]
+            self.flush()
+
+
+def _json(body):
+    return json.dumps(body).encode("utf-8")
+
+
+def _error(status, message):
+    body = {"error": {"message": message, "type": "mock_error", "code": status}}
+    return status, {"Content-Type": "application/json"}, [(0, _json(body))]
+
+
+def _usage(data, tokens):
+    prompt_tokens = sum(
+        len(str(message.get("content", "")).split()) for message in data["messages"]
+    )
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(tokens),
+        "total_tokens": prompt_tokens + len(tokens),
+    }
+
+
+class MockGatewayProcess:
+    """Run the mock gateway in a child process, e.g. for benchmarks
+
+    Keyword arguments are MockGatewayConfig fields passed as command-line
+    options. A separate process keeps the server's CPU work off the caller's
+    interpreter, so client-side measurements are not skewed by it.
+
+        with MockGatewayProcess(ttft=0, token_delay=0) as url:
+            ...
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, **config):
+        self.host = host
+        self.port = port
+        self.config = config
+        self.url = None
+        self._process = None
+
+    def start(self):
+        import subprocess
+        import sys
+
+        command = [sys.executable, "-m", __name__, "--host", self.host]
+        command += ["--port", str(self.port)]
+        for name, value in self.config.items():
+            option = "--" + name.replace("_", "-")
+            if value is True:
+                command.append(option)  # A flag such as --http2
+            elif value is not None and value is not False:
+                command += [option, str(value)]
+        self._process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, universal_newlines=True
+        )
+        line = self._process.stdout.readline()
+        if not line.startswith("Mock gateway on "):
+            self.stop()
+            raise RuntimeError(f"mock gateway failed to start: {line!r}")
+        self.url = line.split()[-1][: -len(CHAT_COMPLETIONS_PATH)]
+        return self.url
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def raise_open_file_limit():
+    """Lift the soft open-files limit to the hard limit (Linux/macOS)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def main(argv=None):
+    defaults = MockGatewayConfig()
+    parser = argparse.ArgumentParser(
+        description="Local mock of the Expedient AI gateway"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ttft", type=float, default=defaults.ttft)
+    parser.add_argument("--token-delay", type=float, default=defaults.token_delay)
+    parser.add_argument("--chunk-tokens", type=int, default=defaults.chunk_tokens)
+    parser.add_argument("--tokens", type=int, default=defaults.tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=defaults.rate_limit_rate
+    )
+    parser.add_argument("--retry-after", type=int, default=defaults.retry_after)
+    parser.add_argument(
+        "--reasoning-delay", type=float, default=defaults.reasoning_delay
+    )
+    parser.add_argument("--citation-every", type=int, default=defaults.citation_every)
+    parser.add_argument("--citation-count", type=int, default=defaults.citation_count)
+    parser.add_argument("--api-key", help="require this bearer token")
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="serve cleartext HTTP/2 (prior knowledge) instead of HTTP/1.1",
+    )
+    parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=DEFAULT_HTTP2_STREAMS,
+        help="concurrent streams per HTTP/2 connection",
+    )
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = MockGatewayConfig(
+        ttft=args.ttft,
+        token_delay=args.token_delay,
+        chunk_tokens=args.chunk_tokens,
+        tokens=args.tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        reasoning_delay=args.reasoning_delay,
+        citation_every=args.citation_every,
+        citation_count=args.citation_count,
+        api_key=args.api_key,
+        seed=args.seed,
+    )
+    limit = raise_open_file_limit()
+    if args.http2:
+        gateway = MockHTTP2Gateway(config, args.host, args.port, args.max_streams)
+    else:
+        gateway = MockGateway(config, args.host, args.port)
+
+    async def serve():
+        url = await gateway.start()
+        # The first line is parsed by MockGatewayProcess; keep its format
+        print(f"Mock gateway on {url}{CHAT_COMPLETIONS_PATH}", flush=True)
+        if limit:
+            print(f"Open file limit: {limit}", flush=True)
+        try:
+            await asyncio.Event().wait()  # Serve until interrupted
+        finally:
+            await gateway.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Near-Duplicate Prompt Cache
+===========================
+
+``ResponseCache`` only answers byte-identical requests, so "Explain the
+benefits of AI in business." and "explain the benefits of AI for business"
+are two misses. ``NearDuplicateCache`` answers a request from a stored one
+whose prompt is nearly the same, for the same model and parameters, entirely
+offline (no embedding service):
+
+1. the messages are normalized (lowercase, punctuation and extra spaces
+   dropped) and cut into overlapping character shingles
+2. a MinHash signature estimates the Jaccard similarity of two shingle sets;
+   it is computed in one pass with one-permutation hashing (each shingle
+   hash picks a bin and competes for its minimum, empty bins borrow from
+   their neighbour) instead of one hash function per signature value
+3. locality-sensitive hashing splits the signature into bands and indexes
+   every band, so a lookup only compares the few entries sharing a band
+   instead of scanning the cache
+4. a candidate is a hit when its estimated similarity reaches ``threshold``
+
+Everything else in the request body (model, temperature, max_tokens,
+stream, ...) must match exactly, and as with ``ResponseCache`` only
+deterministic requests are cached unless ``force`` is set. Memory is bounded
+by entry count and stored bytes with least-recently-used eviction. The index
+lives in memory and uses Python's per-process string hashing.
+
+    cache = NearDuplicateCache(threshold=0.85, max_entries=100_000)
+    client = ExpedientClient(api_endpoint, api_key, cache=cache)
+
+Prompts shorter than ``min_shingles`` shingles are too short for a reliable
+estimate; they only match prompts that normalize to the same text.
+"""
+
+import json
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from .cache import request_key
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 64
+DEFAULT_SHINGLE_SIZE = 4
+DEFAULT_MIN_SHINGLES = 8
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+MASK64 = (1 << 64) - 1
+MASK32 = (1 << 32) - 1
+# Added per bin of distance when an empty bin borrows a neighbour's minimum
+DENSIFY_STEP = 0x9E3779B97F4A7C15
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize_messages(messages):
+    """Lowercased words of every message, one ``role: text`` line each"""
+    lines = []
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True)
+        words = WORD_PATTERN.findall(content.lower())
+        lines.append(f"{message.get('role', '')}: {' '.join(words)}")
+    return "\n".join(lines)
+
+
+def shingles(text, size=DEFAULT_SHINGLE_SIZE):
+    """Set of overlapping ``size``-character substrings of ``text``"""
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    """Exact Jaccard similarity of two sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(items, num_perm=DEFAULT_NUM_PERM):
+    """One-permutation MinHash signature of a set of strings, as a list"""
+    empty = MASK64 + 1
+    signature = [empty] * num_perm
+    for item in items:
+        h = hash(item) & MASK64
+        b = h % num_perm
+        v = h // num_perm
+        if v < signature[b]:
+            signature[b] = v
+    # Densify: an empty bin takes the next filled bin's value (circularly),
+    # shifted by the distance so bins stay distinguishable
+    for b in range(num_perm):
+        if signature[b] != empty:
+            continue
+        for distance in range(1, num_perm):
+            value = signature[(b + distance) % num_perm]
+            if value != empty:
+                signature[b] = (value + distance * DENSIFY_STEP) & MASK64
+                break
+    return signature
+
+
+def lsh_bands(num_perm, threshold):
+    """(bands, rows) of the LSH index for a signature length and threshold
+
+    Picks the longest bands whose 50% collision point stays below
+    ``threshold``, so pairs at the threshold almost always share a band while
+    dissimilar ones rarely do (64 values at 0.85: 8 bands of 8).
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        # Similarity at which a pair shares at least one band half the time
+        midpoint = (1 / bands) ** (1 / rows)
+        if midpoint <= threshold - 0.05 or best is None:
+            best = (bands, rows)
+    return best
+
+
+class PromptKey:
+    """Lookup key of a request: parameter namespace plus prompt signature"""
+
+    __slots__ = ("namespace", "signature", "bands")
+
+    def __init__(self, namespace, signature, bands):
+        self.namespace = namespace
+        self.signature = signature  # array("I")
+        self.bands = bands  # One index key per LSH band (not kept in entries)
+
+
+class NearDuplicateCache:
+    """In-memory cache answering requests with nearly identical prompts
+
+    threshold      -- minimum estimated Jaccard similarity of the prompts
+    num_perm       -- MinHash signature length (higher is more precise)
+    shingle_size   -- characters per shingle
+    min_shingles   -- shorter prompts only match an identical normalized text
+    max_entries    -- entries kept before evicting the least recently used
+    max_bytes      -- encoded response bytes kept before evicting
+    ttl            -- seconds an entry stays valid; None never expires
+    force          -- cache requests even when temperature > 0
+    bands          -- LSH bands (default: chosen from threshold and num_perm)
+    """
+
+    def __init__(
+        self,
+        threshold=DEFAULT_THRESHOLD,
+        num_perm=DEFAULT_NUM_PERM,
+        shingle_size=DEFAULT_SHINGLE_SIZE,
+        min_shingles=DEFAULT_MIN_SHINGLES,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_bytes=DEFAULT_MAX_BYTES,
+        ttl=None,
+        force=False,
+        bands=None,
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.force = force
+        if bands is None:
+            self.bands, self.rows = lsh_bands(num_perm, threshold)
+        else:
+            self.bands, self.rows = bands, num_perm // bands
+        # Matching signature values needed for a hit
+        self._required = threshold * num_perm
+
+        # id -> (namespace, signature, created, encoded payload)
+        self._entries = OrderedDict()
+        self._index = {}  # band key -> entry id, or list of ids
+        self._next_id = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.candidates = 0  # Entries compared during lookups
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def cacheable(self, data):
+        """Whether a request body may be served from / stored in the cache"""
+        if self.force or data.get("temperature", 1.0) <= 0:
+            return True
+        with self._lock:
+            self.skipped += 1
+        return False
+
+    def key(self, data):
+        """``PromptKey`` of a request body"""
+        params = {k: v for k, v in data.items() if k != "messages"}
+        namespace = request_key(params)
+        text = normalize_messages(data.get("messages") or ())
+        items = shingles(text, self.shingle_size)
+        if len(items) < self.min_shingles:
+            # Same value in every bin: only an identical text shares a band
+            signature = [hash(text) & MASK64] * self.num_perm
+        else:
+            signature = minhash(items, self.num_perm)
+        # The low 32 bits are plenty to tell values apart once minimized
+        signature = array("I", [value & MASK32 for value in signature])
+        return PromptKey(namespace, signature, self._band_keys(namespace, signature))
+
+    def get(self, key):
+        """Return the value stored for the most similar prompt, or None"""
+        now = time.time()
+        with self._lock:
+            best_id = best_score = None
+            seen = set()
+            for band_key in key.bands:
+                ids = self._index.get(band_key)
+                if ids is None:
+                    continue
+                for entry_id in ids if isinstance(ids, list) else (ids,):
+                    if entry_id in seen:
+                        continue
+                    seen.add(entry_id)
+                    score = self._score(key, *self._entries[entry_id][:2])
+                    if score >= self._required and (
+                        best_score is None or score > best_score
+                    ):
+                        best_id, best_score = entry_id, score
+                if best_score == self.num_perm:
+                    break
+            self.candidates += len(seen)
+            if best_id is not None:
+                _, _, created, payload = self._entries[best_id]
+                if self.ttl is not None and now - created >= self.ttl:
+                    self._remove(best_id)
+                else:
+                    self._entries.move_to_end(best_id)
+                    self.hits += 1
+                    if best_score == self.num_perm:
+                        self.exact_hits += 1
+                    return json.loads(payload)
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store a JSON-serializable value for the prompt of ``key``"""
+        payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (
+                key.namespace,
+                key.signature,
+                time.time(),
+                payload,
+            )
+            self._size += len(payload)
+            for band_key in key.bands:
+                ids = self._index.get(band_key)
+                if ids is None:
+                    self._index[band_key] = entry_id
+                elif isinstance(ids, list):
+                    ids.append(entry_id)
+                else:
+                    self._index[band_key] = [ids, entry_id]
+            self.stores += 1
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters as a dict, including the overall hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "candidates_per_lookup": self.candidates / lookups if lookups else 0.0,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    # -------------------------------------------------------------------------
+    # Index
+    # -------------------------------------------------------------------------
+
+    def _band_keys(self, namespace, signature):
+        rows = self.rows
+        return [
+            hash((namespace, band, tuple(signature[band * rows : (band + 1) * rows])))
+            for band in range(self.bands)
+        ]
+
+    def _score(self, key, namespace, signature):
+        """Signature values shared with an entry (num_perm means identical)"""
+        if key.namespace != namespace:
+            return -1
+        return sum(a == b for a, b in zip(key.signature, signature))
+
+    def _remove(self, entry_id):
+        namespace, signature, _, payload = self._entries.pop(entry_id)
+        self._size -= len(payload)
+        for band_key in self._band_keys(namespace, signature):
+            ids = self._index.get(band_key)
+            if isinstance(ids, list):
+                ids.remove(entry_id)
+                if len(ids) == 1:
+                    self._index[band_key] = ids[0]
+            elif ids == entry_id:
+                del self._index[band_key]
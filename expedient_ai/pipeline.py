@@ -0,0 +1,569 @@
+"""
+Stream Event Pipelines
+======================
+
+Turns a completion stream into typed events and sends them to any number of
+consumers. Chunks become ``ContentDelta``, ``ReasoningDelta``, ``Citation``,
+``Finish`` and ``Usage`` events (immutable namedtuples), wrapped in a
+``Pipeline`` (``AsyncPipeline`` for the async client) with lazy ``map``,
+``filter`` and ``of_type`` operators.
+
+``tee`` splits one upstream stream into branches. A single pump reads the
+upstream and puts each event into a bounded queue per branch. The event
+objects are shared by every branch, so the text is never copied per consumer.
+When a branch's queue is full, its ``overflow`` policy decides what happens:
+
+    BLOCK        wait for the consumer (backpressure on the upstream read)
+    DROP_OLDEST  discard the oldest queued event; the newest always gets in
+    DROP_NEWEST  discard the event that does not fit
+    FAIL         detach the branch; its consumer gets ``QueueOverflow``
+
+With the dropping policies a slow consumer neither stalls the socket read nor
+buffers without limit. ``to`` runs one sink per branch (a thread each, or a
+task each when async) until the stream ends:
+
+    events = client.stream_events("gpt-4.1", messages)
+    events.to(websocket_send, log_sink, accumulator.append, overflow=DROP_OLDEST)
+
+    text = "".join(events.of_type(ContentDelta).map(lambda e: e.text))
+"""
+
+import asyncio
+import threading
+from collections import deque, namedtuple
+
+from .citations import CitationExtractor
+
+# Overflow policies of a full branch queue
+BLOCK = "block"
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+FAIL = "fail"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, FAIL)
+
+DEFAULT_QUEUE_SIZE = 256
+
+# Marks the end of a branch queue
+_END = object()
+
+
+class ContentDelta(namedtuple("ContentDelta", "text")):
+    """A piece of the answer text"""
+
+    __slots__ = ()
+
+
+class ReasoningDelta(namedtuple("ReasoningDelta", "text")):
+    """A piece of the reasoning text some models stream before the answer"""
+
+    __slots__ = ()
+
+
+class Citation(namedtuple("Citation", "number url offset")):
+    """A ``[n]`` marker at character ``offset``; ``url`` is None if unknown"""
+
+    __slots__ = ()
+
+
+class Finish(namedtuple("Finish", "reason")):
+    """The ``finish_reason`` of the answer"""
+
+    __slots__ = ()
+
+
+class Usage(namedtuple("Usage", "prompt_tokens completion_tokens total_tokens")):
+    """Token usage, when the request asked for it (``stream_options``)"""
+
+    __slots__ = ()
+
+
+class QueueOverflow(Exception):
+    """A branch with the FAIL policy fell more than its queue size behind"""
+
+
+def chunk_events(chunk, citations=None):
+    """Typed events of one decoded completion chunk
+
+    citations -- optional ``CitationExtractor`` fed with the content deltas
+    """
+    events = []
+    choices = chunk.get("choices")
+    if choices:
+        choice = choices[0]
+        delta = choice.get("delta") or {}
+        reasoning = delta.get("reasoning_content") or delta.get("reasoning")
+        if reasoning:
+            events.append(ReasoningDelta(reasoning))
+        content = delta.get("content")
+        if content:
+            events.append(ContentDelta(content))
+        if citations is not None:
+            for number, offset in citations.feed_chunk(chunk):
+                events.append(Citation(number, citations.source(number), offset))
+        if choice.get("finish_reason"):
+            events.append(Finish(choice["finish_reason"]))
+    usage = chunk.get("usage")
+    if usage:
+        events.append(
+            Usage(
+                usage.get("prompt_tokens"),
+                usage.get("completion_tokens"),
+                usage.get("total_tokens"),
+            )
+        )
+    return events
+
+
+def iter_stream_events(chunks, citations=True):
+    """Yield the typed events of an iterator of completion chunks"""
+    extractor = CitationExtractor(keep_text=False) if citations else None
+    try:
+        for chunk in chunks:
+            yield from chunk_events(chunk, extractor)
+    finally:
+        _close(chunks)
+
+
+async def aiter_stream_events(chunks, citations=True):
+    """Async counterpart of ``iter_stream_events``"""
+    extractor = CitationExtractor(keep_text=False) if citations else None
+    try:
+        async for chunk in chunks:
+            for event in chunk_events(chunk, extractor):
+                yield event
+    finally:
+        await _aclose(chunks)
+
+
+def _close(iterator):
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+
+async def _aclose(iterator):
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+def _check_overflow(overflow):
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+
+
+# -----------------------------------------------------------------------------
+# Synchronous pipelines
+# -----------------------------------------------------------------------------
+
+
+class BoundedQueue:
+    """Thread-safe FIFO of at most ``maxsize`` items with an overflow policy"""
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        _check_overflow(overflow)
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self.items = deque()
+        self.dropped = 0  # Items discarded by the overflow policy
+        self.detached = False  # The consumer left; puts are ignored
+        self.error = None  # Raised to the consumer after the queued items
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        """Queue an item, applying the overflow policy when full"""
+        with self._cond:
+            if self.detached:
+                return
+            if len(self.items) >= self.maxsize:
+                if self.overflow == BLOCK:
+                    while len(self.items) >= self.maxsize and not self.detached:
+                        self._cond.wait()
+                    if self.detached:
+                        return
+                elif self.overflow == DROP_OLDEST:
+                    self.items.popleft()
+                    self.dropped += 1
+                elif self.overflow == DROP_NEWEST:
+                    self.dropped += 1
+                    return
+                else:
+                    self.items.clear()
+                    self.error = QueueOverflow(
+                        f"consumer fell more than {self.maxsize} events behind"
+                    )
+                    self.detached = True
+                    self.items.append(_END)
+                    self._cond.notify_all()
+                    return
+            self.items.append(item)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        """Mark the end of the items, optionally with an error to raise"""
+        with self._cond:
+            if not self.detached:
+                self.error = error
+                self.items.append(_END)
+                self._cond.notify_all()
+
+    def get(self):
+        """Next item, or ``_END`` once finished (raising its error, if any)"""
+        with self._cond:
+            while not self.items:
+                self._cond.wait()
+            item = self.items.popleft()
+            self._cond.notify_all()
+        if item is _END and self.error is not None:
+            raise self.error
+        return item
+
+    def detach(self):
+        """The consumer is gone: drop what is queued and ignore later puts"""
+        with self._cond:
+            self.detached = True
+            self.items.clear()
+            self._cond.notify_all()
+
+
+class _Broadcast:
+    # Pumps one upstream iterator into several branch queues from a thread
+
+    def __init__(self, source, queues, close):
+        self.source = source
+        self.queues = queues
+        self.close = close
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        error = None
+        try:
+            for item in self.source:
+                for queue in self.queues:
+                    queue.put(item)
+                if all(queue.detached for queue in self.queues):
+                    break  # Nobody is listening any more
+        except Exception as exc:
+            error = exc
+        finally:
+            self.close()  # Releases the connection, also when stopped early
+            for queue in self.queues:
+                queue.finish(error)
+
+
+class Pipeline:
+    """Composable iterator of stream events
+
+    source -- iterable of events (or of anything, after ``map``)
+    """
+
+    def __init__(self, source, upstream=None, queue=None):
+        self._source = source
+        self._upstream = upstream if upstream is not None else source
+        self.queue = queue  # Branch queue, for pipelines made by ``tee``
+
+    def __iter__(self):
+        return iter(self._source)
+
+    @property
+    def dropped(self):
+        """Events the overflow policy discarded on this branch"""
+        return self.queue.dropped if self.queue is not None else 0
+
+    def close(self):
+        """Stop reading the upstream stream and release its connection
+
+        On a ``tee`` branch this detaches the branch, also when it was never
+        iterated, so it cannot hold up the others.
+        """
+        if self.queue is not None:
+            self.queue.detach()
+        _close(self._upstream)
+
+    # -------------------------------------------------------------------------
+    # Operators
+    # -------------------------------------------------------------------------
+
+    def map(self, function):
+        """Pipeline of ``function(item)`` for every item"""
+        return Pipeline(map(function, self._source), self._upstream, self.queue)
+
+    def filter(self, predicate):
+        """Pipeline of the items for which ``predicate(item)`` is true"""
+        return Pipeline(filter(predicate, self._source), self._upstream, self.queue)
+
+    def of_type(self, *types):
+        """Pipeline of the events that are instances of ``types``"""
+        return self.filter(lambda event: isinstance(event, types))
+
+    def tee(self, count=2, queue_size=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        """Split into ``count`` independent pipelines over one upstream read
+
+        Each branch buffers up to ``queue_size`` events; ``overflow`` is one
+        policy for all branches or a list with one per branch. Reading starts
+        when the first branch is iterated.
+        """
+        policies = overflow if isinstance(overflow, (list, tuple)) else [overflow]
+        if len(policies) == 1:
+            policies = policies * count
+        queues = [BoundedQueue(queue_size, policy) for policy in policies]
+        broadcast = _Broadcast(self._source, queues, self.close)
+        return [Pipeline(_drain(queue, broadcast), queue=queue) for queue in queues]
+
+    def to(self, *sinks, queue_size=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        """Feed every item to each sink callable, each in its own thread
+
+        Blocks until the stream ends and every sink has caught up; returns
+        the number of items dropped per sink. An exception in a sink detaches
+        only that sink and is raised here once the others are done.
+        """
+        branches = self.tee(len(sinks), queue_size, overflow)
+        errors = []
+
+        def run(sink, branch):
+            try:
+                for item in branch:
+                    sink(item)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                branch.close()  # Detach, so a blocking policy cannot stall
+
+        threads = [
+            threading.Thread(target=run, args=pair, daemon=True)
+            for pair in zip(sinks, branches)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return [branch.dropped for branch in branches]
+
+
+def _drain(queue, broadcast):
+    broadcast.start()
+    try:
+        while True:
+            item = queue.get()
+            if item is _END:
+                return
+            yield item
+    finally:
+        queue.detach()  # Also when the consumer stops early
+
+
+# -----------------------------------------------------------------------------
+# Asynchronous pipelines
+# -----------------------------------------------------------------------------
+
+
+class AsyncBoundedQueue:
+    """asyncio counterpart of ``BoundedQueue`` (one event loop, no threads)"""
+
+    def __init__(self, maxsize=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        _check_overflow(overflow)
+        self.maxsize = max(1, maxsize)
+        self.overflow = overflow
+        self.items = deque()
+        self.dropped = 0
+        self.detached = False
+        self.error = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()  # Fresh event for the next wait
+
+    async def put(self, item):
+        if self.detached:
+            return
+        if len(self.items) >= self.maxsize:
+            if self.overflow == BLOCK:
+                while len(self.items) >= self.maxsize and not self.detached:
+                    await self._changed.wait()
+                if self.detached:
+                    return
+            elif self.overflow == DROP_OLDEST:
+                self.items.popleft()
+                self.dropped += 1
+            elif self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return
+            else:
+                self.items.clear()
+                self.error = QueueOverflow(
+                    f"consumer fell more than {self.maxsize} events behind"
+                )
+                self.detached = True
+                self.items.append(_END)
+                self._notify()
+                return
+        self.items.append(item)
+        self._notify()
+
+    def finish(self, error=None):
+        if not self.detached:
+            self.error = error
+            self.items.append(_END)
+            self._notify()
+
+    async def get(self):
+        while not self.items:
+            await self._changed.wait()
+        item = self.items.popleft()
+        self._notify()
+        if item is _END and self.error is not None:
+            raise self.error
+        return item
+
+    def detach(self):
+        self.detached = True
+        self.items.clear()
+        self._notify()
+
+
+class _AsyncBroadcast:
+    # Pumps one async upstream into several branch queues from a task
+
+    def __init__(self, source, queues, close):
+        self.source = source
+        self.queues = queues
+        self.close = close
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        error = None
+        try:
+            async for item in self.source:
+                for queue in self.queues:
+                    await queue.put(item)
+                if all(queue.detached for queue in self.queues):
+                    break
+        except Exception as exc:
+            error = exc
+        finally:
+            await self.close()
+            for queue in self.queues:
+                queue.finish(error)
+
+
+class AsyncPipeline:
+    """Composable async iterator of stream events
+
+    source -- async iterable of events (or of anything, after ``map``)
+    """
+
+    def __init__(self, source, upstream=None, queue=None):
+        self._source = source
+        self._upstream = upstream if upstream is not None else source
+        self.queue = queue
+
+    def __aiter__(self):
+        return self._source.__aiter__()
+
+    @property
+    def dropped(self):
+        """Events the overflow policy discarded on this branch"""
+        return self.queue.dropped if self.queue is not None else 0
+
+    async def aclose(self):
+        """Stop reading the upstream stream and release its connection
+
+        On a ``tee`` branch this detaches the branch; see ``Pipeline.close``.
+        """
+        if self.queue is not None:
+            self.queue.detach()
+        await _aclose(self._upstream)
+
+    # -------------------------------------------------------------------------
+    # Operators
+    # -------------------------------------------------------------------------
+
+    def map(self, function):
+        """Pipeline of ``function(item)`` for every item"""
+        return AsyncPipeline(_amap(function, self._source), self._upstream, self.queue)
+
+    def filter(self, predicate):
+        """Pipeline of the items for which ``predicate(item)`` is true"""
+        return AsyncPipeline(
+            _afilter(predicate, self._source), self._upstream, self.queue
+        )
+
+    def of_type(self, *types):
+        """Pipeline of the events that are instances of ``types``"""
+        return self.filter(lambda event: isinstance(event, types))
+
+    def tee(self, count=2, queue_size=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        """Split into ``count`` independent pipelines; see ``Pipeline.tee``"""
+        policies = overflow if isinstance(overflow, (list, tuple)) else [overflow]
+        if len(policies) == 1:
+            policies = policies * count
+        queues = [AsyncBoundedQueue(queue_size, policy) for policy in policies]
+        broadcast = _AsyncBroadcast(self._source, queues, self.aclose)
+        return [
+            AsyncPipeline(_adrain(queue, broadcast), queue=queue) for queue in queues
+        ]
+
+    async def to(self, *sinks, queue_size=DEFAULT_QUEUE_SIZE, overflow=BLOCK):
+        """Feed every item to each sink, each in its own task
+
+        Sinks are plain callables or coroutine functions. Returns the number
+        of items dropped per sink; see ``Pipeline.to``.
+        """
+        branches = self.tee(len(sinks), queue_size, overflow)
+
+        async def run(sink, branch):
+            is_async = asyncio.iscoroutinefunction(sink)
+            try:
+                async for item in branch:
+                    if is_async:
+                        await sink(item)
+                    else:
+                        sink(item)
+            finally:
+                await branch.aclose()
+
+        results = await asyncio.gather(
+            *(run(sink, branch) for sink, branch in zip(sinks, branches)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return [branch.dropped for branch in branches]
+
+
+async def _amap(function, source):
+    async for item in source:
+        yield function(item)
+
+
+async def _afilter(predicate, source):
+    async for item in source:
+        if predicate(item):
+            yield item
+
+
+async def _adrain(queue, broadcast):
+    broadcast.start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            yield item
+    finally:
+        queue.detach()
@@ -0,0 +1,244 @@
+"""
+Expedient AI Rate Limiting and Retries
+======================================
+
+Client-side pacing and retry handling shared by ``ExpedientClient`` and
+``AsyncExpedientClient``.
+
+``RateLimiter`` holds two token buckets, requests per minute and (estimated)
+tokens per minute. Callers reserve capacity under a lock and sleep for the
+returned delay outside it, so one limiter can be shared by every thread and
+every asyncio task in a process. A 429 with ``Retry-After`` pauses the whole
+limiter, not just the request that saw it, so workers back off together
+instead of hammering the gateway in lockstep.
+
+``RetryPolicy`` retries 429, transient 5xx and connection errors with
+decorrelated jittered backoff, waits at least ``Retry-After`` when the gateway
+sends one, and gives up when its retry budget (a fraction of recent requests)
+is spent, so retries cannot multiply load during an outage.
+
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=200000)
+    client = ExpedientClient(api_endpoint, api_key,
+                             rate_limiter=limiter, retry=RetryPolicy())
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+from .tokens import estimate_messages_tokens
+
+# Status codes worth retrying: rate limited or a transient gateway failure
+RETRY_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Completion size assumed for tokens/min pacing when max_tokens is not set
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def estimate_tokens(data):
+    """Upper estimate of the tokens a request body will consume"""
+    completion = (
+        data.get("max_tokens")
+        or data.get("max_completion_tokens")
+        or DEFAULT_COMPLETION_TOKENS
+    )
+    prompt = estimate_messages_tokens(data.get("messages", ()), data.get("model"))
+    return prompt + completion
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second
+
+    Reservations may drive the level negative; the returned delay is how long
+    the caller must wait for its share, which keeps callers in FIFO order.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount, now=None):
+        """Take ``amount`` tokens and return the seconds to wait for them"""
+        amount = min(amount, self.capacity)  # Oversized: wait for a full bucket
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            self._level = min(
+                self.capacity, self._level + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._level -= amount
+            if self._level >= 0:
+                return 0.0
+            return -self._level / self.rate
+
+    def drain(self, seconds):
+        """Empty the bucket so it refills only after ``seconds``"""
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self._level, -seconds * self.rate)
+            self._updated = now
+
+
+class RateLimiter:
+    """Requests/min and tokens/min limiter shared by threads and tasks
+
+    requests_per_minute -- request rate limit (None = unlimited)
+    tokens_per_minute   -- token rate limit, using ``estimate_tokens``
+    burst_seconds       -- bucket size, in seconds' worth of the rate
+    """
+
+    def __init__(
+        self, requests_per_minute=None, tokens_per_minute=None, burst_seconds=1.0
+    ):
+        self.requests = None
+        self.tokens = None
+        if requests_per_minute:
+            rate = requests_per_minute / 60
+            self.requests = TokenBucket(rate, max(1.0, rate * burst_seconds))
+        if tokens_per_minute:
+            rate = tokens_per_minute / 60
+            self.tokens = TokenBucket(rate, max(1.0, rate * burst_seconds))
+
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.pauses = 0
+
+    def reserve(self, tokens=0):
+        """Reserve capacity for one request and return the seconds to wait"""
+        delay = 0.0
+        if self.requests is not None:
+            delay = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        with self._lock:
+            self.acquired += 1
+            if delay > 0:
+                self.throttled += 1
+                self.throttled_seconds += delay
+        return delay
+
+    def acquire(self, tokens=0):
+        """Block the calling thread until a request may be sent"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=0):
+        """Wait in the event loop until a request may be sent"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Hold back every caller for ``seconds`` (e.g. after a 429)"""
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.drain(seconds)
+        with self._lock:
+            self.pauses += 1
+
+    def stats(self):
+        """Counters as a dict: requests paced, throttled and time spent waiting"""
+        return {
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "pauses": self.pauses,
+        }
+
+
+class RetryPolicy:
+    """Decorrelated-jitter retries with Retry-After support and a retry budget
+
+    max_retries     -- retries allowed for a single request
+    base_delay      -- smallest backoff, in seconds
+    max_delay       -- largest backoff (and largest Retry-After honoured)
+    retry_budget    -- retries that may be spent in a burst, shared by all requests
+    budget_ratio    -- retry budget earned back per request sent
+    """
+
+    def __init__(
+        self,
+        max_retries=5,
+        base_delay=0.5,
+        max_delay=30.0,
+        retry_budget=10,
+        budget_ratio=0.2,
+        seed=None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.budget_ratio = budget_ratio
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._budget = float(retry_budget)
+
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+        self.retry_after_waits = 0
+        self.backoff_seconds = 0.0
+
+    def started(self):
+        """Record a new (non-retry) request, which earns retry budget"""
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self._budget + self.budget_ratio, self.retry_budget)
+
+    def delay(self, attempt, previous, status_code=None, retry_after=None):
+        """Seconds to wait before retry number ``attempt``, or None to give up
+
+        ``previous`` is the delay used before the last retry (None at first).
+        """
+        if attempt >= self.max_retries:
+            return None
+        if status_code is not None and status_code not in RETRY_STATUS_CODES:
+            return None
+        with self._lock:
+            if self._budget < 1:
+                self.exhausted += 1
+                return None
+            self._budget -= 1
+
+            # Decorrelated jitter: uniform between base and 3x the last delay
+            upper = max(self.base_delay, (previous or self.base_delay) * 3)
+            delay = min(self.max_delay, self._random.uniform(self.base_delay, upper))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_delay))
+                self.retry_after_waits += 1
+            self.retries += 1
+            self.backoff_seconds += delay
+        return delay
+
+    def stats(self):
+        """Counters as a dict: retries made, budget refusals and time backed off"""
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "budget_exhausted": self.exhausted,
+            "retry_after_waits": self.retry_after_waits,
+            "backoff_seconds": round(self.backoff_seconds, 3),
+        }
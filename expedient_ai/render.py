@@ -0,0 +1,209 @@
+"""
+Streaming Output Rendering
+==========================
+
+``StreamWriter`` replaces ``print(delta, end="", flush=True)`` for streamed
+answers. Deltas are appended to a buffer and written out at most once per
+frame (``fps``), so a fast model costs a handful of write syscalls per
+second instead of one per token. The first delta after a pause is written
+immediately, and a background flusher writes the rest of a frame when its
+time is up, so nothing waits for the next token to appear. Regular files are
+written in large blocks instead, since nobody watches them frame by frame.
+
+``Spinner`` is the "thinking..." indicator. It runs on an ``Event``: stopping
+it wakes the animation thread at once, with no polling interval or sleep
+before the first token is shown. On a file or pipe it prints its message
+once instead of animating with carriage returns.
+
+    with Spinner("🤔 AI is thinking") as spinner, StreamWriter() as out:
+        for chunk in client.stream(model, messages):
+            ...
+            spinner.stop("🤔 AI is thinking... Done!")
+            out.write(content)
+"""
+
+import os
+import stat
+import sys
+import threading
+import time
+
+DEFAULT_FPS = 30
+DEFAULT_FILE_BUFFER = 64 * 1024
+
+
+def is_regular_file(file):
+    """Whether ``file`` is backed by a regular file (not a TTY, pipe or socket)"""
+    try:
+        return stat.S_ISREG(os.fstat(file.fileno()).st_mode)
+    except (AttributeError, OSError, ValueError):
+        return False  # No usable descriptor (e.g. StringIO): treat as a stream
+
+
+def is_terminal(file):
+    """Whether ``file`` is an interactive terminal"""
+    try:
+        return file.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+class StreamWriter:
+    """Coalesces streamed text into frame-rate-limited writes
+
+    file         -- text file to write to (default: sys.stdout)
+    fps          -- maximum writes per second to a terminal or pipe
+    buffer_size  -- characters buffered before writing to a regular file
+    """
+
+    def __init__(self, file=None, fps=DEFAULT_FPS, buffer_size=DEFAULT_FILE_BUFFER):
+        self.file = file if file is not None else sys.stdout
+        self.interval = 1.0 / fps
+        self.buffer_size = buffer_size
+        self.framed = not is_regular_file(self.file)
+
+        self._parts = []
+        self._size = 0
+        self._last_write = 0.0
+        self._cond = threading.Condition()
+        self._flusher = None
+        self._closed = False
+        self._error = None  # Raised by the flusher thread, e.g. a closed pipe
+
+        self.deltas = 0  # Calls to write()
+        self.writes = 0  # Writes actually issued to the file
+
+    def write(self, text):
+        """Queue text for output"""
+        if not text:
+            return
+        with self._cond:
+            self._raise_error()
+            self._parts.append(text)
+            self._size += len(text)
+            self.deltas += 1
+            if not self.framed:
+                if self._size >= self.buffer_size:
+                    self._write_locked()
+            elif time.monotonic() - self._last_write >= self.interval:
+                self._write_locked()  # Leading edge of a frame: show it now
+            else:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._run, daemon=True)
+                    self._flusher.start()
+                self._cond.notify()
+
+    def flush(self):
+        """Write everything queued so far"""
+        with self._cond:
+            self._write_locked()
+
+    def close(self):
+        """Flush and stop the background flusher (the file stays open)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _write_locked(self):
+        self._raise_error()
+        if self._parts:
+            self.file.write("".join(self._parts))
+            self.file.flush()
+            self._parts = []
+            self._size = 0
+            self.writes += 1
+        self._last_write = time.monotonic()
+
+    def _run(self):
+        # Trailing edge: write a partly filled frame when its time is up
+        with self._cond:
+            while not self._closed:
+                if not self._parts:
+                    self._cond.wait()
+                    continue
+                delay = self._last_write + self.interval - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                else:
+                    try:
+                        self._write_locked()
+                    except OSError as error:
+                        self._error = error  # Reported by the next write
+                        self._parts = []
+                        return
+
+
+class Spinner:
+    """Progress indicator thread that stops through an ``Event``
+
+    message   -- text shown before the animated dots
+    file      -- where to draw it (default: sys.stdout)
+    interval  -- seconds between animation frames
+    """
+
+    FRAMES = (".", "..", "...")
+
+    def __init__(self, message, file=None, interval=0.5):
+        self.message = message
+        self.file = file if file is not None else sys.stdout
+        self.interval = interval
+        self.animated = is_terminal(self.file)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Show the indicator until ``stop`` is called"""
+        if not self.animated:
+            self.file.write(f"{self.message}...\n")
+            self.file.flush()
+            return self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, final=None):
+        """Stop the animation at once; replace it with ``final`` if given
+
+        Safe to call more than once; only the first call has an effect.
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if final is not None:
+            if self.animated:
+                final = f"\r{final}     "  # Overwrite the animated line
+            self.file.write(f"{final}\n")
+            self.file.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        frame = 0
+        while True:
+            dots = self.FRAMES[frame % len(self.FRAMES)]
+            self.file.write(f"\r{self.message}{dots}   ")
+            self.file.flush()
+            frame += 1
+            if self._stop.wait(self.interval):
+                return
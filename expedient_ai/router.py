@@ -0,0 +1,309 @@
+"""
+Latency-Aware Model Router
+==========================
+
+Picks a model per request from a class of equivalent models (all served by
+the same gateway URL) using live measurements instead of a hard-coded choice.
+
+For every model the router keeps exponentially weighted moving averages
+(EWMA) of time to first token, tokens/s and error rate, and sends each
+request to the model with the lowest expected latency. A per-model circuit
+breaker opens after repeated failures or a high error rate, moving traffic
+away from a degrading provider within a few requests; after ``cooldown``
+seconds one probe request is let through and a success closes the breaker.
+Models without recent measurements are probed first so their numbers stay
+current. If a request fails before its first token, the next model is tried;
+chunks are held back until that token, so the caller only sees one model.
+
+    router = ModelRouter("fast")
+    for chunk in router.stream(client, messages, max_tokens=300):
+        ...
+    print(router.report())
+"""
+
+import threading
+import time
+
+from .client import ExpedientAPIError
+
+# Classes of interchangeable models, fastest-first by default
+MODEL_CLASSES = {
+    "fast": ["gpt-4o-mini", "claude-3-haiku-20240307", "gemini/gemini-2.0-flash"],
+    "analysis": [
+        "gpt-4.1",
+        "gpt-4o",
+        "claude-3-7-sonnet-20250219",
+        "gemini/gemini-1.5-pro",
+    ],
+    "reasoning": ["o4-mini", "claude-sonnet-4-20250514", "gemini/gemini-2.5-pro"],
+    "web": ["perplexity/sonar-pro", "perplexity/sonar-reasoning-pro"],
+}
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Outcomes of a routed request
+SUCCESS = "success"
+FAILURE = "failure"
+
+
+def _ewma(current, sample, alpha):
+    return sample if current is None else current + alpha * (sample - current)
+
+
+class ModelHealth:
+    """Live latency, throughput and error statistics of one model"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ttft = None  # EWMA seconds to first content delta
+        self.tokens_per_s = None  # EWMA generation speed after the first token
+        self.error_rate = 0.0  # EWMA of failures (1) and successes (0)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.probing = False  # A half-open probe request is in flight
+        self.last_sample = 0.0  # time.monotonic() of the last measurement
+
+    def expected_latency(self, expected_tokens):
+        """Estimated seconds to complete a response of ``expected_tokens``"""
+        if self.ttft is None:
+            return 0.0  # Unmeasured: try it first
+        speed = self.tokens_per_s or 0.0
+        return self.ttft + (expected_tokens / speed if speed else 0.0)
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "ttft_ms": round(self.ttft * 1000, 1) if self.ttft is not None else None,
+            "tokens_per_s": (
+                round(self.tokens_per_s, 1) if self.tokens_per_s is not None else None
+            ),
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class ModelRouter:
+    """Routes each request to the fastest healthy model of a class
+
+    models             -- list of model names, or a key of ``MODEL_CLASSES``
+    alpha              -- EWMA weight of the newest sample (0-1)
+    failure_threshold  -- consecutive failures that open a model's breaker
+    error_threshold    -- EWMA error rate that opens a model's breaker
+    cooldown           -- seconds a breaker stays open before a probe
+    stale_after        -- seconds after which a model is re-measured
+    expected_tokens    -- response length used to weigh TTFT against tokens/s
+    """
+
+    def __init__(
+        self,
+        models,
+        alpha=0.3,
+        failure_threshold=3,
+        error_threshold=0.5,
+        cooldown=10.0,
+        stale_after=60.0,
+        expected_tokens=200,
+    ):
+        if isinstance(models, str):
+            models = MODEL_CLASSES[models]
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.stale_after = stale_after
+        self.expected_tokens = expected_tokens
+        self.health = {model: ModelHealth(model) for model in self.models}
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Model selection and feedback
+    # -------------------------------------------------------------------------
+
+    def choose(self, exclude=()):
+        """Name of the model the next request should go to"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for model in self.models:
+                health = self.health[model]
+                if model in exclude:
+                    continue
+                if health.state == OPEN and now >= health.open_until:
+                    health.state = HALF_OPEN
+                if health.state == OPEN or (health.probing and now < health.open_until):
+                    continue
+                stale = now - health.last_sample > self.stale_after
+                score = 0.0 if stale else health.expected_latency(self.expected_tokens)
+                candidates.append((score, not stale, model))
+
+            if not candidates:
+                # Every breaker is open: fail over to the one that reopens first
+                remaining = [m for m in self.models if m not in exclude] or self.models
+                return min(remaining, key=lambda m: self.health[m].open_until)
+
+            _, fresh, model = min(candidates)
+            health = self.health[model]
+            if health.state == HALF_OPEN:
+                # Only one probe at a time; an abandoned one expires after cooldown
+                health.probing = True
+                health.open_until = now + self.cooldown
+            if not fresh:
+                health.last_sample = now  # One re-measurement at a time
+            return model
+
+    def record_success(self, model, ttft, tokens=0, duration=0.0):
+        """Feed back a completed request: TTFT, tokens and total seconds"""
+        with self._lock:
+            health = self.health[model]
+            health.requests += 1
+            health.consecutive_failures = 0
+            health.error_rate = _ewma(health.error_rate, 0.0, self.alpha)
+            if ttft is not None:
+                health.ttft = _ewma(health.ttft, ttft, self.alpha)
+            generation = duration - (ttft or 0.0)
+            if tokens > 1 and generation > 0:
+                speed = (tokens - 1) / generation
+                health.tokens_per_s = _ewma(health.tokens_per_s, speed, self.alpha)
+            health.last_sample = time.monotonic()
+            health.state = CLOSED
+            health.probing = False
+
+    def record_failure(self, model):
+        """Feed back a failed request; may open the model's circuit breaker"""
+        with self._lock:
+            health = self.health[model]
+            health.requests += 1
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.error_rate = _ewma(health.error_rate, 1.0, self.alpha)
+            health.last_sample = time.monotonic()
+            if (
+                health.state == HALF_OPEN
+                or health.consecutive_failures >= self.failure_threshold
+                or health.error_rate >= self.error_threshold
+            ):
+                health.state = OPEN
+                health.open_until = time.monotonic() + self.cooldown
+            health.probing = False
+
+    def report(self):
+        """Per-model health snapshot as a dict"""
+        with self._lock:
+            return {model: self.health[model].snapshot() for model in self.models}
+
+    # -------------------------------------------------------------------------
+    # Routed requests
+    # -------------------------------------------------------------------------
+
+    def stream(self, client, messages, **params):
+        """Stream from the best model with an ``ExpedientClient``
+
+        Chunks are held back until the first content delta, so a failure
+        before it is recorded and the request moves on to the next model
+        without the caller seeing anything; after it errors propagate.
+        """
+        tried = []
+        while True:
+            model = self.choose(exclude=tried)
+            tried.append(model)
+            start = time.perf_counter()
+            ttft, tokens = None, 0
+            head = []  # Chunks before the first content delta
+            outcome = None  # Stays None if the caller abandons the stream
+            try:
+                for chunk in client.stream(model, messages, **params):
+                    if _content(chunk):
+                        tokens += 1
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                            yield from head
+                            head = None
+                    if head is None:
+                        yield chunk
+                    else:
+                        head.append(chunk)
+                if head:
+                    yield from head  # No content at all
+                outcome = SUCCESS
+            except (ExpedientAPIError,) + client.transport.errors:
+                outcome = FAILURE
+                if tokens or len(tried) == len(self.models):
+                    raise
+                continue
+            except Exception:
+                outcome = FAILURE
+                raise
+            finally:
+                self._record(model, outcome, ttft, tokens, start)
+            return
+
+    async def astream(self, client, messages, **params):
+        """Async counterpart of ``stream`` for an ``AsyncExpedientClient``"""
+        tried = []
+        while True:
+            model = self.choose(exclude=tried)
+            tried.append(model)
+            start = time.perf_counter()
+            ttft, tokens = None, 0
+            head = []
+            outcome = None
+            chunks = None
+            try:
+                chunks = await client.stream(model, messages, **params)
+                async for chunk in chunks:
+                    if _content(chunk):
+                        tokens += 1
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                            for held in head:
+                                yield held
+                            head = None
+                    if head is None:
+                        yield chunk
+                    else:
+                        head.append(chunk)
+                for held in head or ():
+                    yield held
+                outcome = SUCCESS
+            except (ExpedientAPIError,) + client.transport.errors:
+                outcome = FAILURE
+                if tokens or len(tried) == len(self.models):
+                    raise
+                continue
+            except Exception:
+                outcome = FAILURE
+                raise
+            finally:
+                # Unlike a sync generator, an abandoned async one is not
+                # closed when the last reference goes: free its connection now
+                if chunks is not None:
+                    await chunks.aclose()
+                self._record(model, outcome, ttft, tokens, start)
+            return
+
+    def _record(self, model, outcome, ttft, tokens, start):
+        if outcome == FAILURE:
+            self.record_failure(model)
+        elif outcome == SUCCESS or ttft is not None:
+            # Also a stream the caller stopped reading after content arrived
+            self.record_success(model, ttft, tokens, time.perf_counter() - start)
+        else:
+            # Abandoned before its first token: nothing measured, but a
+            # half-open probe must not block the next one until cooldown
+            with self._lock:
+                self.health[model].probing = False
+
+
+def _content(chunk):
+    choices = chunk.get("choices")
+    return bool(choices and choices[0].get("delta", {}).get("content"))
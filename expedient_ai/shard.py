@@ -0,0 +1,345 @@
+"""
+Sharded Batch Jobs
+==================
+
+Splits one large JSONL prompt file across several batch workers (processes
+or machines) without a coordinator, then merges their outputs. Every worker
+runs the normal batch runner on the full input with ``--shard I/N`` and
+works out its own share from the file alone:
+
+- ``offset`` (default): the file is cut into N byte ranges of equal size,
+  moved forward to the next line start, so a worker only reads its range
+- ``hash``: a record belongs to shard ``crc32(id) % N``, which keeps the
+  assignment stable when records are added, removed or reordered; every
+  worker scans the whole file but only sends its own records
+
+Workers write their results and a manifest of the completed and failed ids
+next to their output (``results.jsonl.manifest.json``). The merge step reads
+the input and any number of result files, keeps one result per id (an
+``ok`` result wins over an error), writes them in input order, and lists the
+failed or missing records in a retry file. The retry file is itself a batch
+input, with the original ids, so it can be run again on any number of
+workers and merged together with the first outputs:
+
+    # on worker I of 4
+    python -m expedient_ai.batch prompts.jsonl results-I.jsonl --shard I/4
+
+    # anywhere, once the outputs are gathered
+    python -m expedient_ai.shard merge prompts.jsonl results-*.jsonl \\
+        --output merged.jsonl --retry retry.jsonl
+
+Re-running a worker resumes from its checkpoint and never repeats a finished
+record; re-running the merge rewrites the same files. Record ids must be
+unique; records without an ``id`` are identified by their line number.
+"""
+
+import argparse
+import json
+import os
+import sys
+import zlib
+
+OFFSET = "offset"
+HASH = "hash"
+STRATEGIES = (OFFSET, HASH)
+
+# Bytes read at a time while counting lines ahead of a shard
+SCAN_BLOCK = 1024 * 1024
+
+
+def parse_shard(text):
+    """(index, count) of a ``"I/N"`` shard spec"""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like I/N, got {text!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be in 0..{count - 1}, got {text!r}")
+    return index, count
+
+
+def shard_of(record_id, count):
+    """Shard owning ``record_id`` under the ``hash`` strategy"""
+    return zlib.crc32(str(record_id).encode("utf-8")) % count
+
+
+class Shard:
+    """One worker's share of an input file
+
+    index, count -- this is shard ``index`` of ``count``
+    by           -- ``offset`` or ``hash``
+    start, end   -- byte range of the input read by the worker (end=None: EOF)
+    first_line   -- line number of the line starting at ``start``
+    """
+
+    def __init__(self, index, count, by=OFFSET, start=0, end=None, first_line=0):
+        self.index = index
+        self.count = count
+        self.by = by
+        self.start = start
+        self.end = end
+        self.first_line = first_line
+
+    def owns(self, line, raw):
+        """Whether the record on ``line`` is processed by this shard"""
+        if self.by != HASH or self.count == 1:
+            return True
+        try:
+            record_id = json.loads(raw).get("id", line)
+        except (ValueError, AttributeError):
+            record_id = line  # Malformed lines are reported by their owner
+        return shard_of(record_id, self.count) == self.index
+
+    def spec(self):
+        """JSON-serializable description, stored in checkpoints and manifests"""
+        return {
+            "shard": self.index,
+            "shards": self.count,
+            "by": self.by,
+            "start": self.start,
+            "end": self.end,
+            "first_line": self.first_line,
+        }
+
+    def __repr__(self):
+        return f"Shard({self.index}/{self.count}, by={self.by!r})"
+
+
+def plan_shards(path, count, by=OFFSET):
+    """Plan every shard of ``path``; the same file always gives the same plan"""
+    if by not in STRATEGIES:
+        raise ValueError(f"unknown shard strategy {by!r}")
+    if by == HASH:
+        return [Shard(index, count, HASH) for index in range(count)]
+
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, "rb") as f:
+        for index in range(1, count):
+            boundary = size * index // count
+            if boundary == 0:  # More shards than bytes
+                starts.append(0)
+                continue
+            f.seek(boundary - 1)
+            f.readline()  # Move on to the first line starting at or after it
+            starts.append(max(f.tell(), starts[-1]))
+
+        # Line numbers of the shard starts, counted in one pass
+        first_lines = []
+        lines = position = 0
+        f.seek(0)
+        for start in starts:
+            while position < start:
+                block = f.read(min(SCAN_BLOCK, start - position))
+                lines += block.count(b"\n")
+                position += len(block)
+            first_lines.append(lines)
+
+    ends = starts[1:] + [None]
+    return [
+        Shard(index, count, OFFSET, start, end, first_line)
+        for index, (start, end, first_line) in enumerate(zip(starts, ends, first_lines))
+    ]
+
+
+def plan_shard(path, index, count, by=OFFSET):
+    """Plan shard ``index`` of ``count`` of ``path``"""
+    return plan_shards(path, count, by)[index]
+
+
+# -----------------------------------------------------------------------------
+# Manifests
+# -----------------------------------------------------------------------------
+
+
+def manifest_path(output_path):
+    return f"{output_path}.manifest.json"
+
+
+def write_manifest(output_path, input_path, shard=None):
+    """Record the ids completed and failed in ``output_path`` (atomically)
+
+    Ids are listed in input order, so the manifest of a finished worker is
+    the same however often it is re-run.
+    """
+    completed, failed = {}, {}
+    with open(output_path, "rb") as f:
+        for raw in f:
+            result = json.loads(raw)
+            target = completed if result["status"] == "ok" else failed
+            target[result["line"]] = result["id"]
+    for line in completed:
+        failed.pop(line, None)
+    manifest = {
+        "input": os.path.basename(input_path),
+        **(shard or Shard(0, 1)).spec(),
+        "completed": [completed[line] for line in sorted(completed)],
+        "failed": [failed[line] for line in sorted(failed)],
+    }
+    path = manifest_path(output_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def load_manifest(output_path):
+    """The manifest written next to ``output_path``, or None"""
+    try:
+        with open(manifest_path(output_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# -----------------------------------------------------------------------------
+# Merge
+# -----------------------------------------------------------------------------
+
+
+def _index_input(input_path):
+    """Ids of the input records in order: id -> (line, byte offset)"""
+    records = {}
+    offset = 0
+    with open(input_path, "rb") as f:
+        for line, raw in enumerate(f):
+            if raw.strip():
+                try:
+                    record_id = json.loads(raw).get("id", line)
+                except (ValueError, AttributeError):
+                    record_id = line
+                if record_id in records:
+                    raise ValueError(
+                        f"duplicate id {record_id!r} on lines "
+                        f"{records[record_id][0]} and {line}"
+                    )
+                records[record_id] = (line, offset)
+            offset += len(raw)
+    return records
+
+
+def _write_json_line(f, value):
+    f.write((json.dumps(value, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+def merge_outputs(input_path, result_paths, output_path, retry_path=None):
+    """Merge batch outputs into one result per input record, in input order
+
+    Returns counters: ``records``, ``ok``, ``failed``, ``missing`` (no result
+    at all), ``duplicates`` (extra results for an id, e.g. from retries) and
+    ``unknown`` (results whose id is not in the input).
+    """
+    records = _index_input(input_path)
+    counts = {
+        "records": len(records),
+        "ok": 0,
+        "failed": 0,
+        "missing": 0,
+        "duplicates": 0,
+        "unknown": 0,
+    }
+
+    # id -> (is ok, file index, byte offset) of the result kept for it
+    chosen = {}
+    for file_index, path in enumerate(result_paths):
+        with open(path, "rb") as f:
+            offset = 0
+            for raw in f:
+                if raw.endswith(b"\n"):  # Skip a half-written last line
+                    result = json.loads(raw)
+                    record_id = result["id"]
+                    if record_id not in records:
+                        counts["unknown"] += 1
+                    else:
+                        ok = result["status"] == "ok"
+                        previous = chosen.get(record_id)
+                        if previous is not None:
+                            counts["duplicates"] += 1
+                        if previous is None or (ok and not previous[0]):
+                            chosen[record_id] = (ok, file_index, offset)
+                offset += len(raw)
+
+    files = [open(path, "rb") for path in result_paths]
+    try:
+        with open(f"{output_path}.tmp", "wb") as output, open(
+            input_path, "rb"
+        ) as source:
+            retry = open(f"{retry_path}.tmp", "wb") if retry_path else None
+            try:
+                for record_id, (line, input_offset) in records.items():
+                    entry = chosen.get(record_id)
+                    if entry is not None:
+                        ok, file_index, offset = entry
+                        files[file_index].seek(offset)
+                        result = json.loads(files[file_index].readline())
+                        result["line"] = line  # Retry runs number their own lines
+                        _write_json_line(output, result)
+                        if ok:
+                            counts["ok"] += 1
+                            continue
+                        counts["failed"] += 1
+                    else:
+                        counts["missing"] += 1
+                    if retry is not None:
+                        source.seek(input_offset)
+                        raw = source.readline()
+                        try:
+                            record = json.loads(raw)
+                            record["id"] = record_id  # Keep the id of this run
+                        except (ValueError, TypeError):
+                            retry.write(raw.rstrip(b"\n") + b"\n")  # As it was
+                            continue
+                        _write_json_line(retry, record)
+            finally:
+                if retry is not None:
+                    retry.close()
+    finally:
+        for f in files:
+            f.close()
+    os.replace(f"{output_path}.tmp", output_path)
+    if retry_path:
+        os.replace(f"{retry_path}.tmp", retry_path)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Plan shards of a batch input and merge the shard outputs"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan = commands.add_parser("plan", help="print the shard plan of an input file")
+    plan.add_argument("input")
+    plan.add_argument("--shards", type=int, required=True)
+    plan.add_argument("--by", choices=STRATEGIES, default=OFFSET)
+
+    merge = commands.add_parser("merge", help="merge shard outputs into one file")
+    merge.add_argument("input", help="the original input JSONL file")
+    merge.add_argument("results", nargs="+", help="batch output files to merge")
+    merge.add_argument("--output", required=True, help="merged output JSONL file")
+    merge.add_argument("--retry", help="write failed and missing records here")
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        for shard in plan_shards(args.input, args.shards, args.by):
+            print(json.dumps(shard.spec()))
+        return 0
+
+    for path in args.results:
+        manifest = load_manifest(path)
+        if manifest is None:
+            print(f"Warning: {path} has no manifest (still running?)", file=sys.stderr)
+    counts = merge_outputs(args.input, args.results, args.output, args.retry)
+    print(
+        f"Merged {counts['records']} records: {counts['ok']} ok, "
+        f"{counts['failed']} failed, {counts['missing']} missing"
+        f" ({counts['duplicates']} duplicate and {counts['unknown']} unknown results)"
+    )
+    if args.retry:
+        print(f"Records to retry written to {args.retry}")
+    return 1 if counts["failed"] or counts["missing"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
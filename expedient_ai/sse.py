@@ -0,0 +1,273 @@
+"""
+Incremental Server-Sent Events Decoder
+======================================
+
+Byte-level ``text/event-stream`` decoder fed with raw network chunks (``bytes``,
+``bytearray`` or ``memoryview``). Complete events are cut out of the buffer
+with C-level ``bytes`` searches, so when every event of a read is a single
+``data:`` line their payloads cost a few counts and one split; nothing is
+decoded to ``str`` until the caller asks for it. JSON payloads go straight
+from bytes to ``orjson`` when it is installed, which is where most of the
+speedup over an ``iter_lines`` + ``json.loads`` loop comes from; without it
+the stdlib C scanner is called directly.
+
+Implements the full event-stream framing: CR, LF and CRLF line endings (also
+when split across chunks), multi-line ``data:`` fields, ``event:``, ``id:`` and
+``retry:`` fields, and ``:`` comment lines.
+
+    decoder = SSEDecoder()
+    for raw in response.iter_content(chunk_size=None):
+        for event in decoder.feed(raw):
+            ...
+"""
+
+import json
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:  # optional faster JSON backend
+    orjson = None
+
+# Payload of the event that terminates an OpenAI-style completion stream
+DONE_DATA = b"[DONE]"
+
+
+# The C scanner behind json.loads, called without its Python-level wrapper
+# (type checks and a whitespace regex), which costs more than the scan itself
+# on chunk-sized documents
+_scan_once = json.JSONDecoder().scan_once
+
+
+def stdlib_json_loads(data):
+    """Decode JSON from bytes with the stdlib ``json`` C scanner"""
+    text = data.decode("utf-8")
+    try:
+        value, end = _scan_once(text, 0)
+    except StopIteration:
+        return json.loads(text)  # Leading whitespace, or the proper error
+    if end != len(text):
+        return json.loads(text)  # Trailing whitespace, or extra data
+    return value
+
+
+json_loads = orjson.loads if orjson is not None else stdlib_json_loads
+
+
+class ServerSentEvent(namedtuple("ServerSentEvent", "event data id retry")):
+    """One dispatched event; ``data`` is the raw bytes of its data fields"""
+
+    __slots__ = ()
+
+    def text(self):
+        """Event data decoded as UTF-8"""
+        return self.data.decode("utf-8")
+
+    def json(self):
+        """Event data decoded as JSON"""
+        return json_loads(self.data)
+
+
+# Builds a ServerSentEvent without the Python-level namedtuple __new__
+_new_event = tuple.__new__
+
+
+class SSEDecoder:
+    """Incremental event-stream decoder; feed bytes, get complete events back"""
+
+    def __init__(self):
+        self._parts = []  # Start of the event that is not complete yet
+        self._cr = False  # A CR ended the last chunk; its LF may follow
+        self._retry = None
+        self.last_event_id = None  # Persists across events, as per the spec
+
+    def feed(self, chunk):
+        """Consume a chunk of bytes and return the events it completed"""
+        complete = self._complete(chunk)
+        if not complete:
+            return []
+        payloads = _single_data_lines(complete)
+        if payloads is not None:  # Common case: one data line per event
+            event_id, retry = self.last_event_id, self._retry
+            return [
+                _new_event(ServerSentEvent, ("message", data, event_id, retry))
+                for data in payloads
+            ]
+        return self._parse(complete)
+
+    def feed_data(self, chunk):
+        """Like ``feed`` but return only the ``data`` payload of each event
+
+        This is the hot path for completion streams, whose events are almost
+        always a single ``data:`` line: when every event a chunk completed has
+        that shape, the payloads are cut out with one ``split``, and only
+        other shapes go through the full field parser.
+        """
+        complete = self._complete(chunk)
+        if not complete:
+            return []
+        payloads = _single_data_lines(complete)
+        if payloads is not None:
+            return payloads
+        return [event.data for event in self._parse(complete)]
+
+    def flush(self):
+        """Finish the stream and return the events still pending (always none)
+
+        Per the spec an event that is not followed by a blank line is never
+        dispatched; its ``id:`` and ``retry:`` fields still take effect.
+        """
+        remainder = b"".join(self._parts)
+        self._parts = []
+        self._cr = False
+        if remainder:
+            self._process_block(remainder, events=None)
+        return []
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    def _complete(self, chunk):
+        # The events ``chunk`` completes, without their final blank line, or
+        # b"". Newlines are normalized once per chunk, and bytes are only
+        # joined when a blank line arrived, so an event spread over many
+        # reads is not rescanned or copied on each of them.
+        if type(chunk) is not bytes:
+            chunk = bytes(chunk)
+        if self._cr:
+            chunk = b"\r" + chunk
+            self._cr = False
+        if chunk.find(b"\r") != -1:  # find() beats "in" on bytes
+            chunk = _normalize_newlines(chunk)
+            if chunk.endswith(b"\r"):
+                chunk = chunk[:-1]
+                self._cr = True
+        parts = self._parts
+        if parts:
+            # A blank line may start with the LF that ended the last read
+            if chunk.find(b"\n\n") == -1 and not (
+                chunk[:1] == b"\n" and parts[-1].endswith(b"\n")
+            ):
+                if chunk:
+                    parts.append(chunk)
+                return b""
+            parts.append(chunk)
+            data = b"".join(parts)
+            self._parts = []
+        else:
+            data = chunk
+        if data.endswith(b"\n\n"):  # Reads usually end with an event
+            return data[:-2]
+        end = data.rfind(b"\n\n")
+        if end == -1:
+            self._parts = [data] if data else []
+            return b""
+        rest = data[end + 2 :]
+        self._parts = [rest] if rest else []
+        return data[:end]
+
+    def _parse(self, complete):
+        events = []
+        for block in complete.split(b"\n\n"):
+            if block:
+                self._process_block(block, events)
+        return events
+
+    def _process_block(self, block, events):
+        data = []
+        event_type = None
+        for line in block.split(b"\n"):
+            if not line or line[0] == 0x3A:  # Blank line or ':' comment
+                continue
+            name, colon, value = line.partition(b":")
+            if colon and value.startswith(b" "):  # Strip one leading space
+                value = value[1:]
+
+            if name == b"data":
+                data.append(value)
+            elif name == b"event":
+                event_type = value.decode("utf-8")
+            elif name == b"id":
+                if b"\0" not in value:
+                    self.last_event_id = value.decode("utf-8")
+            elif name == b"retry":
+                if value.isdigit():
+                    self._retry = int(value)
+            # Unknown field names are ignored
+
+        if data and events is not None:
+            events.append(
+                ServerSentEvent(
+                    event_type or "message",
+                    data[0] if len(data) == 1 else b"\n".join(data),
+                    self.last_event_id,
+                    self._retry,
+                )
+            )
+        return events
+
+
+def _single_data_lines(complete):
+    # Payloads of ``complete`` if each of its events is exactly one
+    # "data: ..." line, else None. Every LF must then be half of an event
+    # separator, and every separator be followed by "data: ", which a few
+    # C-level counts establish without looking at the events one by one
+    if not complete.startswith(b"data: "):
+        return None
+    newlines = complete.count(b"\n")
+    if not newlines:
+        return [complete[6:]]  # One event
+    separators = complete.count(b"\n\n")
+    if newlines == 2 * separators and complete.count(b"\n\ndata: ") == separators:
+        return complete[6:].split(b"\n\ndata: ")
+    return None
+
+
+def _normalize_newlines(data):
+    # Rewrite CRLF and lone CR as LF. A trailing CR is kept as-is because the
+    # LF that may complete it has not arrived yet.
+    held = data.endswith(b"\r")
+    body = data[:-1] if held else data
+    body = body.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return body + b"\r" if held else body
+
+
+def iter_events(byte_chunks):
+    """Yield every event decoded from an iterable of raw byte chunks"""
+    decoder = SSEDecoder()
+    for raw in byte_chunks:
+        yield from decoder.feed(raw)
+    yield from decoder.flush()
+
+
+def decode_chunk(data):
+    """Decode one completion chunk payload: the JSON dict, or None to skip it"""
+    try:
+        return json_loads(data)
+    except ValueError:
+        return None  # Skip malformed JSON
+
+
+def iter_chat_chunks(byte_chunks):
+    """Yield decoded completion chunks from raw byte chunks until ``[DONE]``"""
+    decoder = SSEDecoder()
+    for raw in byte_chunks:
+        for data in decoder.feed_data(raw):
+            if data == DONE_DATA:
+                return
+            chunk = decode_chunk(data) if data else None  # Skip empty events
+            if chunk is not None:
+                yield chunk
+
+
+async def aiter_chat_chunks(byte_chunks):
+    """Async counterpart of ``iter_chat_chunks`` for async byte iterators"""
+    decoder = SSEDecoder()
+    async for raw in byte_chunks:
+        for data in decoder.feed_data(raw):
+            if data == DONE_DATA:
+                return
+            chunk = decode_chunk(data) if data else None  # Skip empty events
+            if chunk is not None:
+                yield chunk
@@ -0,0 +1,15 @@
+"""
+Latency Statistics
+==================
+
+Small helpers shared by the batch runner, the hedger and the benchmarks to
+summarize latency samples.
+"""
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
@@ -0,0 +1,344 @@
+"""
+Map-Reduce Summarization
+========================
+
+Summarizes documents larger than one request can hold. The text (a string
+or a file read as it goes) is cut into chunks of at most ``chunk_tokens``
+estimated tokens, overlapping by ``overlap_tokens`` so a sentence cut at a
+boundary is seen whole by one of them, and preferably cut at a paragraph,
+line or sentence end. Then:
+
+- map: every chunk is summarized on its own, ``concurrency`` requests at a
+  time
+- reduce: neighbouring partial summaries are combined in groups that fit the
+  same token budget, level by level, until one group is left
+- final: that last group is combined by a streamed request, so the answer
+  starts printing as soon as it is generated
+
+Wall time grows with the number of chunks divided by ``concurrency``, plus
+one request per reduce level, instead of with the document length.
+
+    summarizer = Summarizer(client, "gpt-4.1", instructions="Focus on risks.")
+    with open("annual-report.txt") as f:
+        async for chunk in summarizer.stream(f):
+            ...
+    print(summarizer.stats())
+
+Partial summaries are kept by request, so when some requests fail (after the
+client's ``RetryPolicy``) a ``SummarizeError`` is raised once the others are
+done, and calling again only sends the failed ones. Every request is sent
+with ``temperature`` 0, so a client with a disk ``ResponseCache`` also keeps
+the partials across processes.
+"""
+
+import asyncio
+import time
+
+from .cache import request_key
+from .client import build_payload
+from .tokens import CHARS_PER_TOKEN, DEFAULT_CHARS_PER_TOKEN, model_family
+
+DEFAULT_CHUNK_TOKENS = 3000
+DEFAULT_OVERLAP_TOKENS = 200
+DEFAULT_SUMMARY_TOKENS = 500  # max_tokens of each partial summary
+DEFAULT_FAN_IN = 8  # Most partials combined by one reduce request
+DEFAULT_CONCURRENCY = 8
+
+# Characters read from a file at a time
+READ_BLOCK = 64 * 1024
+
+# Preferred cut points, best first, searched in the last quarter of a chunk
+BREAKS = ("\n\n", "\n", ". ", "? ", "! ", "; ", ", ", " ")
+MIN_CUT = 0.75
+
+MAP_PROMPT = (
+    "Summarize the following part of a longer document. Keep every key fact, "
+    "figure, name and conclusion; the summaries of all parts will be combined "
+    "later.{instructions}\n\nPart {part}:\n\n{text}"
+)
+SUMMARY_PROMPT = "Summarize the following document.{instructions}\n\n{text}"
+REDUCE_PROMPT = (
+    "Combine these summaries of consecutive parts of one document into a "
+    "single summary. Merge repeated points and keep the order of the "
+    "document.{instructions}\n\n{text}"
+)
+
+
+class SummarizeError(Exception):
+    """Raised when some map or reduce requests failed
+
+    errors -- list of (request index within its level, exception)
+    """
+
+    def __init__(self, stage, errors, total):
+        super().__init__(
+            f"{len(errors)} of {total} {stage} requests failed: {errors[0][1]}"
+        )
+        self.stage = stage
+        self.errors = errors
+
+
+def _chars_per_token(model):
+    return CHARS_PER_TOKEN.get(model_family(model), DEFAULT_CHARS_PER_TOKEN)
+
+
+def _check_overlap(chunk_tokens, overlap_tokens):
+    if not 0 <= overlap_tokens < chunk_tokens * MIN_CUT / 2:
+        raise ValueError("overlap_tokens must be under 3/8 of chunk_tokens")
+
+
+def _cut(buffer, start, limit):
+    """End of the chunk starting at ``start``, at most ``limit`` characters on"""
+    low = start + int(limit * MIN_CUT)
+    for separator in BREAKS:
+        position = buffer.rfind(separator, low, start + limit)
+        if position != -1:
+            return position + len(separator)
+    return start + limit
+
+
+def split_text(
+    source,
+    model=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    overlap_tokens=DEFAULT_OVERLAP_TOKENS,
+):
+    """Yield the overlapping chunks of ``source`` (a string or text file)
+
+    Each chunk holds at most ``chunk_tokens`` estimated tokens of ``model``
+    and repeats the last ``overlap_tokens`` or so of the one before. A file
+    is read as the chunks are consumed, never whole.
+    """
+    _check_overlap(chunk_tokens, overlap_tokens)
+    ratio = _chars_per_token(model)
+    limit = max(1, int(chunk_tokens * ratio))
+    overlap = int(overlap_tokens * ratio)
+
+    if isinstance(source, str):
+        read = None
+        buffer = source
+    else:
+        read = source.read
+        buffer = ""
+    start = 0  # Of the next chunk in ``buffer``
+    while True:
+        if read is not None and len(buffer) - start <= limit:
+            parts = [buffer[start:]]  # Drop what was already sent
+            size = len(parts[0])
+            while size <= limit:
+                block = read(READ_BLOCK)
+                if not block:
+                    read = None
+                    break
+                parts.append(block)
+                size += len(block)
+            buffer = "".join(parts)
+            start = 0
+        if len(buffer) - start <= limit:
+            if buffer[start:].strip():
+                yield buffer[start:]
+            return
+        cut = _cut(buffer, start, limit)
+        yield buffer[start:cut]
+        # Start the next chunk ``overlap`` characters back, on a word start
+        start = cut - overlap
+        if overlap:
+            space = buffer.find(" ", start, cut)
+            start = space + 1 if space != -1 else start
+
+
+class Summarizer:
+    """Map-reduce summaries of long texts with an ``AsyncExpedientClient``
+
+    client          -- ``AsyncExpedientClient`` sending the requests
+    model           -- model used for every request
+    instructions    -- optional extra guidance added to every prompt
+    chunk_tokens    -- estimated prompt tokens of text per request
+    overlap_tokens  -- estimated tokens repeated between neighbouring chunks
+                       (default: 200, or a quarter of ``chunk_tokens`` if less)
+    summary_tokens  -- ``max_tokens`` of each partial summary
+    fan_in          -- most partial summaries combined by one request
+    concurrency     -- requests in flight at once
+    """
+
+    def __init__(
+        self,
+        client,
+        model,
+        instructions=None,
+        chunk_tokens=DEFAULT_CHUNK_TOKENS,
+        overlap_tokens=None,
+        summary_tokens=DEFAULT_SUMMARY_TOKENS,
+        fan_in=DEFAULT_FAN_IN,
+        concurrency=DEFAULT_CONCURRENCY,
+    ):
+        if overlap_tokens is None:
+            overlap_tokens = min(DEFAULT_OVERLAP_TOKENS, chunk_tokens // 4)
+        _check_overlap(chunk_tokens, overlap_tokens)
+        self.client = client
+        self.model = model
+        self.instructions = f"\n\n{instructions}" if instructions else ""
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.summary_tokens = summary_tokens
+        self.fan_in = max(2, fan_in)
+        self.concurrency = max(1, concurrency)
+        self._partials = {}  # Request key -> summary text
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "chunks": 0,
+            "reduce_levels": 0,  # Reduce rounds before the final request
+            "requests": 0,
+            "reused": 0,  # Partial summaries kept from an earlier attempt
+            "failed": 0,
+            "map_seconds": 0.0,
+            "reduce_seconds": 0.0,
+        }
+
+    # -------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------
+
+    def _messages(self, template, text, part=None):
+        content = template.format(instructions=self.instructions, part=part, text=text)
+        return [{"role": "user", "content": content}]
+
+    async def _partial(self, messages, params):
+        data = build_payload(self.model, messages, **params)
+        key = request_key(data)
+        summary = self._partials.get(key)
+        if summary is not None:
+            self._stats["reused"] += 1
+            return summary
+        self._stats["requests"] += 1
+        response = await self.client.chat(self.model, messages, **params)
+        summary = response["choices"][0]["message"].get("content") or ""
+        self._partials[key] = summary
+        return summary
+
+    async def _run_level(self, stage, jobs, params):
+        """Run (index, messages) jobs ``concurrency`` at a time: index -> text"""
+        results = {}
+        errors = []
+        jobs = iter(jobs)
+
+        async def worker():
+            for index, messages in jobs:
+                try:
+                    results[index] = await self._partial(messages, params)
+                except Exception as error:
+                    errors.append((index, error))
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        if errors:
+            self._stats["failed"] += len(errors)
+            errors.sort(key=lambda item: item[0])
+            raise SummarizeError(stage, errors, len(results) + len(errors))
+        return results
+
+    def _groups(self, summaries):
+        """Consecutive groups of summaries fitting one reduce request"""
+        ratio = _chars_per_token(self.model)
+        budget = self.chunk_tokens * ratio
+        groups = [[]]
+        size = 0
+        for summary in summaries:
+            group = groups[-1]
+            full = len(group) >= self.fan_in or (size + len(summary) > budget)
+            if group and full and len(group) > 1:
+                groups.append([])
+                size = 0
+            groups[-1].append(summary)
+            size += len(summary)
+        return groups
+
+    def _reduce_messages(self, group):
+        text = "\n\n".join(
+            f"Summary {number}:\n{summary}" for number, summary in enumerate(group, 1)
+        )
+        return self._messages(REDUCE_PROMPT, text)
+
+    # -------------------------------------------------------------------------
+    # Summaries
+    # -------------------------------------------------------------------------
+
+    async def stream(self, source, **params):
+        """Summarize ``source`` and stream the chunks of the final answer
+
+        ``params`` (e.g. ``max_tokens``) apply to the final request only.
+        """
+        self._reset_stats()
+        partial_params = {"max_tokens": self.summary_tokens, "temperature": 0}
+        chunks = split_text(source, self.model, self.chunk_tokens, self.overlap_tokens)
+        first = next(chunks, None)
+        second = next(chunks, None)
+        if first is None:
+            raise ValueError("nothing to summarize")
+
+        if second is None:
+            # Fits in one request: no map or reduce step
+            self._stats["chunks"] = 1
+            final = self._messages(SUMMARY_PROMPT, first)
+        else:
+
+            def map_jobs():
+                for index, text in enumerate(_chain(first, second, chunks)):
+                    self._stats["chunks"] += 1
+                    yield index, self._messages(MAP_PROMPT, text, part=index + 1)
+
+            start = time.monotonic()
+            results = await self._run_level("map", map_jobs(), partial_params)
+            summaries = [results[index] for index in range(len(results))]
+            self._stats["map_seconds"] = time.monotonic() - start
+
+            start = time.monotonic()
+            groups = self._groups(summaries)
+            while len(groups) > 1:
+                self._stats["reduce_levels"] += 1
+                jobs = (
+                    (index, self._reduce_messages(group))
+                    for index, group in enumerate(groups)
+                    if len(group) > 1
+                )
+                results = await self._run_level("reduce", jobs, partial_params)
+                summaries = [
+                    results[index] if index in results else group[0]
+                    for index, group in enumerate(groups)
+                ]
+                groups = self._groups(summaries)
+            self._stats["reduce_seconds"] = time.monotonic() - start
+            final = self._reduce_messages(groups[0])
+
+        self._stats["requests"] += 1
+        answer = await self.client.stream(
+            self.model, final, **{"temperature": 0, **params}
+        )
+        async for chunk in answer:
+            yield chunk
+
+    async def summarize(self, source, **params):
+        """Summarize ``source`` and return the final answer text"""
+        parts = []
+        async for chunk in self.stream(source, **params):
+            choices = chunk.get("choices")
+            if choices:
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    parts.append(content)
+        return "".join(parts)
+
+    def clear(self):
+        """Forget the partial summaries kept for retries"""
+        self._partials.clear()
+
+    def stats(self):
+        """Counters of the last summary: chunks, requests, reduce levels, timings"""
+        return dict(self._stats, kept=len(self._partials))
+
+
+def _chain(first, second, rest):
+    yield first
+    yield second
+    yield from rest
@@ -0,0 +1,60 @@
+"""
+Local Token Estimates
+=====================
+
+Fast, dependency-free token counts for budgeting and pacing. Providers use
+different tokenizers, so the estimate uses an average characters-per-token
+ratio for each model family plus a fixed per-message overhead for the role
+and separators. It is meant to be cheap (no tokenizer download, no model
+call) and slightly pessimistic, not exact.
+"""
+
+# Average characters per token of English text, per model family
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "claude": 3.5,
+    "gemini": 4.0,
+    "perplexity": 4.0,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Tokens added per message for the role and chat-format separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def model_family(model):
+    """Provider family of a gateway model name ("openai", "claude", ...)"""
+    model = model or ""
+    if "/" in model:
+        return model.split("/", 1)[0]  # "gemini/...", "perplexity/..."
+    if model.startswith("claude"):
+        return "claude"
+    if model.startswith(("gpt-", "o1", "o3", "o4")):
+        return "openai"
+    return None
+
+
+def estimate_text_tokens(text, model=None):
+    """Estimated token count of ``text`` for ``model``"""
+    return estimate_chars_tokens(len(text), model)
+
+
+def estimate_chars_tokens(chars, model=None):
+    """Estimated token count of ``chars`` characters of text for ``model``"""
+    ratio = CHARS_PER_TOKEN.get(model_family(model), DEFAULT_CHARS_PER_TOKEN)
+    return int(chars / ratio) + 1
+
+
+def estimate_message_tokens(message, model=None):
+    """Estimated tokens of one chat message, including its overhead"""
+    content = message.get("content")
+    if isinstance(content, list):  # Multi-part content: count the text parts
+        content = " ".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+    return estimate_text_tokens(content or "", model) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_messages_tokens(messages, model=None):
+    """Estimated prompt tokens of a whole ``messages`` array"""
+    return sum(estimate_message_tokens(message, model) for message in messages)
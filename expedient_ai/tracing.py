@@ -0,0 +1,525 @@
+"""
+Request Tracing and Metrics Export
+==================================
+
+Lifecycle hooks for every call to ``/chat/completions``. A ``Tracer`` given to
+a client creates one ``RequestTrace`` per request and reports its events to
+each hook object:
+
+    on_request(trace)               request body built (``trace.request_bytes``)
+    on_connection(trace, reused)    connection acquired, new or from the pool
+    on_headers(trace, status)       response status and headers received
+    on_first_byte(trace)            first byte of the response body
+    on_first_delta(trace)           first content delta (``trace.ttft``)
+    on_delta(trace, content, gap)   every content delta and the gap before it
+    on_finish(trace, reason)        a chunk carried a ``finish_reason``
+    on_done(trace)                  response fully read or stream closed
+    on_error(trace, error)          request failed
+
+Hooks implement only the events they need; events nobody handles are never
+dispatched, and a client without a tracer runs the untraced code path, so
+tracing costs nothing when it is off. Two exporters are built in:
+``JSONLExporter`` writes one JSON line per event, and ``PrometheusExporter``
+keeps histograms of TTFT, inter-token gap, duration and payload sizes per
+model in the Prometheus text format.
+
+    metrics = PrometheusExporter()
+    tracer = Tracer(metrics, JSONLExporter("trace.jsonl"))
+    client = ExpedientClient(api_endpoint, api_key, tracer=tracer)
+    ...
+    metrics.write("expedient.prom")  # or metrics.serve(9464)
+
+Cache hits are answered without a request and are not traced.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EVENTS = (
+    "request",
+    "connection",
+    "headers",
+    "first_byte",
+    "first_delta",
+    "delta",
+    "finish",
+    "done",
+    "error",
+)
+
+# Histogram bucket upper bounds
+TTFT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2.5, 5, 10, 30)
+INTER_TOKEN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+DURATION_BUCKETS = (0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class TraceHooks:
+    """Base class of tracing hooks; every event is a no-op until overridden"""
+
+    def on_request(self, trace):
+        pass
+
+    def on_connection(self, trace, reused):
+        pass
+
+    def on_headers(self, trace, status):
+        pass
+
+    def on_first_byte(self, trace):
+        pass
+
+    def on_first_delta(self, trace):
+        pass
+
+    def on_delta(self, trace, content, gap):
+        pass
+
+    def on_finish(self, trace, reason):
+        pass
+
+    def on_done(self, trace):
+        pass
+
+    def on_error(self, trace, error):
+        pass
+
+
+class Tracer:
+    """Dispatches the lifecycle events of traced requests to hook objects
+
+    hooks -- ``TraceHooks`` subclasses, or any objects with ``on_<event>``
+             methods
+    """
+
+    def __init__(self, *hooks):
+        self.hooks = list(hooks)
+        # Per event, the bound methods that do something with it
+        self.handlers = {}
+        for event in EVENTS:
+            name = f"on_{event}"
+            default = getattr(TraceHooks, name)
+            handlers = [getattr(hook, name, None) for hook in self.hooks]
+            self.handlers[event] = [
+                handler
+                for handler in handlers
+                if handler is not None
+                and getattr(handler, "__func__", None) is not default
+            ]
+        self._ids = itertools.count(1)
+        self._aiohttp_config = None
+
+    def start(self, model, data):
+        """Begin tracing a request for the JSON body ``data``"""
+        trace = RequestTrace(self, next(self._ids), model)
+        # Encoded here and sent as-is, so request_bytes is the exact size
+        trace.payload = json.dumps(data).encode("utf-8")
+        trace.request_bytes = len(trace.payload)
+        trace.emit("request")
+        return trace
+
+    def aiohttp_config(self):
+        """``aiohttp.TraceConfig`` reporting new and reused connections"""
+        if self._aiohttp_config is None:
+            import aiohttp  # Only needed (and installed) for the async client
+
+            async def created(session, context, params):
+                if context.trace_request_ctx is not None:
+                    context.trace_request_ctx.connected(False)
+
+            async def reused(session, context, params):
+                if context.trace_request_ctx is not None:
+                    context.trace_request_ctx.connected(True)
+
+            config = aiohttp.TraceConfig()
+            config.on_connection_create_end.append(created)
+            config.on_connection_reuseconn.append(reused)
+            self._aiohttp_config = config
+        return self._aiohttp_config
+
+
+class RequestTrace:
+    """Timeline of one traced request; passed to every hook
+
+    Times are seconds since the request started (``time.perf_counter``).
+    """
+
+    def __init__(self, tracer, trace_id, model):
+        self.handlers = tracer.handlers
+        self.id = trace_id
+        self.model = model
+        self.started = time.perf_counter()
+        self.timestamp = time.time()  # Wall clock time of the start
+        self.payload = b""  # Encoded request body
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status = None
+        self.reused = None
+        self.ttfb = None  # Time to the first body byte
+        self.ttft = None  # Time to the first content delta
+        self.deltas = 0
+        self.finish_reason = None
+        self.duration = None
+        self.error = None
+        self._last_delta = None
+
+    def elapsed(self):
+        """Seconds since the request started"""
+        return time.perf_counter() - self.started
+
+    def emit(self, event, *args):
+        for handler in self.handlers[event]:
+            handler(self, *args)
+
+    # -------------------------------------------------------------------------
+    # Events reported by the clients
+    # -------------------------------------------------------------------------
+
+    def connected(self, reused):
+        self.reused = reused
+        self.emit("connection", reused)
+
+    def headers(self, status):
+        self.status = status
+        self.emit("headers", status)
+
+    def body(self, size):
+        """Count ``size`` response bytes"""
+        if self.ttfb is None:
+            self.ttfb = self.elapsed()
+            self.emit("first_byte")
+        self.response_bytes += size
+
+    def chunk(self, chunk):
+        """Inspect one decoded completion chunk"""
+        choices = chunk.get("choices")
+        if not choices:
+            return
+        choice = choices[0]
+        content = (choice.get("delta") or {}).get("content")
+        if content:
+            now = time.perf_counter()
+            self.deltas += 1
+            if self._last_delta is None:
+                self.ttft = now - self.started
+                self.emit("first_delta")
+                gap = None
+            else:
+                gap = now - self._last_delta
+            self._last_delta = now
+            self.emit("delta", content, gap)
+        reason = choice.get("finish_reason")
+        if reason:
+            self.finish_reason = reason
+            self.emit("finish", reason)
+
+    def end(self, error=None):
+        """Finish the trace with ``done``, or ``error`` if ``error`` is given"""
+        if self.duration is not None:
+            return  # Already ended
+        self.duration = self.elapsed()
+        if error is not None:
+            self.error = error
+            self.emit("error", error)
+        else:
+            self.emit("done")
+
+    def observe_bytes(self, byte_chunks):
+        """Pass raw response chunks through, counting them"""
+        for raw in byte_chunks:
+            self.body(len(raw))
+            yield raw
+
+    async def aobserve_bytes(self, byte_chunks):
+        async for raw in byte_chunks:
+            self.body(len(raw))
+            yield raw
+
+    def observe_chunks(self, chunks):
+        """Pass decoded completion chunks through, reporting their deltas"""
+        for chunk in chunks:
+            self.chunk(chunk)
+            yield chunk
+
+    async def aobserve_chunks(self, chunks):
+        async for chunk in chunks:
+            self.chunk(chunk)
+            yield chunk
+
+
+# -----------------------------------------------------------------------------
+# JSONL exporter
+# -----------------------------------------------------------------------------
+
+
+class JSONLExporter(TraceHooks):
+    """Writes every traced event as one JSON line
+
+    file    -- path or open text file to append to
+    deltas  -- also write one line per content delta (large on long answers)
+    """
+
+    def __init__(self, file, deltas=False):
+        self._owned = isinstance(file, (str, os.PathLike))
+        self.file = open(file, "a", encoding="utf-8") if self._owned else file
+        self._lock = threading.Lock()
+        if deltas:
+            self.on_delta = self._on_delta  # Registered only when wanted
+
+    def _write(self, trace, event, **fields):
+        record = {
+            "trace": trace.id,
+            "model": trace.model,
+            "event": event,
+            "t_ms": round(trace.elapsed() * 1000, 3),
+        }
+        record.update(fields)
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self.file.write(line)
+
+    def on_request(self, trace):
+        self._write(
+            trace, "request", time=trace.timestamp, request_bytes=trace.request_bytes
+        )
+
+    def on_connection(self, trace, reused):
+        self._write(trace, "connection", reused=reused)
+
+    def on_headers(self, trace, status):
+        self._write(trace, "headers", status=status)
+
+    def on_first_byte(self, trace):
+        self._write(trace, "first_byte")
+
+    def on_first_delta(self, trace):
+        self._write(trace, "first_delta")
+
+    def _on_delta(self, trace, content, gap):
+        self._write(trace, "delta", chars=len(content), gap_ms=_ms(gap))
+
+    def on_finish(self, trace, reason):
+        self._write(trace, "finish", reason=reason)
+
+    def on_done(self, trace):
+        self._write(trace, "done", **_summary(trace))
+        with self._lock:
+            self.file.flush()
+
+    def on_error(self, trace, error):
+        self._write(trace, "error", error=repr(error), **_summary(trace))
+        with self._lock:
+            self.file.flush()
+
+    def close(self):
+        """Flush, and close the file if the exporter opened it"""
+        with self._lock:
+            if self._owned:
+                self.file.close()
+            else:
+                self.file.flush()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def _summary(trace):
+    return {
+        "status": trace.status,
+        "reused": trace.reused,
+        "ttfb_ms": _ms(trace.ttfb),
+        "ttft_ms": _ms(trace.ttft),
+        "duration_ms": _ms(trace.duration),
+        "deltas": trace.deltas,
+        "finish_reason": trace.finish_reason,
+        "request_bytes": trace.request_bytes,
+        "response_bytes": trace.response_bytes,
+    }
+
+
+# -----------------------------------------------------------------------------
+# Prometheus exporter
+# -----------------------------------------------------------------------------
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label value (Prometheus semantics)"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}  # model -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, model, value):
+        series = self.series.get(model)
+        if series is None:
+            series = self.series[model] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for model, series in sorted(self.series.items()):
+            label = f'model="{_escape(model)}"'
+            total = 0
+            for bound, count in zip(self.buckets, series):
+                total += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {total}')
+            total += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {total}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-1]:.6g}")
+            lines.append(f"{self.name}_count{{{label}}} {total}")
+        return lines
+
+
+class PrometheusExporter(TraceHooks):
+    """Aggregates traced requests into Prometheus text-format metrics
+
+    prefix -- metric name prefix
+    """
+
+    def __init__(self, prefix="expedient"):
+        self.prefix = prefix
+        self.ttft = Histogram(
+            f"{prefix}_time_to_first_token_seconds",
+            "Request start to first content delta.",
+            TTFT_BUCKETS,
+        )
+        self.inter_token = Histogram(
+            f"{prefix}_inter_token_seconds",
+            "Gap between consecutive content deltas.",
+            INTER_TOKEN_BUCKETS,
+        )
+        self.duration = Histogram(
+            f"{prefix}_request_duration_seconds",
+            "Request start to end of response.",
+            DURATION_BUCKETS,
+        )
+        self.request_bytes = Histogram(
+            f"{prefix}_request_bytes", "Request body size.", BYTES_BUCKETS
+        )
+        self.response_bytes = Histogram(
+            f"{prefix}_response_bytes", "Response body size.", BYTES_BUCKETS
+        )
+        self.requests = {}  # (model, outcome) -> count
+        self.connections = {}  # (model, reused) -> count
+        self._lock = threading.Lock()
+        self._server = None
+
+    def on_connection(self, trace, reused):
+        key = (trace.model, "true" if reused else "false")
+        with self._lock:
+            self.connections[key] = self.connections.get(key, 0) + 1
+
+    def on_delta(self, trace, content, gap):
+        if gap is not None:
+            with self._lock:
+                self.inter_token.observe(trace.model, gap)
+
+    def on_done(self, trace):
+        self._record(trace, "ok")
+
+    def on_error(self, trace, error):
+        self._record(trace, "error")
+
+    def _record(self, trace, outcome):
+        model = trace.model
+        with self._lock:
+            key = (model, outcome)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if trace.ttft is not None:
+                self.ttft.observe(model, trace.ttft)
+            self.duration.observe(model, trace.duration)
+            self.request_bytes.observe(model, trace.request_bytes)
+            if trace.status is not None:
+                self.response_bytes.observe(model, trace.response_bytes)
+
+    # -------------------------------------------------------------------------
+    # Output
+    # -------------------------------------------------------------------------
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            for histogram in (
+                self.ttft,
+                self.inter_token,
+                self.duration,
+                self.request_bytes,
+                self.response_bytes,
+            ):
+                lines.extend(histogram.render())
+            lines.extend(
+                _counter(
+                    f"{self.prefix}_requests_total",
+                    "Traced requests by outcome.",
+                    self.requests,
+                    "outcome",
+                )
+            )
+            lines.extend(
+                _counter(
+                    f"{self.prefix}_connections_total",
+                    "Connections acquired, new or reused from the pool.",
+                    self.connections,
+                    "reused",
+                )
+            )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to ``path`` atomically (node_exporter textfile)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(temp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve the metrics over HTTP from a daemon thread; returns the server"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        """Stop the HTTP server started by ``serve``"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _counter(name, help_text, counts, label):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for (model, value), count in sorted(counts.items()):
+        lines.append(f'{name}{{model="{_escape(model)}",{label}="{value}"}} {count}')
+    return lines
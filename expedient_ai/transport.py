@@ -0,0 +1,449 @@
+"""
+Pluggable HTTP Transports
+=========================
+
+The clients send every request through a transport, which owns the
+connection pool and hands back a small response wrapper. Two families are
+available:
+
+    HTTP11Transport       ``requests`` keep-alive pool (ExpedientClient default)
+    AiohttpTransport      aiohttp pool (AsyncExpedientClient default)
+    HTTP2Transport        ``httpx`` HTTP/2 client for ExpedientClient
+    AsyncHTTP2Transport   ``httpx`` HTTP/2 client for AsyncExpedientClient
+
+Over HTTP/1.1 every open stream holds a connection of its own, so 500
+concurrent completions mean 500 sockets and TLS sessions. The HTTP/2
+transports multiplex streams over a few connections instead: each stream has
+its own flow-control window, acknowledged as the caller reads, so a slow
+consumer only stalls its own stream, and closing a stream early resets just
+that stream while the connection stays up for the others. HTTP/2 needs the
+optional ``httpx[http2]`` package; HTTP/1.1 remains the fallback, both when
+it is not installed and when a server does not offer HTTP/2.
+
+    transport = AsyncHTTP2Transport(max_connections=4)
+    async with AsyncExpedientClient(api_endpoint, api_key, transport=transport) as client:
+        ...
+
+Response wrappers expose ``status``, ``headers``, ``text()``, ``read()``,
+``iter_bytes()`` (``aiter_bytes()`` when async), ``release()`` to finish the
+body and return the connection to the pool, and ``close()`` to abandon it.
+Each transport lists the exceptions of a failed connection in ``errors``.
+Sync responses also take ``set_read_timeout(seconds)``, which changes the
+read timeout of a stream already in flight (used for early-stop deadlines).
+"""
+
+import asyncio
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Default pool and timeout settings (seconds)
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+
+# HTTP/2 connections per host; each carries up to the server's stream limit
+DEFAULT_HTTP2_CONNECTIONS = 4
+
+
+def _import_httpx():
+    try:
+        import httpx
+        import h2  # noqa: F401 - httpx needs it for http2=True
+    except ImportError as error:
+        raise ImportError(
+            "HTTP/2 transports need httpx with HTTP/2 support: "
+            "pip install 'httpx[http2]'"
+        ) from error
+    return httpx
+
+
+# -----------------------------------------------------------------------------
+# HTTP/1.1
+# -----------------------------------------------------------------------------
+
+
+class HTTP11Transport:
+    """HTTP/1.1 keep-alive pool on ``requests``; one connection per open stream
+
+    pool_connections -- number of per-host pools kept alive
+    pool_maxsize     -- maximum open connections kept per host
+    pool_block       -- wait for a free connection instead of opening extras
+    connect_timeout  -- seconds allowed to establish a connection
+    read_timeout     -- seconds allowed between bytes received
+    session          -- existing ``requests.Session`` to send through
+    """
+
+    errors = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(
+        self,
+        pool_connections=DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=DEFAULT_POOL_MAXSIZE,
+        pool_block=False,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        session=None,
+    ):
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.timeout = (connect_timeout, read_timeout)
+        self._sockets = weakref.WeakSet()  # Sockets seen, to spot reuse
+
+    def post(self, url, headers, data, stream=False, trace=None):
+        """Send ``data`` as JSON; returns an ``HTTP11Response``"""
+        if trace is None:
+            response = self.session.post(
+                url, json=data, headers=headers, stream=stream, timeout=self.timeout
+            )
+            return HTTP11Response(response)
+        # Always streamed, so the connection is still attached to the response
+        # and can be told apart from earlier ones
+        response = self.session.post(
+            url, data=trace.payload, headers=headers, stream=True, timeout=self.timeout
+        )
+        sock = getattr(response.raw.connection, "sock", None)
+        if sock is not None:
+            trace.connected(sock in self._sockets)
+            self._sockets.add(sock)
+        return HTTP11Response(response)
+
+    def close(self):
+        """Close every pooled connection"""
+        self.session.close()
+
+
+class HTTP11Response:
+    """Response of an ``HTTP11Transport``"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status_code
+        self.headers = response.headers
+
+    def text(self):
+        return self.response.text
+
+    def read(self):
+        return self.response.content
+
+    def iter_bytes(self):
+        return self.response.iter_content(chunk_size=None)
+
+    def set_read_timeout(self, seconds):
+        connection = self.response.raw.connection
+        sock = getattr(connection, "sock", None)
+        if sock is not None:
+            sock.settimeout(seconds)  # Applies to the next read of the body
+
+    def release(self):
+        # Read the rest of the body so the connection is reusable
+        self.response.raw.drain_conn()
+        self.response.close()
+
+    def close(self):
+        self.response.close()
+
+
+class AiohttpTransport:
+    """aiohttp connection pool; one connection per open stream
+
+    pool_limit       -- maximum open connections in total (0 = unlimited)
+    pool_maxsize     -- maximum open connections per host (0 = unlimited)
+    connect_timeout  -- seconds allowed to establish a connection
+    read_timeout     -- seconds allowed between bytes received
+    session          -- existing ``aiohttp.ClientSession`` to send through
+    trace_configs    -- ``aiohttp.TraceConfig`` list for the session it creates
+    """
+
+    def __init__(
+        self,
+        pool_limit=0,
+        pool_maxsize=0,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        session=None,
+        trace_configs=None,
+    ):
+        import aiohttp  # Only needed (and installed) for the async client
+
+        self._aiohttp = aiohttp
+        self.errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+        self.timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self._pool_limit = pool_limit
+        self._pool_maxsize = pool_maxsize
+        self._session = session
+        self._trace_configs = trace_configs
+
+    @property
+    def session(self):
+        """The aiohttp session, created on first use inside the running loop"""
+        if self._session is None:
+            aiohttp = self._aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_limit, limit_per_host=self._pool_maxsize
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=self._trace_configs
+            )
+        return self._session
+
+    async def post(self, url, headers, data, trace=None):
+        """Send ``data`` as JSON; returns an ``AiohttpResponse``"""
+        # Headers and timeouts go on each request so a caller-supplied
+        # session (e.g. one with trace configs) behaves the same
+        if trace is None:
+            response = await self.session.post(
+                url, json=data, headers=headers, timeout=self.timeout
+            )
+        else:
+            response = await self.session.post(
+                url,
+                data=trace.payload,
+                headers=headers,
+                timeout=self.timeout,
+                trace_request_ctx=trace,
+            )
+        return AiohttpResponse(response)
+
+    async def close(self):
+        """Close every pooled connection"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AiohttpResponse:
+    """Response of an ``AiohttpTransport``"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status
+        self.headers = response.headers
+
+    async def text(self):
+        return await self.response.text()
+
+    async def read(self):
+        return await self.response.read()
+
+    def aiter_bytes(self):
+        return self.response.content.iter_any()
+
+    async def release(self):
+        # Read the rest of the body so the connection is reusable
+        await self.response.content.read()
+        self.response.release()
+
+    async def close(self):
+        self.response.close()
+
+
+# -----------------------------------------------------------------------------
+# HTTP/2
+# -----------------------------------------------------------------------------
+
+
+def _http2_options(httpx, max_connections, connect_timeout, read_timeout, http1):
+    return {
+        "http2": True,
+        # http1=False speaks HTTP/2 from the first byte ("prior knowledge"),
+        # which cleartext http:// servers need; over TLS, ALPN picks HTTP/2
+        # and falls back to HTTP/1.1 when the server does not offer it
+        "http1": http1,
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        "timeout": httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=read_timeout, pool=None
+        ),
+    }
+
+
+class HTTP2Transport:
+    """HTTP/2 client on ``httpx``: many concurrent streams per connection
+
+    max_connections  -- connections per host; streams are multiplexed on them
+    connect_timeout  -- seconds allowed to establish a connection
+    read_timeout     -- seconds allowed between bytes received
+    http1            -- allow HTTP/1.1 via ALPN; False for cleartext HTTP/2
+    client           -- existing ``httpx.Client`` to send through
+    """
+
+    def __init__(
+        self,
+        max_connections=DEFAULT_HTTP2_CONNECTIONS,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        http1=True,
+        client=None,
+    ):
+        httpx = _import_httpx()
+        self.errors = (httpx.TransportError,)
+        if client is None:
+            client = httpx.Client(
+                **_http2_options(
+                    httpx, max_connections, connect_timeout, read_timeout, http1
+                )
+            )
+        self.client = client
+
+    def post(self, url, headers, data, stream=False, trace=None):
+        """Send ``data`` as JSON; returns an ``HTTP2Response``"""
+        connected = []
+        if trace is not None:
+
+            def on_event(event, info):
+                _on_httpx_event(event, connected)
+
+            request = self.client.build_request(
+                "POST", url, content=trace.payload, headers=headers
+            )
+            request.extensions["trace"] = on_event
+        else:
+            request = self.client.build_request("POST", url, json=data, headers=headers)
+        response = self.client.send(request, stream=True)
+        if trace is not None:
+            trace.connected(not connected)
+        return HTTP2Response(response)
+
+    def close(self):
+        """Close every connection"""
+        self.client.close()
+
+
+class HTTP2Response:
+    """Response of an ``HTTP2Transport``"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self._chunks = None
+
+    def text(self):
+        self.response.read()
+        return self.response.text
+
+    def read(self):
+        return self.response.read()
+
+    def iter_bytes(self):
+        self._chunks = self.response.iter_bytes()
+        return self._chunks
+
+    def set_read_timeout(self, seconds):
+        # httpcore looks the read timeout up again before every read
+        self.response.request.extensions["timeout"]["read"] = seconds
+
+    def release(self):
+        if self._chunks is not None:
+            for _ in self._chunks:  # Read up to the end of the stream
+                pass
+        self.response.close()
+
+    def close(self):
+        # Resets only this stream; the connection stays up for the others
+        self.response.close()
+
+
+class AsyncHTTP2Transport:
+    """HTTP/2 client on ``httpx`` for ``AsyncExpedientClient``
+
+    max_connections  -- connections per host; streams are multiplexed on them
+    connect_timeout  -- seconds allowed to establish a connection
+    read_timeout     -- seconds allowed between bytes received
+    http1            -- allow HTTP/1.1 via ALPN; False for cleartext HTTP/2
+    client           -- existing ``httpx.AsyncClient`` to send through
+    """
+
+    def __init__(
+        self,
+        max_connections=DEFAULT_HTTP2_CONNECTIONS,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        http1=True,
+        client=None,
+    ):
+        httpx = _import_httpx()
+        self.errors = (httpx.TransportError,)
+        if client is None:
+            client = httpx.AsyncClient(
+                **_http2_options(
+                    httpx, max_connections, connect_timeout, read_timeout, http1
+                )
+            )
+        self.client = client
+
+    async def post(self, url, headers, data, trace=None):
+        """Send ``data`` as JSON; returns an ``AsyncHTTP2Response``"""
+        connected = []
+        if trace is not None:
+
+            async def on_event(event, info):
+                _on_httpx_event(event, connected)
+
+            request = self.client.build_request(
+                "POST", url, content=trace.payload, headers=headers
+            )
+            request.extensions["trace"] = on_event
+        else:
+            request = self.client.build_request("POST", url, json=data, headers=headers)
+        response = await self.client.send(request, stream=True)
+        if trace is not None:
+            trace.connected(not connected)
+        return AsyncHTTP2Response(response)
+
+    async def close(self):
+        """Close every connection"""
+        await self.client.aclose()
+
+
+class AsyncHTTP2Response:
+    """Response of an ``AsyncHTTP2Transport``"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self._chunks = None
+
+    async def text(self):
+        await self.response.aread()
+        return self.response.text
+
+    async def read(self):
+        return await self.response.aread()
+
+    def aiter_bytes(self):
+        self._chunks = self.response.aiter_bytes()
+        return self._chunks
+
+    async def release(self):
+        if self._chunks is not None:
+            async for _ in self._chunks:  # Read up to the end of the stream
+                pass
+        await self.response.aclose()
+
+    async def close(self):
+        # Resets only this stream; the connection stays up for the others
+        await self.response.aclose()
+
+
+def _on_httpx_event(event, connected):
+    # httpcore reports a TCP connect only when it opens a new connection
+    if event == "connection.connect_tcp.complete":
+        connected.append(True)
@@ -1,5 +1,4 @@
-import requests
-import json
+from expedient_ai import ExpedientAPIError, ExpedientClient, StreamWriter
 
 # Configuration
 api_endpoint = "[ ENTER_CHAT_URL_HERE ]"
@@ -8,34 +7,17 @@ model = "gpt-4.1"
 prompt = "Explain the benefits of AI in business."
 
 # Request
-headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
-data = {
-    "model": model,
-    "messages": [{"role": "user", "content": prompt}],
-    "max_tokens": 500,
-    "temperature": 0.7,
-    "stream": True,
-}
-
-response = requests.post(
-    f"{api_endpoint}/chat/completions", headers=headers, json=data, stream=True
-)
+client = ExpedientClient(api_endpoint, api_key)
+messages = [{"role": "user", "content": prompt}]
 
 # Process response
-if response.status_code == 200:
-    for line in response.iter_lines(decode_unicode=True):
-        if line and line.startswith("data: "):
-            data_str = line[6:]
-            if data_str.strip() == "[DONE]":
-                break
-            try:
-                data = json.loads(data_str)
-                if "choices" in data and data["choices"]:
-                    delta = data["choices"][0].get("delta", {})
-                    if "content" in delta:
-                        print(delta["content"], end="", flush=True)
-            except:
-                continue
+try:
+    with StreamWriter() as output:  # Batches tokens into a few writes per second
+        for chunk in client.stream(model, messages, max_tokens=500, temperature=0.7):
+            if chunk.get("choices"):
+                delta = chunk["choices"][0].get("delta", {})
+                if "content" in delta:
+                    output.write(delta["content"])
     print("\n")
-else:
-    print(f"Error: {response.status_code}")
+except ExpedientAPIError as error:
+    print(f"Error: {error.status_code}")
@@ -10,26 +10,15 @@ For complete API documentation and Postman examples, see postman.md
 For standard streaming models, see example.py
 """
 
-# Import required libraries for HTTP requests and JSON processing
-import requests  # For making HTTP API calls
-import json  # For parsing JSON data from streaming responses
-import threading  # For animated thinking dots
-import time  # For timing the dot animation
-
-# =============================================================================
-# ANIMATED THINKING INDICATOR
-# =============================================================================
-
-
-def animate_thinking():
-    """Show animated dots while AI is thinking"""
-    dots = [".", "..", "..."]
-    i = 0
-    while thinking_active:
-        print(f"\r🤔 AI is thinking{dots[i % 3]}   ", end="", flush=True)
-        time.sleep(0.5)  # Update every 0.5 seconds
-        i += 1
-
+# Import the shared API client and the output helpers for the thinking animation
+from expedient_ai import (
+    EarlyStop,
+    ExpedientAPIError,
+    ExpedientClient,
+    RetryPolicy,
+    Spinner,
+    StreamWriter,
+)
 
 # =============================================================================
 # API CONFIGURATION
@@ -85,23 +74,26 @@ Which strategy should they choose and why? Show your reasoning process.
 # REQUEST PREPARATION
 # =============================================================================
 
-# Set up HTTP headers required for the API request
-headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+# Create the API client with an extended read timeout for reasoning models
+# Rate limited (429) and transient server errors are retried with backoff.
+client = ExpedientClient(
+    api_endpoint, api_key, read_timeout=180, retry=RetryPolicy(max_retries=3)
+)
+
+# Conversation messages array with the complex question requiring reasoning
+messages = [{"role": "user", "content": prompt}]
 
-# Create the request payload with reasoning parameters
-data = {
-    "model": model,  # Which reasoning model to use
-    "messages": [
-        {"role": "user", "content": prompt}
-    ],  # Complex question requiring reasoning
+# Request parameters for reasoning models
+params = {
     "max_tokens": 2000,  # Higher token limit for detailed reasoning
     "temperature": 0.3,  # Lower temperature for more focused reasoning
-    "stream": True,  # Enable streaming for real-time responses
     "reasoning_effort": "high",  # Enable maximum reasoning capability (low/medium/high)
 }
 
-# Construct the complete API URL
-api_full = f"{api_endpoint}/chat/completions"
+# Give up on the answer after 5 minutes overall, or if the model goes silent for
+# 60 seconds once it has started; the connection is released at once instead of
+# waiting for the rest of the max_tokens budget
+early_stop = EarlyStop(deadline=300, token_timeout=60)
 
 # =============================================================================
 # API REQUEST EXECUTION
@@ -110,82 +102,68 @@ api_full = f"{api_endpoint}/chat/completions"
 print("🧠 Reasoning Model Example")
 print("=" * 50)
 print(f"Model: {model}")
-print(f"Reasoning Effort: {data['reasoning_effort']}")
+print(f"Reasoning Effort: {params['reasoning_effort']}")
 print("=" * 50)
 
-# Start animated thinking indicator
+# Start animated thinking indicator (stopped as soon as content arrives)
 print()  # Add newline for clean animation
-thinking_active = True
-thinking_thread = threading.Thread(target=animate_thinking, daemon=True)
-thinking_thread.start()
+thinking = Spinner("🤔 AI is thinking").start()
 
-# Make the HTTP POST request with extended timeout for reasoning models
-response = requests.post(api_full, headers=headers, json=data, stream=True, timeout=180)
+# Streamed text is batched into a few writes per second instead of one per token
+output = StreamWriter()
 
 # =============================================================================
 # RESPONSE PROCESSING
 # =============================================================================
 
-if response.status_code == 200:
+try:
+    # Send the streaming request; a non-200 status raises ExpedientAPIError
+    chunks = client.stream(model, messages, early_stop=early_stop, **params)
 
     # Track if we've started receiving content
     content_started = False
 
-    # Process the streaming response
-    for line in response.iter_lines(decode_unicode=True):
-        if line and line.startswith("data: "):
-            data_str = line[6:]  # Remove 'data: ' prefix
-
-            # Check for completion signal
-            if data_str.strip() == "[DONE]":
-                break
-
-            # Parse and display content
-            try:
-                data = json.loads(data_str)
-                if "choices" in data and data["choices"]:
-                    choice = data["choices"][0]
-
-                    # Handle reasoning content
-                    if "delta" in choice:
-                        delta = choice["delta"]
-                        if "content" in delta:
-                            # Clear thinking indicator and show header on first content
-                            if not content_started:
-                                thinking_active = False  # Stop animation
-                                time.sleep(0.1)  # Brief pause to let animation stop
-                                print(
-                                    "\r🤔 AI is thinking... Done!     "
-                                )  # Clear line with completion
-                                print("\n🧠 AI Reasoning Process (streaming):")
-                                print("-" * 50)
-                                content_started = True
-                            print(delta["content"], end="", flush=True)
-
-                    # Check for completion
-                    if choice.get("finish_reason"):
-                        print(f"\n\n✅ Reasoning completed: {choice['finish_reason']}")
-                        break
-
-            except json.JSONDecodeError:
-                continue  # Skip malformed JSON
+    # Process the streaming response (one parsed chunk per server-sent event)
+    for chunk in chunks:
+        if "choices" in chunk and chunk["choices"]:
+            choice = chunk["choices"][0]
+
+            # Handle reasoning content
+            if "delta" in choice:
+                delta = choice["delta"]
+                if "content" in delta:
+                    # Clear thinking indicator and show header on first content
+                    if not content_started:
+                        thinking.stop("🤔 AI is thinking... Done!")  # Stops at once
+                        print("\n🧠 AI Reasoning Process (streaming):")
+                        print("-" * 50)
+                        content_started = True
+                    output.write(delta["content"])
+
+            # Check for completion; the stream still runs on to [DONE], which
+            # returns its connection to the pool and records the outcome
+            if choice.get("finish_reason"):
+                output.flush()  # Write out any text still buffered
+                print(f"\n\n✅ Reasoning completed: {choice['finish_reason']}")
+
+    output.close()
+
+    # Report a stream cut short by one of the early-stop deadlines
+    if early_stop.last_reason:
+        print(f"\n\n⏱️ Stopped early: {early_stop.last_reason}")
 
     # If no content was received, still show completion
     if not content_started:
-        thinking_active = False  # Stop animation
-        time.sleep(0.1)  # Brief pause to let animation stop
-        print("\r🤔 AI is thinking... Complete!     ")  # Clear line
+        thinking.stop("🤔 AI is thinking... Complete!")
         print("\n🧠 AI Reasoning Process completed (no content received)")
         print("-" * 50)
 
     print("\n" + "-" * 50)
     print("🎯 Reasoning analysis completed.")
 
-else:
-    thinking_active = False  # Stop animation on error
-    time.sleep(0.1)  # Brief pause to let animation stop
-    print(f"\r❌ Request failed: {response.status_code}")
-    print(f"Error details: {response.text}")
+except ExpedientAPIError as error:
+    thinking.stop(f"❌ Request failed: {error.status_code}")
+    print(f"Error details: {error.text}")
 
 print("\n💡 Tip: Reasoning models work best with:")
 print("   • Complex analytical questions")